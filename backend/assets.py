@@ -0,0 +1,138 @@
+"""
+Precompressed, fingerprinted frontend assets.
+
+load() reads the frontend once at startup. Each stylesheet and script is
+hashed, and the pages link to it as /static/<name>.<hash>.<ext>. Those URLs
+change whenever the file does, so they are served as immutable for a year.
+The pages themselves keep their URLs and are revalidated with their ETag on
+every visit. Every file is gzipped ahead of time, and brotli-compressed too
+when the brotli package is installed. A request gets the smallest encoding
+its Accept-Encoding allows.
+"""
+import gzip
+import os
+import re
+from hashlib import blake2b
+from typing import Dict, Optional
+
+from fastapi import HTTPException, Request, Response
+
+import cache
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - optional dependency
+    brotli = None
+
+PAGES = {"index.html", "analytics.html"}
+MEDIA_TYPES = {
+    ".html": "text/html; charset=utf-8",
+    ".css":  "text/css; charset=utf-8",
+    ".js":   "application/javascript; charset=utf-8",
+}
+IMMUTABLE = "public, max-age=31536000, immutable"
+REVALIDATE = "no-cache"
+MIN_COMPRESS_BYTES = 512
+
+# href="style.css" / src="app.js" in the pages: relative references to a sibling file
+_REFERENCE = re.compile(r'\b(href|src)="([\w.-]+\.(?:css|js))"')
+
+
+class Asset:
+    """One file: its ETag and its body in every encoding it's worth sending in."""
+
+    def __init__(self, name: str, body: bytes):
+        self.name       = name
+        self.media_type = MEDIA_TYPES[os.path.splitext(name)[1]]
+        self.digest     = blake2b(body, digest_size=8).hexdigest()
+        self.bodies: Dict[str, bytes] = {"identity": body}
+        if len(body) >= MIN_COMPRESS_BYTES:
+            self.bodies["gzip"] = gzip.compress(body, compresslevel=9, mtime=0)
+            if brotli is not None:
+                self.bodies["br"] = brotli.compress(body, quality=11)
+
+    @property
+    def url(self) -> str:
+        stem, ext = os.path.splitext(self.name)
+        return f"/static/{stem}.{self.digest[:12]}{ext}"
+
+    def etag(self, encoding: str) -> str:
+        return f'"{self.digest}"' if encoding == "identity" else f'"{self.digest}-{encoding}"'
+
+
+_assets: Dict[str, Asset] = {}
+_by_url: Dict[str, Asset] = {}
+
+
+def load(directory: str) -> None:
+    """Read, fingerprint and compress the frontend's pages, stylesheets and scripts."""
+    files = {}
+    for name in sorted(os.listdir(directory)):
+        if os.path.splitext(name)[1] in MEDIA_TYPES:
+            with open(os.path.join(directory, name), "rb") as f:
+                files[name] = f.read()
+
+    assets = {name: Asset(name, body) for name, body in files.items() if name not in PAGES}
+
+    def fingerprint(match) -> str:
+        asset = assets.get(match.group(2))
+        return f'{match.group(1)}="{asset.url}"' if asset else match.group(0)
+
+    for name in PAGES & files.keys():
+        html = _REFERENCE.sub(fingerprint, files[name].decode("utf-8"))
+        assets[name] = Asset(name, html.encode("utf-8"))
+
+    _assets.clear()
+    _assets.update(assets)
+    _by_url.clear()
+    _by_url.update({a.url: a for name, a in assets.items() if name not in PAGES})
+
+
+def negotiate(accept_encoding: Optional[str], available) -> str:
+    """The smallest available encoding the client accepts."""
+    accepted = {}
+    for part in (accept_encoding or "").lower().split(","):
+        coding, _, params = part.strip().partition(";")
+        q = 1.0
+        for param in params.split(";"):
+            key, _, value = param.strip().partition("=")
+            if key == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        accepted[coding.strip()] = q
+    for encoding in ("br", "gzip"):
+        q = accepted.get(encoding, accepted.get("*", 0.0))
+        if encoding in available and q > 0:
+            return encoding
+    return "identity"
+
+
+def _respond(request: Request, asset: Asset, cache_control: str) -> Response:
+    encoding = negotiate(request.headers.get("accept-encoding"), asset.bodies)
+    etag = asset.etag(encoding)
+    headers = {"ETag": etag, "Cache-Control": cache_control, "Vary": "Accept-Encoding"}
+    if cache.etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+    if encoding != "identity":
+        headers["Content-Encoding"] = encoding
+    return Response(asset.bodies[encoding], media_type=asset.media_type, headers=headers)
+
+
+def serve(request: Request, name: str) -> Response:
+    """A page or an asset by its plain name; revalidated on every use."""
+    asset = _assets.get(name)
+    if asset is None:
+        raise HTTPException(status_code=404, detail="Not found")
+    return _respond(request, asset, REVALIDATE)
+
+
+def serve_fingerprinted(request: Request, path: str) -> Response:
+    """An asset by its /static/ URL. A stale fingerprint (a page cached across
+    a deploy) still gets the current file, just not as immutable."""
+    asset = _by_url.get(f"/static/{path}")
+    if asset is not None:
+        return _respond(request, asset, IMMUTABLE)
+    stem, ext = os.path.splitext(path)
+    return serve(request, f"{stem.rpartition('.')[0]}{ext}")
@@ -0,0 +1,92 @@
+"""
+Token authentication.
+
+SPENDER_MULTI_USER=0 (default): single-user deployment. Every request acts
+as DEFAULT_USER_ID and no token is needed, exactly as before users existed.
+
+SPENDER_MULTI_USER=1: every /api request must carry an API token as
+`Authorization: Bearer <token>`. Only /api/stream also takes a `?token=`
+query parameter, because EventSource can't set headers; anywhere else a
+token in the URL would end up in access logs and browser history. Tokens are random 32-byte
+strings handed out once by `manage.py create-user` / `issue-token`; only
+their SHA-256 is stored, so a lookup is one unique-index read on users.
+"""
+import hashlib
+import os
+import secrets
+from typing import Optional, Tuple
+
+from fastapi import HTTPException, Request
+from sqlalchemy.orm import Session
+
+from models import User
+
+MULTI_USER = os.getenv("SPENDER_MULTI_USER", "0") == "1"
+DEFAULT_USER_ID = 1
+
+
+def hash_token(token: str) -> str:
+    return hashlib.sha256(token.encode()).hexdigest()
+
+
+def new_token() -> str:
+    return secrets.token_urlsafe(32)
+
+
+def create_user(db: Session, name: str) -> Tuple[User, str]:
+    """Add a user with a fresh token. Caller commits. Returns (user, plaintext token)."""
+    token = new_token()
+    user = User(name=name, token_hash=hash_token(token))
+    db.add(user)
+    db.flush()
+    return user, token
+
+
+def issue_token(db: Session, user: User) -> str:
+    """Replace the user's token (the old one stops working). Caller commits."""
+    token = new_token()
+    user.token_hash = hash_token(token)
+    return token
+
+
+def _bearer_token(request: Request) -> Optional[str]:
+    header = request.headers.get("authorization", "")
+    scheme, _, value = header.partition(" ")
+    if scheme.lower() == "bearer" and value.strip():
+        return value.strip()
+    return None
+
+
+def user_for_token(token: str) -> Optional[int]:
+    from database import SessionLocal
+
+    db = SessionLocal()
+    try:
+        return db.query(User.id).filter(User.token_hash == hash_token(token)).scalar()
+    finally:
+        db.close()
+
+
+def _authenticate(token: Optional[str]) -> int:
+    user_id = user_for_token(token) if token else None
+    if user_id is None:
+        raise HTTPException(
+            status_code=401,
+            detail="Missing or invalid API token",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    return user_id
+
+
+def current_user(request: Request) -> int:
+    """FastAPI dependency: the id of the user making the request."""
+    if not MULTI_USER:
+        return DEFAULT_USER_ID
+    return _authenticate(_bearer_token(request))
+
+
+def stream_user(request: Request) -> int:
+    """current_user() for /api/stream, which also takes ?token= (EventSource can't send headers)."""
+    if not MULTI_USER:
+        return DEFAULT_USER_ID
+    return _authenticate(_bearer_token(request) or request.query_params.get("token"))
@@ -0,0 +1,97 @@
+"""
+In-process response cache for the read-heavy endpoints.
+
+Responses are keyed by (user, name, data version, today) and the same key
+doubles as the response ETag. The data version is the user's data_versions
+row, bumped in the transaction of every write (database.py), so it is read
+once per request and agrees across uvicorn workers and restarts: a key goes
+stale on the user's next write, wherever it was handled, or at the day
+boundary — whichever comes first.
+
+Bodies are kept per process, next to the version they were computed at, for
+the SPENDER_CACHE_USERS most recently active users. A worker only serves one
+whose key matches the version it just read, so it never answers from a body
+that predates another worker's write.
+
+SPENDER_RESPONSE_CACHE=0 disables body caching (ETags are still sent), which
+is what load tests use to measure the computation itself.
+"""
+import os
+import threading
+from collections import OrderedDict
+from datetime import date
+from typing import Awaitable, Callable, Tuple
+
+ENABLED   = os.getenv("SPENDER_RESPONSE_CACHE", "1") != "0"
+MAX_USERS = int(os.getenv("SPENDER_CACHE_USERS", "1024"))
+
+_lock     = threading.Lock()
+_entries: "OrderedDict[int, dict]" = OrderedDict()   # user → {name → (version, etag, body)}, least recent first
+
+
+def etag_for(user_id: int, name: str, version: int) -> str:
+    return f'W/"{user_id}-{name}-{version}-{date.today().isoformat()}"'
+
+
+def etag_matches(if_none_match: str, etag: str) -> bool:
+    if not if_none_match:
+        return False
+    candidates = [t.strip() for t in if_none_match.split(",")]
+    return "*" in candidates or etag in candidates
+
+
+def _cached(user_id: int, name: str, etag: str):
+    with _lock:
+        names = _entries.get(user_id)
+        if names is None:
+            return None
+        _entries.move_to_end(user_id)
+        cached = names.get(name)
+    return cached[1:] if cached and cached[1] == etag else None
+
+
+def get_or_compute(user_id: int, name: str, version: int, compute: Callable[[], bytes]) -> Tuple[str, bytes]:
+    """Return (etag, body) at `version`, computing the body only if the cached one is stale."""
+    etag = etag_for(user_id, name, version)
+    cached = _cached(user_id, name, etag)
+    if cached:
+        return cached
+    body = compute()
+    _store(user_id, name, version, etag, body)
+    return etag, body
+
+
+async def get_or_compute_async(
+    user_id: int, name: str, version: int, compute: Callable[[], Awaitable[bytes]],
+) -> Tuple[str, bytes]:
+    """get_or_compute() for coroutine computations (async DB mode)."""
+    etag = etag_for(user_id, name, version)
+    cached = _cached(user_id, name, etag)
+    if cached:
+        return cached
+    body = await compute()
+    _store(user_id, name, version, etag, body)
+    return etag, body
+
+
+def prime(user_id: int, name: str, version: int, body: bytes) -> None:
+    """Store a body computed elsewhere (e.g. for an SSE push) at `version`."""
+    _store(user_id, name, version, etag_for(user_id, name, version), body)
+
+
+def _store(user_id: int, name: str, version: int, etag: str, body: bytes) -> None:
+    if not ENABLED:
+        return
+    with _lock:
+        names = _entries.get(user_id)
+        if names is None:
+            names = _entries[user_id] = {}
+            while len(_entries) > MAX_USERS:
+                _entries.popitem(last=False)
+        else:
+            _entries.move_to_end(user_id)
+            # A request that read the version before a later write may finish last.
+            held = names.get(name)
+            if held and held[0] > version:
+                return
+        names[name] = (version, etag, body)
@@ -0,0 +1,154 @@
+"""
+Columnar analytics backend.
+
+Loads amount / category / date / payment_mode for every expense once into
+compact arrays and computes the breakdowns compute_analytics() needs with
+vectorized group-bys (NumPy bincount). Without NumPy the same arrays are
+built with array.array and reduced in a single Python pass.
+
+Returns the same dict shape as engine.aggregate_expenses() so it can be
+swapped in via SPENDER_ANALYTICS_BACKEND=columnar.
+"""
+from array import array
+from datetime import date
+from typing import Optional
+
+from sqlalchemy import Integer, cast, func, select
+from sqlalchemy.orm import Session
+
+from models import Expense
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - optional dependency
+    np = None
+
+# julianday('0001-01-01') - 1 → turns SQLite's date text into date.toordinal() in SQL,
+# so no per-row date objects are built in Python.
+_JULIAN_TO_ORDINAL = 1721424.5
+FETCH_ROWS = 65536
+
+
+class ExpenseColumns:
+    """Dictionary-encoded expense columns."""
+
+    def __init__(self):
+        self.amount   = array("q")
+        self.day      = array("i")    # date.toordinal()
+        self.category = array("h")    # code into categories
+        self.mode     = array("h")    # code into modes
+        self.categories: list = []
+        self.modes: list = []
+
+    def __len__(self) -> int:
+        return len(self.amount)
+
+
+def load_expense_columns(db: Session) -> ExpenseColumns:
+    stmt = select(
+        Expense.amount,
+        cast(func.julianday(Expense.date) - _JULIAN_TO_ORDINAL, Integer),
+        Expense.category,
+        Expense.payment_mode,
+    ).where(Expense.user_id == db.info["user_id"])   # raw cursor: session scoping doesn't apply
+    # Straight off the DBAPI cursor: every column is already a plain int/str,
+    # so SQLAlchemy's per-row Row construction would be pure overhead here.
+    sql = str(stmt.compile(db.get_bind(), compile_kwargs={"literal_binds": True}))
+    cursor = db.connection().connection.cursor()
+
+    cols = ExpenseColumns()
+    cat_codes: dict = {}
+    mode_codes: dict = {}
+    cursor.execute(sql)
+    while True:
+        part = cursor.fetchmany(FETCH_ROWS)
+        if not part:
+            break
+        amounts, days, cats, modes = zip(*part)
+        cols.amount.extend(amounts)
+        cols.day.extend(days)
+        cols.category.extend([cat_codes.setdefault(c, len(cat_codes)) for c in cats])
+        cols.mode.extend([mode_codes.setdefault(m or "upi", len(mode_codes)) for m in modes])
+    cursor.close()
+    cols.categories = list(cat_codes)
+    cols.modes = list(mode_codes)
+    return cols
+
+
+def compute_breakdowns(cols: ExpenseColumns, daily_since: Optional[date] = None) -> dict:
+    if np is not None:
+        return _breakdowns_numpy(cols, daily_since)
+    return _breakdowns_python(cols, daily_since)
+
+
+def _grouped(labels: list, totals, counts) -> dict:
+    return {
+        label: {"total": int(totals[i]), "count": int(counts[i])}
+        for i, label in enumerate(labels)
+        if counts[i]
+    }
+
+
+def _breakdowns_numpy(cols: ExpenseColumns, daily_since: Optional[date]) -> dict:
+    amount   = np.frombuffer(cols.amount,   dtype=np.int64)
+    category = np.frombuffer(cols.category, dtype=np.int16)
+    mode     = np.frombuffer(cols.mode,     dtype=np.int16)
+    day      = np.frombuffer(cols.day,      dtype=np.int32)
+
+    result = {
+        "by_category": _grouped(
+            cols.categories,
+            np.bincount(category, weights=amount, minlength=len(cols.categories)),
+            np.bincount(category, minlength=len(cols.categories)),
+        ),
+        "by_payment_mode": _grouped(
+            cols.modes,
+            np.bincount(mode, weights=amount, minlength=len(cols.modes)),
+            np.bincount(mode, minlength=len(cols.modes)),
+        ),
+        "daily": {},
+        "total": int(amount.sum()),
+        "count": len(cols),
+    }
+    if daily_since is not None:
+        mask = day >= daily_since.toordinal()
+        days, inverse = np.unique(day[mask], return_inverse=True)
+        totals = np.bincount(inverse, weights=amount[mask], minlength=len(days))
+        counts = np.bincount(inverse, minlength=len(days))
+        result["daily"] = {
+            date.fromordinal(int(d)): {"total": int(totals[i]), "count": int(counts[i])}
+            for i, d in enumerate(days)
+        }
+    return result
+
+
+def _breakdowns_python(cols: ExpenseColumns, daily_since: Optional[date]) -> dict:
+    cat_totals  = [0] * len(cols.categories)
+    cat_counts  = [0] * len(cols.categories)
+    mode_totals = [0] * len(cols.modes)
+    mode_counts = [0] * len(cols.modes)
+    daily: dict = {}
+    cutoff = daily_since.toordinal() if daily_since is not None else None
+
+    for amount, c, m, d in zip(cols.amount, cols.category, cols.mode, cols.day):
+        cat_totals[c] += amount
+        cat_counts[c] += 1
+        mode_totals[m] += amount
+        mode_counts[m] += 1
+        if cutoff is not None and d >= cutoff:
+            total, count = daily.get(d, (0, 0))
+            daily[d] = (total + amount, count + 1)
+
+    return {
+        "by_category":     _grouped(cols.categories, cat_totals, cat_counts),
+        "by_payment_mode": _grouped(cols.modes, mode_totals, mode_counts),
+        "daily": {
+            date.fromordinal(d): {"total": t, "count": n} for d, (t, n) in daily.items()
+        },
+        "total": sum(cat_totals),
+        "count": len(cols),
+    }
+
+
+def aggregate_expenses_columnar(db: Session, daily_since: Optional[date] = None) -> dict:
+    return compute_breakdowns(load_expense_columns(db), daily_since)
@@ -0,0 +1,322 @@
+"""
+Expense cube: sums and counts for any mix of dimensions over a date range.
+
+Three rollups of the expenses table back it. All of them are updated in
+the same transaction as every expense insert and delete: record() is
+called from engine.apply_expense_totals and from the bulk importer.
+
+  expense_rollup                one row per (day, category, mood, payment_mode)
+  expense_rollup_month          the same per calendar month
+  expense_rollup_month_weekday  the same per calendar month and weekday
+
+A query splits its range into whole months and the partial months at either
+end. The whole months are read from the smallest monthly rollup that has
+every requested dimension. The partial months, and week slices, which need
+the day, are read from expense_rollup. A slice's cost therefore follows the
+number of months in its range, not the number of expenses: ten years of
+history is a few thousand monthly rows.
+
+  weekday  0 = Monday … 6 = Sunday
+  week     the Monday that starts it, YYYY-MM-DD
+  month    YYYY-MM
+"""
+import calendar
+from datetime import date, timedelta
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+from sqlalchemy import Connection, Integer, cast, delete, func, insert, select
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session
+
+from models import Expense, ExpenseRollup, ExpenseRollupMonth, ExpenseRollupMonthWeekday
+
+DIMENSIONS = ("category", "mood", "payment_mode", "weekday", "week", "month")
+FILTERS = ("category", "mood", "payment_mode")
+
+# Monthly rollups, smallest first: (model, dimensions it can answer)
+MONTHLY_LEVELS = [
+    (ExpenseRollupMonth,        {"category", "mood", "payment_mode", "month"}),
+    (ExpenseRollupMonthWeekday, {"category", "mood", "payment_mode", "month", "weekday"}),
+]
+# Each rollup's grain columns; with category, mood and payment_mode they make up its key
+GRAINS = {
+    ExpenseRollup:             ("day",),
+    ExpenseRollupMonth:        ("month",),
+    ExpenseRollupMonthWeekday: ("month", "weekday"),
+}
+
+NO_MOOD = ""   # stored for expenses without a mood; null in query results
+
+Span = Tuple[Optional[date], Optional[date]]
+
+
+def _value(v):
+    return getattr(v, "value", v)
+
+
+def _add(buckets: Dict[tuple, List[int]], key: tuple, total: int, count: int) -> None:
+    bucket = buckets.get(key)
+    if bucket is None:
+        buckets[key] = [total, count]
+    else:
+        bucket[0] += total
+        bucket[1] += count
+
+
+def _roll_up(days: Dict[tuple, List[int]]) -> Dict[object, Dict[tuple, List[int]]]:
+    """{(day, category, mood, payment_mode): [total, count]} summed into every rollup's keys."""
+    weekdays: Dict[tuple, List[int]] = {}
+    for (day, *rest), (total, count) in days.items():
+        _add(weekdays, (day.strftime("%Y-%m"), day.weekday(), *rest), total, count)
+    months: Dict[tuple, List[int]] = {}
+    for (month, _, *rest), (total, count) in weekdays.items():
+        _add(months, (month, *rest), total, count)
+    return {ExpenseRollup: days, ExpenseRollupMonth: months, ExpenseRollupMonthWeekday: weekdays}
+
+
+# ─── Maintenance ──────────────────────────────────────────────────────────────
+
+def record(db: Session, expenses: Iterable[tuple], sign: int = 1) -> None:
+    """
+    Add (sign=1) or remove (sign=-1) (date, category, mood, payment_mode,
+    amount) tuples. Runs inside the caller's transaction.
+    """
+    days: Dict[tuple, List[int]] = {}
+    for day, category, mood, payment_mode, amount in expenses:
+        _add(days, (day, _value(category), _value(mood) or NO_MOOD, payment_mode or "upi"), amount, 1)
+    if not days:
+        return
+    user_id = db.info["user_id"]
+    for model, buckets in _roll_up(days).items():
+        _upsert(db, model, buckets, user_id, sign)
+
+
+def _upsert_statement(model):
+    table = model.__table__
+    stmt = sqlite_insert(table)
+    return stmt.on_conflict_do_update(
+        index_elements=list(table.primary_key.columns),
+        set_={"total": table.c.total + stmt.excluded.total, "count": table.c.count + stmt.excluded.count},
+    )
+
+
+# Built once, on the Core table, and run with one parameter set per row, so
+# the compiled SQL is reused and rows skip the ORM bulk-insert path; a
+# multi-row VALUES would be compiled again on every write.
+_UPSERTS = {model: _upsert_statement(model) for model in GRAINS}
+
+
+def _upsert(db: Session, model, buckets: Dict[tuple, List[int]], user_id: int, sign: int) -> None:
+    names = GRAINS[model] + ("category", "mood", "payment_mode")
+    db.execute(_UPSERTS[model], [
+        dict(zip(names, key), user_id=user_id, total=sign * total, count=sign * count)
+        for key, (total, count) in buckets.items()
+    ])
+
+
+def _fill_statements(user_id: Optional[int]) -> list:
+    """
+    INSERT … SELECT for every rollup, each from the one before it, in order;
+    every user's rows when user_id is None.
+    """
+    def from_select(model, source, grain: list):
+        keys = [source.c.category, source.c.mood, source.c.payment_mode]
+        stmt = (
+            select(source.c.user_id, *grain, *keys, func.sum(source.c.total), func.sum(source.c.count))
+            .group_by(source.c.user_id, *grain, *keys)
+        )
+        if user_id is not None:
+            stmt = stmt.where(source.c.user_id == user_id)
+        names = ["user_id", *GRAINS[model], "category", "mood", "payment_mode", "total", "count"]
+        return insert(model).from_select(names, stmt)
+
+    expenses = (
+        select(Expense.user_id, Expense.date.label("day"), Expense.category,
+               func.coalesce(Expense.mood, NO_MOOD).label("mood"), Expense.payment_mode,
+               Expense.amount.label("total"), cast(1, Integer).label("count"))
+        .subquery()
+    )
+    day = ExpenseRollup.__table__
+    month_weekday = ExpenseRollupMonthWeekday.__table__
+    return [
+        from_select(ExpenseRollup, expenses, [expenses.c.day]),
+        from_select(ExpenseRollupMonthWeekday, day,
+                    [func.substr(day.c.day, 1, 7), (cast(func.strftime("%w", day.c.day), Integer) + 6) % 7]),
+        from_select(ExpenseRollupMonth, month_weekday, [month_weekday.c.month]),
+    ]
+
+
+def rebuild(db: Session) -> None:
+    """Recompute the session user's rollups from the raw expenses table. Caller commits."""
+    for model in GRAINS:
+        db.query(model).delete(synchronize_session=False)
+    for stmt in _fill_statements(db.info["user_id"]):
+        db.execute(stmt)
+
+
+def backfill(conn: Connection) -> None:
+    """Recompute the rollups of every user in the database behind conn (migrations)."""
+    for model in GRAINS:
+        conn.execute(delete(model))
+    for stmt in _fill_statements(None):
+        conn.execute(stmt)
+
+
+def verify(db: Session) -> List[dict]:
+    """
+    Compare the rollups against the raw table, in verify_expense_totals()'s
+    format: dimension is the rollup table, key its key joined with '/'.
+    """
+    mood = func.coalesce(Expense.mood, NO_MOOD)
+    days = {
+        (day, category, m, mode): [total, count]
+        for day, category, m, mode, total, count in db.query(
+            Expense.date, Expense.category, mood, Expense.payment_mode,
+            func.sum(Expense.amount), func.count(),
+        ).group_by(Expense.date, Expense.category, mood, Expense.payment_mode)
+    }
+
+    drift = []
+    for model, expected in _roll_up(days).items():
+        columns = [getattr(model, name) for name in GRAINS[model]]
+        stored = {
+            tuple(key): [total, count]
+            for *key, total, count in db.query(
+                *columns, model.category, model.mood, model.payment_mode, model.total, model.count,
+            )
+            if count != 0 or total != 0
+        }
+        for key in sorted(set(expected) | set(stored)):
+            want = expected.get(key, [0, 0])
+            have = stored.get(key, [0, 0])
+            if want != have:
+                drift.append({
+                    "dimension": model.__tablename__,
+                    "key":       "/".join(str(part) for part in key),
+                    "stored_total":   have[0],
+                    "actual_total":   want[0],
+                    "stored_count":   have[1],
+                    "actual_count":   want[1],
+                })
+    return drift
+
+
+# ─── Queries ──────────────────────────────────────────────────────────────────
+
+def _next_month(d: date) -> date:
+    return date(d.year + d.month // 12, d.month % 12 + 1, 1)
+
+
+def _month_end(d: date) -> bool:
+    return d.day == calendar.monthrange(d.year, d.month)[1]
+
+
+def plan(dimensions: Sequence[str], date_from: Optional[date], date_to: Optional[date]) -> List[tuple]:
+    """
+    The (rollup, span) reads that cover [date_from, date_to] (None = open):
+    whole months from the smallest monthly rollup with every dimension, the
+    rest from expense_rollup.
+    """
+    level = next((model for model, dims in MONTHLY_LEVELS if dims.issuperset(dimensions)), None)
+    if level is None:
+        return [(ExpenseRollup, (date_from, date_to))]
+    first = date_from if date_from is None or date_from.day == 1 else _next_month(date_from)
+    last = date_to if date_to is None or _month_end(date_to) else date_to.replace(day=1) - timedelta(days=1)
+    if first is not None and last is not None and first > last:
+        return [(ExpenseRollup, (date_from, date_to))]
+
+    reads = [(level, (first, last))]
+    if date_from is not None and date_from < first:
+        reads.append((ExpenseRollup, (date_from, first - timedelta(days=1))))
+    if date_to is not None and last < date_to:
+        reads.append((ExpenseRollup, (last + timedelta(days=1), date_to)))
+    return reads
+
+
+def _dimension_columns(model) -> dict:
+    columns = {"category": model.category, "mood": model.mood, "payment_mode": model.payment_mode}
+    if model is ExpenseRollup:
+        day = model.day
+        columns["weekday"] = (cast(func.strftime("%w", day), Integer) + 6) % 7
+        columns["week"] = func.date(day, "weekday 0", "-6 days")   # the Sunday on or after, back to its Monday
+        columns["month"] = func.substr(day, 1, 7)
+    else:
+        columns["month"] = model.month
+        if model is ExpenseRollupMonthWeekday:
+            columns["weekday"] = model.weekday
+    return columns
+
+
+def _accumulate(cells: Dict[tuple, List[int]], db: Session, model, dimensions: Sequence[str],
+                span: Span, filters: Dict[str, list]) -> None:
+    columns = _dimension_columns(model)
+    keys = [columns[d].label(d) for d in dimensions]
+    query = db.query(*keys, func.sum(model.total), func.sum(model.count))
+
+    start, end = span
+    if model is ExpenseRollup:
+        when = model.day
+    else:
+        start = start and start.strftime("%Y-%m")
+        end = end and end.strftime("%Y-%m")
+        when = model.month
+    if start is not None:
+        query = query.filter(when >= start)
+    if end is not None:
+        query = query.filter(when <= end)
+    for name, values in filters.items():
+        query = query.filter(columns[name].in_(values))
+
+    mood = dimensions.index("mood") if "mood" in dimensions else None
+    for *key, total, count in query.group_by(*keys):
+        if count is None:   # no dimensions and no rows: one row of NULL sums
+            continue
+        if mood is not None and key[mood] == NO_MOOD:
+            key[mood] = None
+        _add(cells, tuple(key), total, count)
+
+
+def _sort_key(key: tuple) -> tuple:
+    # No mood sorts first; values within one dimension are all str or all int.
+    return tuple((v is not None, v if v is not None else 0) for v in key)
+
+
+def query(
+    db: Session,
+    dimensions: Sequence[str],
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None,
+    filters: Optional[Dict[str, list]] = None,
+) -> dict:
+    """
+    Sums and counts of the session user's expenses in [date_from, date_to]
+    grouped by `dimensions` (in DIMENSIONS), optionally restricted to some
+    values of the FILTERS dimensions. Shaped like schemas.CubeOut.
+    """
+    dimensions = list(dict.fromkeys(_value(d) for d in dimensions))
+    filters = {
+        name: [_value(v) for v in values]
+        for name, values in (filters or {}).items() if values
+    }
+
+    cells: Dict[tuple, List[int]] = {}
+    if date_from is None or date_to is None or date_from <= date_to:
+        for model, span in plan(dimensions, date_from, date_to):
+            _accumulate(cells, db, model, dimensions, span, filters)
+
+    rows, grand_total, grand_count = [], 0, 0
+    for key in sorted(cells, key=_sort_key):
+        total, count = cells[key]
+        if count == 0:   # every expense in it has been deleted
+            continue
+        rows.append({**dict(zip(dimensions, key)), "total": total, "count": count})
+        grand_total += total
+        grand_count += count
+    return {
+        "dimensions": dimensions,
+        "date_from":  date_from,
+        "date_to":    date_to,
+        "cells":      rows,
+        "total":      grand_total,
+        "count":      grand_count,
+    }
@@ -1,37 +1,331 @@
-from sqlalchemy import create_engine, text
-from sqlalchemy.orm import sessionmaker
-from models import Base
+import os
+import sqlite3
+import threading
+import time
 
-DATABASE_URL = "sqlite:///./spender.db"
+from fastapi import Depends
+from sqlalchemy import bindparam, create_engine, event, select
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.pool import NullPool
+from sqlalchemy.orm import Session, sessionmaker, with_loader_criteria
+import metrics
+import migrations
+from auth import DEFAULT_USER_ID, MULTI_USER, current_user
+from models import Base, DataVersion, User, UserOwned
 
-engine = create_engine(DATABASE_URL, connect_args={"check_same_thread": False})
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+DATABASE_URL = os.getenv("SPENDER_DATABASE_URL", "sqlite:///./spender.db")
 
+# ─── SQLite performance profile ───────────────────────────────────────────────
+# SPENDER_DB_PROFILE=performance (default): WAL journal + synchronous=NORMAL, so
+#   readers never block the writer and a commit is an append to the WAL rather
+#   than an fsync of the main file. Durable against app crashes; the last few
+#   commits can be lost on power failure.
+# SPENDER_DB_PROFILE=safe: SQLite defaults (rollback journal, synchronous=FULL).
+DB_PROFILE = os.getenv("SPENDER_DB_PROFILE", "performance")
 
-def init_db():
-    Base.metadata.create_all(bind=engine)
-    _migrate()
+SQLITE_PRAGMAS = {
+    "performance": {
+        "journal_mode": "WAL",
+        "synchronous":  "NORMAL",
+        "temp_store":   "MEMORY",
+        "foreign_keys": "ON",
+        "cache_size":   -int(os.getenv("SPENDER_SQLITE_CACHE_KB", "65536")),        # negative = KiB
+        "mmap_size":    int(os.getenv("SPENDER_SQLITE_MMAP_BYTES", str(256 * 1024 * 1024))),
+        "busy_timeout": int(os.getenv("SPENDER_SQLITE_BUSY_TIMEOUT_MS", "5000")),
+    },
+    "safe": {
+        "journal_mode": "DELETE",
+        "synchronous":  "FULL",
+        "foreign_keys": "ON",
+        "busy_timeout": int(os.getenv("SPENDER_SQLITE_BUSY_TIMEOUT_MS", "5000")),
+    },
+}
+
+
+if DB_PROFILE not in SQLITE_PRAGMAS:
+    raise ValueError(f"SPENDER_DB_PROFILE must be one of {sorted(SQLITE_PRAGMAS)}, got {DB_PROFILE!r}")
+
+
+def _engine_kwargs(url: str) -> dict:
+    kwargs = {}
+    if url.startswith("sqlite"):
+        kwargs["connect_args"] = {"check_same_thread": False}
+        if ":memory:" in url or url.rstrip("/") == "sqlite:":
+            return kwargs
+    kwargs.update(
+        pool_size=int(os.getenv("SPENDER_DB_POOL_SIZE", "5")),
+        max_overflow=int(os.getenv("SPENDER_DB_MAX_OVERFLOW", "10")),
+        pool_timeout=float(os.getenv("SPENDER_DB_POOL_TIMEOUT", "30")),
+    )
+    return kwargs
+
+
+engine = create_engine(DATABASE_URL, **_engine_kwargs(DATABASE_URL))
+# Single-user mode scopes every session to the default user; in multi-user
+# mode sessions that touch user data must come from user_session().
+SessionLocal = sessionmaker(
+    autocommit=False, autoflush=False, bind=engine,
+    info={} if MULTI_USER else {"user_id": DEFAULT_USER_ID},
+)
+
+
+@event.listens_for(engine, "connect")
+def _apply_sqlite_pragmas(dbapi_connection, connection_record):
+    """Applied to every new pooled connection — PRAGMAs are per-connection in SQLite."""
+    if engine.dialect.name != "sqlite":
+        return
+    cursor = dbapi_connection.cursor()
+    try:
+        for pragma, value in SQLITE_PRAGMAS[DB_PROFILE].items():
+            cursor.execute(f"PRAGMA {pragma}={value}")
+    finally:
+        cursor.close()
+
+
+# ─── Query instrumentation ────────────────────────────────────────────────────
+# Counts and times every statement for the request that issued it (metrics.py)
+# and logs the ones slower than SPENDER_SLOW_QUERY_MS. The start time is kept
+# on the statement's execution context, so a statement that raises (and never
+# reaches after_cursor_execute) leaves nothing behind on the connection.
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    context._spender_started = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    metrics.record_query(statement, time.perf_counter() - context._spender_started)
+
+
+def _instrument(sync_engine) -> None:
+    event.listen(sync_engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(sync_engine, "after_cursor_execute", _after_cursor_execute)
+
+
+if metrics.ENABLED:
+    _instrument(engine)
+
+    @event.listens_for(Base, "load", propagate=True)
+    def _count_loaded_row(target, context):
+        metrics.record_row_loaded()
+
+
+# ─── Per-user scoping ─────────────────────────────────────────────────────────
+# A session's info["user_id"] adds user_id = :user to every ORM select, update
+# and delete on UserOwned tables, and is stamped on new UserOwned rows at
+# flush. Core inserts and raw-cursor scans (columnar.py, recurring._scan) set
+# or filter user_id themselves. Listening on Session covers AsyncSession too.
+
+@event.listens_for(Session, "do_orm_execute")
+def _scope_to_user(state):
+    if not (state.is_select or state.is_update or state.is_delete):
+        return
+    user_id = state.session.info.get("user_id")
+    if user_id is None:
+        if MULTI_USER and any(issubclass(m.class_, UserOwned) for m in state.all_mappers):
+            raise RuntimeError("user data queried from a session without a user; use user_session()")
+        return
+    state.statement = state.statement.options(with_loader_criteria(
+        UserOwned, lambda cls: cls.user_id == user_id, include_aliases=True, track_closure_variables=False,
+    ))
+
+
+@event.listens_for(Session, "before_flush")
+def _stamp_user(session, flush_context, instances):
+    user_id = session.info.get("user_id")
+    if user_id is None:
+        return
+    for obj in session.new:
+        if isinstance(obj, UserOwned) and obj.user_id is None:
+            obj.user_id = user_id
+
+
+def session_user(db) -> int:
+    """The user a (sync or async) session is scoped to."""
+    return db.info["user_id"]
+
+
+# ─── Data versions ────────────────────────────────────────────────────────────
+# A user session that wrote anything, through the ORM or a Core statement,
+# bumps the user's data_versions row just before it commits, in the same
+# transaction. cache.py keys ETags and cached bodies on that version, so a
+# write on one worker is seen by all of them, and by the next process.
+
+_BUMP_VERSION = (
+    sqlite_insert(DataVersion.__table__)
+    .values(id=bindparam("user_id"), version=1)
+    .on_conflict_do_update(index_elements=["id"], set_={"version": DataVersion.__table__.c.version + 1})
+    .returning(DataVersion.__table__.c.version)
+)
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _note_statement_write(state):
+    if state.is_insert or state.is_update or state.is_delete:
+        state.session.info["wrote"] = True
+
+
+@event.listens_for(Session, "before_commit")
+def _bump_data_version(session):
+    user_id = session.info.get("user_id")
+    wrote = session.info.get("wrote") or session.new or session.dirty or session.deleted
+    if user_id is None or not wrote:
+        return
+    session.info["committed_version"] = session.execute(_BUMP_VERSION, {"user_id": user_id}).scalar_one()
+
+
+@event.listens_for(Session, "after_commit")
+@event.listens_for(Session, "after_rollback")
+def _clear_write_flag(session):
+    session.info.pop("wrote", None)
+
+
+def _version_of(user_id: int):
+    return select(DataVersion.version).where(DataVersion.id == user_id)
 
 
-def _migrate():
-    """Add new columns to existing tables if they don't exist (SQLite-safe)."""
+def data_version(db: Session) -> int:
+    """The session user's current data version (one primary-key read)."""
+    return db.scalar(_version_of(session_user(db))) or 0
+
+
+async def data_version_async(db) -> int:
+    """data_version() for an AsyncSession."""
+    return await db.scalar(_version_of(session_user(db))) or 0
+
+
+def committed_version(db: Session) -> int:
+    """The data version the session's last commit wrote; call after commit()."""
+    version = db.info.get("committed_version")
+    return data_version(db) if version is None else version
+
+
+# ─── Optional shard-per-user files ────────────────────────────────────────────
+# SPENDER_SHARD_DIR=<dir> keeps each user's rows in <dir>/user_<id>.db; the
+# main database keeps only the users table. A user's queries then never share
+# pages, locks or a WAL with anyone else's.
+#
+# All shards go through one unpooled engine whose creator opens the file
+# user_session() asks for. One engine means one compiled-statement cache:
+# an engine per shard would recompile every query the first time each user
+# shows up. Opening a SQLite file per session is cheap next to that.
+SHARD_DIR = os.getenv("SPENDER_SHARD_DIR")
+
+_shard_target = threading.local()
+_shard_migrate_lock = threading.Lock()
+_current_shards: set = set()   # shard paths already checked by migrations.migrate()
+
+
+def shard_path(user_id: int) -> str:
+    return os.path.join(SHARD_DIR, f"user_{int(user_id)}.db")
+
+
+def _connect_shard():
+    return sqlite3.connect(_shard_target.path, check_same_thread=False)
+
+
+class _ShardSession(Session):
+    """Bound to its own shard connection, which closes with the session."""
+
+    def close(self) -> None:
+        super().close()
+        self.bind.close()
+
+
+if SHARD_DIR:
+    shard_engine = create_engine(
+        f"sqlite:///{os.path.join(SHARD_DIR, 'user_N.db')}", creator=_connect_shard, poolclass=NullPool,
+    )
+    event.listen(shard_engine, "connect", _apply_sqlite_pragmas)
+    if metrics.ENABLED:
+        _instrument(shard_engine)
+    ShardSession = sessionmaker(class_=_ShardSession, autocommit=False, autoflush=False)
+
+
+def _shard_connection(user_id: int):
+    path = shard_path(user_id)
+    _shard_target.path = path
+    try:
+        conn = shard_engine.connect()
+    finally:
+        del _shard_target.path
+    if path not in _current_shards:
+        # New shards are created here; existing ones are brought up to date
+        # the first time this process opens them.
+        with _shard_migrate_lock:
+            try:
+                migrations.migrate(conn, user_id)
+            except BaseException:
+                conn.close()
+                raise
+            _current_shards.add(path)
+    return conn
+
+
+def user_session(user_id: int) -> Session:
+    """A session scoped to one user, on their shard in shard mode."""
+    if SHARD_DIR:
+        return ShardSession(bind=_shard_connection(user_id), info={"user_id": user_id})
+    return SessionLocal(info={"user_id": user_id})
+
+
+def init_db():
+    """Migrate the main database (see migrations.py) and make sure the default user exists."""
+    if SHARD_DIR:
+        os.makedirs(SHARD_DIR, exist_ok=True)
     with engine.connect() as conn:
-        # Check and add initial_savings to goals
-        cols = [row[1] for row in conn.execute(text("PRAGMA table_info(goals)"))]
-        if "initial_savings" not in cols:
-            conn.execute(text("ALTER TABLE goals ADD COLUMN initial_savings INTEGER NOT NULL DEFAULT 0"))
-            conn.commit()
+        migrations.migrate(conn)
+    _seed_default_user()
+
+
+# ─── Optional async engine ────────────────────────────────────────────────────
+# SPENDER_ASYNC_DB=1 serves the read-heavy endpoints (dashboard, analytics,
+# simulate) as async routes over aiosqlite instead of on the threadpool.
+# Writes stay on the sync engine: SQLite has a single writer either way.
+ASYNC_DB = os.getenv("SPENDER_ASYNC_DB", "0") == "1"
+
+async_engine = None
+AsyncSessionLocal = None
+
+if ASYNC_DB:
+    try:
+        import aiosqlite  # noqa: F401
+        from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+    except ImportError as exc:
+        raise RuntimeError(
+            "SPENDER_ASYNC_DB=1 requires aiosqlite and greenlet "
+            "(pip install aiosqlite 'sqlalchemy[asyncio]')"
+        ) from exc
 
-        # Check and add payment_mode to expenses
-        ecols = [row[1] for row in conn.execute(text("PRAGMA table_info(expenses)"))]
-        if "payment_mode" not in ecols:
-            conn.execute(text("ALTER TABLE expenses ADD COLUMN payment_mode TEXT NOT NULL DEFAULT 'upi'"))
-            conn.commit()
+    if SHARD_DIR:
+        raise RuntimeError("SPENDER_SHARD_DIR is not supported together with SPENDER_ASYNC_DB=1")
 
+    ASYNC_DATABASE_URL = DATABASE_URL.replace("sqlite://", "sqlite+aiosqlite://", 1)
+    async_engine = create_async_engine(ASYNC_DATABASE_URL, **_engine_kwargs(DATABASE_URL))
+    AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+    event.listen(async_engine.sync_engine, "connect", _apply_sqlite_pragmas)
+    if metrics.ENABLED:
+        _instrument(async_engine.sync_engine)
 
-def get_db():
+
+def _seed_default_user():
+    """The single-user deployment's owner; existing rows migrate to this id."""
     db = SessionLocal()
+    try:
+        if db.get(User, DEFAULT_USER_ID) is None:
+            db.add(User(id=DEFAULT_USER_ID, name="default"))
+            db.commit()
+    finally:
+        db.close()
+
+
+def get_db(user_id: int = Depends(current_user)):
+    db = user_session(user_id)
     try:
         yield db
     finally:
         db.close()
+
+
+async def get_async_db(user_id: int = Depends(current_user)):
+    async with AsyncSessionLocal(info={"user_id": user_id}) as db:
+        yield db
@@ -1,43 +1,495 @@
 from datetime import date, timedelta, datetime
-from typing import Optional, List
+from functools import cached_property
+import os
+from typing import Optional, List, TYPE_CHECKING
+from sqlalchemy import event, func, literal, union_all
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 from sqlalchemy.orm import Session
-from models import Goal, Expense, WeeklyLimit, BalanceLedger, WeeklyHistory
-from schemas import ProjectionOut, BalanceState, AnalyticsOut, WeeklyHistoryOut, CategoryBreakdownItem, DailySpendItem
+from models import (
+    Goal, Expense, ExpenseTotal, WeeklyLimit, BalanceLedger, BalanceCheckpoint,
+    WeeklyHistory, WeeklyHistoryStats,
+)
+from schemas import (
+    ProjectionOut, BalanceState, AnalyticsOut,
+    DashboardOut, SimulateOut, MonteCarloOut,
+)
+
+import cube
+import metrics
+import recurring
+
+if TYPE_CHECKING:
+    from sqlalchemy.ext.asyncio import AsyncSession
+
+
+def _user(db: Session) -> int:
+    """The user db is scoped to (see database.user_session)."""
+    return db.info["user_id"]
 
 
 def get_week_start(d: date) -> date:
     return d - timedelta(days=d.weekday())
 
 
-def get_or_create_weekly_limit(db: Session, goal: Optional[Goal], ref_date: date = None) -> WeeklyLimit:
-    if ref_date is None:
-        ref_date = date.today()
-    week_start = get_week_start(ref_date)
+def default_weekly_cap(goal: Optional[Goal]) -> int:
+    if not goal:
+        return 4000
+    usable = goal.monthly_income - goal.emi - goal.rent
+    return max(1000, usable // 4)
+
+
+def _add_weekly_spend_statement():
+    table = WeeklyLimit.__table__
+    stmt = sqlite_insert(table)
+    return stmt.on_conflict_do_update(
+        index_elements=[table.c.user_id, table.c.week_start_date],
+        set_={"spent_this_week": table.c.spent_this_week + stmt.excluded.spent_this_week},
+    )
+
+
+# Built once and run with one parameter set per row, as cube._UPSERTS.
+_ADD_WEEKLY_SPEND = _add_weekly_spend_statement()
+
+
+def add_weekly_spend(db: Session, goal: Optional[Goal], spend_by_week: dict) -> None:
+    """
+    Add {week_start: amount} to spent_this_week with one upsert, creating
+    missing weeks at the goal's default cap. Runs inside the caller's transaction.
+    """
+    if not spend_by_week:
+        return
+    cap = default_weekly_cap(goal)
+    user_id = _user(db)
+    db.execute(_ADD_WEEKLY_SPEND, [
+        {"user_id": user_id, "week_start_date": week, "weekly_cap": cap, "spent_this_week": amount}
+        for week, amount in spend_by_week.items()
+    ])
+
+
+def remove_weekly_spend(db: Session, week_start: date, amount: int) -> None:
+    """Take `amount` back off a week's spend (never below 0). Caller commits."""
+    db.query(WeeklyLimit).filter(WeeklyLimit.week_start_date == week_start).update(
+        {WeeklyLimit.spent_this_week: func.max(0, WeeklyLimit.spent_this_week - amount)},
+        synchronize_session=False,
+    )
+
+
+def get_weekly_limit(db: Session, goal: Optional[Goal], ref_date: date = None) -> WeeklyLimit:
+    """
+    The week's limit. A week with no row yet (nothing spent, cap unchanged)
+    gets an unsaved one at the goal's default cap, so reads never write;
+    add_weekly_spend() and set_weekly_cap() create the row.
+    """
+    week_start = get_week_start(ref_date or date.today())
     wl = db.query(WeeklyLimit).filter(WeeklyLimit.week_start_date == week_start).first()
     if not wl:
-        cap = 4000
-        if goal:
-            usable = goal.monthly_income - goal.emi - goal.rent
-            cap = max(1000, usable // 4)
-        wl = WeeklyLimit(week_start_date=week_start, weekly_cap=cap, spent_this_week=0)
-        db.add(wl)
-        db.commit()
-        db.refresh(wl)
+        wl = WeeklyLimit(week_start_date=week_start, weekly_cap=default_weekly_cap(goal), spent_this_week=0)
     return wl
 
 
+def set_weekly_cap(db: Session, cap: int, ref_date: date = None) -> None:
+    """Set the week's cap with one upsert, creating its row if needed. Caller commits."""
+    stmt = sqlite_insert(WeeklyLimit).values(
+        user_id=_user(db), week_start_date=get_week_start(ref_date or date.today()),
+        weekly_cap=cap, spent_this_week=0,
+    )
+    db.execute(stmt.on_conflict_do_update(
+        index_elements=[WeeklyLimit.user_id, WeeklyLimit.week_start_date],
+        set_={"weekly_cap": stmt.excluded.weekly_cap},
+    ))
+
+
+# ─── Weekly History ───────────────────────────────────────────────────────────
+# Completed weeks are frozen into weekly_history once, and their aggregates are
+# carried in weekly_history_stats (one row per user, id = user id). Freezing
+# happens on the write path, under the transaction's write lock, so two
+# requests never freeze the same week; analytics only reads, folding any
+# completed weeks not frozen yet in memory.
+
+def _get_history_stats(db: Session) -> WeeklyHistoryStats:
+    stats = db.get(WeeklyHistoryStats, _user(db))
+    if stats is None:
+        stats = WeeklyHistoryStats(id=_user(db), weeks=0, spent_sum=0)
+        db.add(stats)
+    return stats
+
+
+def _fold_week(stats: WeeklyHistoryStats, spent: int, saved: int) -> None:
+    stats.weeks += 1
+    stats.spent_sum += spent
+    if saved > 0:
+        stats.best_week_saved = max(stats.best_week_saved or 0, saved)
+    elif saved < 0:
+        stats.worst_week_overspend = max(stats.worst_week_overspend or 0, -saved)
+
+
+def _weeks_after(db: Session, last_frozen_week: Optional[date]):
+    """(week_start_date, weekly_cap, spent_this_week) of every week not frozen yet, oldest first."""
+    query = db.query(WeeklyLimit.week_start_date, WeeklyLimit.weekly_cap, WeeklyLimit.spent_this_week)
+    if last_frozen_week is not None:
+        query = query.filter(WeeklyLimit.week_start_date > last_frozen_week)
+    return query.order_by(WeeklyLimit.week_start_date.asc())
+
+
+def roll_over_weeks(db: Session, today: Optional[date] = None) -> WeeklyHistoryStats:
+    """
+    Freeze every completed week not yet in weekly_history and fold it into the
+    stats row. A no-op (one indexed range read) when nothing new has completed.
+    Call it after the transaction's first write, so it reads under the write
+    lock; caller commits.
+    """
+    current_week_start = get_week_start(today or date.today())
+    stats = _get_history_stats(db)
+
+    query = _weeks_after(db, stats.last_frozen_week).filter(WeeklyLimit.week_start_date < current_week_start)
+    for wl in query:
+        saved = wl.weekly_cap - wl.spent_this_week
+        db.add(WeeklyHistory(
+            week_start_date=wl.week_start_date,
+            weekly_cap=wl.weekly_cap,
+            spent=wl.spent_this_week,
+            saved=saved,
+        ))
+        _fold_week(stats, wl.spent_this_week, saved)
+        stats.last_frozen_week = wl.week_start_date
+    return stats
+
+
+def _snapshot_week_statement():
+    table = WeeklyHistory.__table__
+    stmt = sqlite_insert(table)
+    return stmt.on_conflict_do_update(
+        index_elements=[table.c.user_id, table.c.week_start_date],
+        set_={"weekly_cap": stmt.excluded.weekly_cap, "spent": stmt.excluded.spent, "saved": stmt.excluded.saved},
+    )
+
+
+_SNAPSHOT_WEEK = _snapshot_week_statement()
+
+
+def refresh_frozen_weeks(db: Session, week_starts) -> None:
+    """
+    Re-snapshot already-frozen weeks after a backdated write changed their
+    spend, then recompute the stats row from weekly_history. Only backdated
+    edits pay for this; weeks not frozen yet are left to roll_over_weeks().
+    Caller commits.
+    """
+    stats = db.get(WeeklyHistoryStats, _user(db))
+    if stats is None or stats.last_frozen_week is None:
+        return
+    weeks = {w for w in week_starts if w <= stats.last_frozen_week}
+    if not weeks:
+        return
+
+    db.flush()
+    snapshots = [
+        {
+            "user_id": wl.user_id, "week_start_date": wl.week_start_date, "weekly_cap": wl.weekly_cap,
+            "spent": wl.spent_this_week, "saved": wl.weekly_cap - wl.spent_this_week,
+        }
+        for wl in db.query(WeeklyLimit).filter(WeeklyLimit.week_start_date.in_(weeks))
+    ]
+    if snapshots:
+        db.execute(_SNAPSHOT_WEEK, snapshots)
+
+    weeks_count, spent_sum, best, worst = db.query(
+        func.count(WeeklyHistory.id),
+        func.coalesce(func.sum(WeeklyHistory.spent), 0),
+        func.max(WeeklyHistory.saved).filter(WeeklyHistory.saved > 0),
+        func.max(-WeeklyHistory.saved).filter(WeeklyHistory.saved < 0),
+    ).one()
+    stats.weeks                = weeks_count
+    stats.spent_sum            = spent_sum
+    stats.best_week_saved      = best
+    stats.worst_week_overspend = worst
+
+
+# ─── Expense Listing ──────────────────────────────────────────────────────────
+
+def expense_filters(
+    category: Optional[str] = None,
+    payment_mode: Optional[str] = None,
+    mood: Optional[str] = None,
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None,
+    min_amount: Optional[int] = None,
+    max_amount: Optional[int] = None,
+) -> list:
+    """SQL criteria for the optional expense filters; unset filters are skipped."""
+    criteria = []
+    if category is not None:
+        criteria.append(Expense.category == _key(category))
+    if payment_mode is not None:
+        criteria.append(Expense.payment_mode == payment_mode)
+    if mood is not None:
+        criteria.append(Expense.mood == _key(mood))
+    if date_from is not None:
+        criteria.append(Expense.date >= date_from)
+    if date_to is not None:
+        criteria.append(Expense.date <= date_to)
+    if min_amount is not None:
+        criteria.append(Expense.amount >= min_amount)
+    if max_amount is not None:
+        criteria.append(Expense.amount <= max_amount)
+    return criteria
+
+
+def encode_expense_cursor(expense: Expense) -> str:
+    return f"{expense.date.isoformat()}:{expense.id}"
+
+
+def decode_expense_cursor(cursor: str):
+    """Parse a cursor into (date, id); raises ValueError if malformed."""
+    day, _, expense_id = cursor.partition(":")
+    return date.fromisoformat(day), int(expense_id)
+
+
+def expense_page(db: Session, criteria: list, limit: int, cursor: Optional[str] = None, columns=None):
+    """
+    One page of expenses ordered by (date desc, id desc), resuming strictly
+    after `cursor`. Returns (rows, next_cursor); next_cursor is None on the last page.
+    With `columns` (which must include date and id) the rows are plain tuples.
+    """
+    query = (db.query(*columns) if columns else db.query(Expense)).filter(*criteria)
+    if cursor:
+        after_date, after_id = decode_expense_cursor(cursor)
+        query = query.filter(
+            (Expense.date < after_date)
+            | ((Expense.date == after_date) & (Expense.id < after_id))
+        )
+    rows = query.order_by(Expense.date.desc(), Expense.id.desc()).limit(limit + 1).all()
+    if len(rows) > limit:
+        return rows[:limit], encode_expense_cursor(rows[limit - 1])
+    return rows, None
+
+
+# ─── Aggregate Queries ────────────────────────────────────────────────────────
+
+def aggregate_expenses(db: Session, daily_since: Optional[date] = None) -> dict:
+    """
+    Category, payment-mode and daily totals in a single round trip.
+    Each branch of the UNION ALL is a GROUP BY served by its covering index,
+    so only the grouped rows ever leave SQLite.
+    """
+    by_category = (
+        db.query(literal("category").label("dim"), Expense.category.label("key"),
+                 func.sum(Expense.amount).label("total"), func.count().label("count"))
+        .group_by(Expense.category)
+    )
+    by_mode = (
+        db.query(literal("payment_mode").label("dim"), Expense.payment_mode.label("key"),
+                 func.sum(Expense.amount).label("total"), func.count().label("count"))
+        .group_by(Expense.payment_mode)
+    )
+    selects = [by_category.statement, by_mode.statement]
+    if daily_since is not None:
+        by_day = (
+            db.query(literal("day").label("dim"), Expense.date.label("key"),
+                     func.sum(Expense.amount).label("total"), func.count().label("count"))
+            .filter(Expense.date >= daily_since)
+            .group_by(Expense.date)
+        )
+        selects.append(by_day.statement)
+
+    result = {"by_category": {}, "by_payment_mode": {}, "daily": {}, "total": 0, "count": 0}
+    for dim, key, total, count in db.execute(union_all(*selects)):
+        if dim == "category":
+            result["by_category"][key] = {"total": total, "count": count}
+            result["total"] += total
+            result["count"] += count
+        elif dim == "payment_mode":
+            result["by_payment_mode"][key] = {"total": total, "count": count}
+        else:
+            day = key if isinstance(key, date) else date.fromisoformat(key)
+            result["daily"][day] = {"total": total, "count": count}
+    return result
+
+
+# ─── Running Totals ───────────────────────────────────────────────────────────
+
+def _key(value) -> str:
+    if isinstance(value, date):
+        return value.isoformat()
+    return str(getattr(value, "value", value))
+
+
+def expense_total_deltas(expenses, sign: int = 1) -> List[dict]:
+    """
+    Collapse (amount, category, payment_mode, date) tuples into one
+    expense_totals delta per (dimension, key).
+    """
+    by_dim = {"category": {}, "payment_mode": {}, "day": {}}
+    grand_total, grand_count = 0, 0
+    for amount, category, payment_mode, day in expenses:
+        grand_total += amount
+        grand_count += 1
+        for dim, raw in (("category", category), ("payment_mode", payment_mode or "upi"), ("day", day)):
+            bucket = by_dim[dim]
+            total, count = bucket.get(raw, (0, 0))
+            bucket[raw] = (total + amount, count + 1)
+
+    if not grand_count:
+        return []
+    deltas = [{"dimension": "all", "key": "", "total": sign * grand_total, "count": sign * grand_count}]
+    for dim, bucket in by_dim.items():
+        deltas += [
+            {"dimension": dim, "key": _key(raw), "total": sign * total, "count": sign * count}
+            for raw, (total, count) in bucket.items()
+        ]
+    return deltas
+
+
+def _upsert_expense_totals_statement():
+    table = ExpenseTotal.__table__
+    stmt = sqlite_insert(table)
+    return stmt.on_conflict_do_update(
+        index_elements=[table.c.user_id, table.c.dimension, table.c.key],
+        set_={"total": table.c.total + stmt.excluded.total, "count": table.c.count + stmt.excluded.count},
+    )
+
+
+_UPSERT_EXPENSE_TOTALS = _upsert_expense_totals_statement()
+
+
+def upsert_expense_totals(db: Session, deltas: List[dict]) -> None:
+    if not deltas:
+        return
+    user_id = _user(db)
+    db.execute(_UPSERT_EXPENSE_TOTALS, [dict(d, user_id=user_id) for d in deltas])
+
+
+def apply_expense_totals(db: Session, expense: Expense, sign: int = 1) -> None:
+    """
+    Add (sign=1) or remove (sign=-1) one expense from expense_totals and the
+    cube rollups. Runs inside the caller's transaction; commit together with
+    the Expense row.
+    """
+    row = (expense.amount, expense.category, expense.payment_mode, expense.date)
+    upsert_expense_totals(db, expense_total_deltas([row], sign))
+    cube.record(db, [(expense.date, expense.category, expense.mood, expense.payment_mode, expense.amount)], sign)
+
+
+def _stored_total(db: Session, dimension: str, key: str) -> int:
+    total = (
+        db.query(ExpenseTotal.total)
+        .filter(ExpenseTotal.dimension == dimension, ExpenseTotal.key == key)
+        .scalar()
+    )
+    return total or 0
+
+
+def _stored_totals(db: Session, *dim_keys) -> dict:
+    """Several (dimension, key) totals in one query; missing buckets read as 0."""
+    pairs = set(dim_keys)
+    # IN on both columns is a few equality probes of uq_expense_totals_user_dimension_key;
+    # the cross product can only add rows, dropped below.
+    rows = (
+        db.query(ExpenseTotal.dimension, ExpenseTotal.key, ExpenseTotal.total)
+        .filter(
+            ExpenseTotal.dimension.in_({d for d, _ in pairs}),
+            ExpenseTotal.key.in_({k for _, k in pairs}),
+        )
+        .all()
+    )
+    found = {(d, k): t for d, k, t in rows if (d, k) in pairs}
+    return {pair: found.get(pair, 0) for pair in pairs}
+
+
+def read_expense_totals(db: Session, daily_since: Optional[date] = None) -> dict:
+    """Same shape as aggregate_expenses(), served from expense_totals."""
+    query = db.query(ExpenseTotal).filter(ExpenseTotal.count > 0)
+    if daily_since is None:
+        query = query.filter(ExpenseTotal.dimension != "day")
+    else:
+        query = query.filter(
+            (ExpenseTotal.dimension != "day") | (ExpenseTotal.key >= daily_since.isoformat())
+        )
+
+    result = {"by_category": {}, "by_payment_mode": {}, "daily": {}, "total": 0, "count": 0}
+    for row in query:
+        if row.dimension == "all":
+            result["total"] = row.total
+            result["count"] = row.count
+        elif row.dimension == "category":
+            result["by_category"][row.key] = {"total": row.total, "count": row.count}
+        elif row.dimension == "payment_mode":
+            result["by_payment_mode"][row.key] = {"total": row.total, "count": row.count}
+        else:
+            result["daily"][date.fromisoformat(row.key)] = {"total": row.total, "count": row.count}
+    return result
+
+
+def rebuild_expense_totals(db: Session) -> None:
+    """Recompute expense_totals and the cube rollups from the raw expenses table. Caller commits."""
+    agg = aggregate_expenses(db, daily_since=date.min)
+    rows = [{"dimension": "all", "key": "", "total": agg["total"], "count": agg["count"]}]
+    rows += [
+        {"dimension": "category", "key": k, "total": v["total"], "count": v["count"]}
+        for k, v in agg["by_category"].items()
+    ]
+    rows += [
+        {"dimension": "payment_mode", "key": k, "total": v["total"], "count": v["count"]}
+        for k, v in agg["by_payment_mode"].items()
+    ]
+    rows += [
+        {"dimension": "day", "key": k.isoformat(), "total": v["total"], "count": v["count"]}
+        for k, v in agg["daily"].items()
+    ]
+    user_id = _user(db)
+    db.query(ExpenseTotal).delete()
+    db.bulk_insert_mappings(ExpenseTotal, [dict(r, user_id=user_id) for r in rows])
+    cube.rebuild(db)
+
+
+def verify_expense_totals(db: Session) -> List[dict]:
+    """
+    Compare expense_totals and the cube rollups against the raw table.
+    Returns one entry per drifted (dimension, key); empty list = consistent.
+    """
+    actual = aggregate_expenses(db, daily_since=date.min)
+    expected = {("all", ""): (actual["total"], actual["count"])}
+    for k, v in actual["by_category"].items():
+        expected[("category", k)] = (v["total"], v["count"])
+    for k, v in actual["by_payment_mode"].items():
+        expected[("payment_mode", k)] = (v["total"], v["count"])
+    for k, v in actual["daily"].items():
+        expected[("day", k.isoformat())] = (v["total"], v["count"])
+
+    stored = {
+        (r.dimension, r.key): (r.total, r.count)
+        for r in db.query(ExpenseTotal)
+        if r.count != 0 or r.total != 0
+    }
+
+    drift = []
+    for dim_key in sorted(set(expected) | set(stored)):
+        want = expected.get(dim_key, (0, 0))
+        have = stored.get(dim_key, (0, 0))
+        if want != have:
+            drift.append({
+                "dimension": dim_key[0],
+                "key":       dim_key[1],
+                "stored_total":   have[0],
+                "actual_total":   want[0],
+                "stored_count":   have[1],
+                "actual_count":   want[1],
+            })
+    return drift + cube.verify(db)
+
+
+@metrics.timed
 def compute_clothing_spent(db: Session) -> int:
-    rows = db.query(Expense).filter(Expense.category == "clothes").all()
-    return sum(r.amount for r in rows)
+    return _stored_total(db, "category", "clothes")
 
 
+@metrics.timed
 def compute_cc_total(db: Session) -> int:
     """Sum of all credit-card expenses (never deducted from balance)."""
-    rows = db.query(Expense).filter(Expense.payment_mode == "card").all()
-    return sum(r.amount for r in rows)
+    return _stored_total(db, "payment_mode", "card")
 
 
-def compute_total_saved(db: Session, goal: Goal) -> int:
+@metrics.timed
+def compute_total_saved(db: Session, goal: Goal, total_expenses: Optional[int] = None) -> int:
     if not goal:
         return 0
     today = date.today()
@@ -45,18 +497,21 @@ def compute_total_saved(db: Session, goal: Goal) -> int:
     months_elapsed = max(0, (today.year - created.year) * 12 + (today.month - created.month))
     usable = goal.monthly_income - goal.emi - goal.rent
     total_income_received = usable * months_elapsed
-    total_expenses = sum(e.amount for e in db.query(Expense).all())
+    if total_expenses is None:
+        total_expenses = _stored_total(db, "all", "")
     base = getattr(goal, 'initial_savings', 0) or 0
     return max(0, base + total_income_received - total_expenses)
 
 
-def compute_projection(db: Session, goal: Goal) -> ProjectionOut:
+@metrics.timed
+def compute_projection(db: Session, goal: Goal, total_saved: Optional[int] = None) -> ProjectionOut:
     today    = date.today()
     deadline = goal.deadline
     days_left  = (deadline - today).days
     months_left = max(0.01, days_left / 30.44)
 
-    total_saved      = compute_total_saved(db, goal)
+    if total_saved is None:
+        total_saved  = compute_total_saved(db, goal)
     remaining_target = max(0, goal.target_amount - total_saved)
 
     required_monthly_saving = remaining_target / months_left if months_left > 0 else remaining_target
@@ -84,19 +539,368 @@ def compute_projection(db: Session, goal: Goal) -> ProjectionOut:
     )
 
 
-# ─── Balance Ledger Engine ────────────────────────────────────────────────────
+# ─── Expense Writes ───────────────────────────────────────────────────────────
 
-def compute_balance_state(
+def record_expense(db: Session, fields: dict) -> Expense:
+    """
+    Insert one expense and everything derived from it — running totals,
+    recurring series, weekly spend and (UPI only) the ledger debit — then
+    commit once.
+    """
+    expense = Expense(**fields)
+    expense.signature = recurring.signature(expense.category, expense.note)
+    db.add(expense)
+    apply_expense_totals(db, expense)
+    recurring.observe(db, [
+        (expense.date, expense.amount, expense.category, expense.note, expense.payment_mode),
+    ])
+
+    # Weekly spending counts for both UPI and card
+    goal = db.query(Goal).order_by(Goal.id.desc()).first()
+    week = get_week_start(expense.date)
+    add_weekly_spend(db, goal, {week: expense.amount})
+    refresh_frozen_weeks(db, [week])
+    roll_over_weeks(db)
+
+    # Auto-debit from balance ledger ONLY for UPI payments
+    if expense.payment_mode != "card" and has_balance_anchor(db):
+        record_ledger_entry(
+            db,
+            "debit",
+            expense.amount,
+            note=f"[UPI] {expense.note or expense.category}",
+        )
+
+    db.commit()
+    return expense
+
+
+def remove_expense(db: Session, expense: Expense) -> None:
+    """Delete one expense and reverse everything record_expense() did, in one commit."""
+    week = get_week_start(expense.date)
+    remove_weekly_spend(db, week, expense.amount)
+    refresh_frozen_weeks(db, [week])
+
+    # Reverse the balance debit ONLY for UPI payments
+    mode = getattr(expense, 'payment_mode', 'upi') or 'upi'
+    if mode != "card" and has_balance_anchor(db):
+        record_ledger_entry(
+            db,
+            "credit",
+            expense.amount,
+            note=f"Reversal [UPI]: {expense.note or expense.category}",
+        )
+
+    apply_expense_totals(db, expense, sign=-1)
+    db.delete(expense)
+    db.flush()
+    recurring.forget(db, expense)
+    db.commit()
+
+
+# ─── Request Context ──────────────────────────────────────────────────────────
+
+class ComputationContext:
+    """
+    Request-scoped memo for the dashboard / simulate paths.
+    Goal, weekly limit, expense totals, projection and balance state are each
+    computed at most once, so a dashboard load is a fixed handful of queries
+    (goal, weekly limit, expense totals, balance checkpoint).
+    """
+
+    def __init__(self, db: Session):
+        self.db = db
+
+    @cached_property
+    def goal(self) -> Optional[Goal]:
+        return self.db.query(Goal).order_by(Goal.id.desc()).first()
+
+    @cached_property
+    def weekly_limit(self) -> WeeklyLimit:
+        return get_weekly_limit(self.db, self.goal)
+
+    @cached_property
+    def weekly(self) -> Optional[WeeklyLimit]:
+        return self.weekly_limit if self.goal else None
+
+    @cached_property
+    def totals(self) -> dict:
+        t = _stored_totals(
+            self.db,
+            ("all", ""),
+            ("category", "clothes"),
+            ("payment_mode", "card"),
+        )
+        return {
+            "all":      t[("all", "")],
+            "clothing": t[("category", "clothes")],
+            "card":     t[("payment_mode", "card")],
+        }
+
+    @property
+    def clothing_spent(self) -> int:
+        return self.totals["clothing"]
+
+    @property
+    def clothing_cap(self) -> int:
+        return self.goal.clothing_cap if self.goal else 10000
+
+    @property
+    def cc_total(self) -> int:
+        return self.totals["card"]
+
+    @cached_property
+    def total_saved(self) -> int:
+        return compute_total_saved(self.db, self.goal, total_expenses=self.totals["all"])
+
+    @cached_property
+    def projection(self) -> Optional[ProjectionOut]:
+        if not self.goal:
+            return None
+        return compute_projection(self.db, self.goal, total_saved=self.total_saved)
+
+    @cached_property
+    def balance_state(self) -> Optional[BalanceState]:
+        return compute_balance_state(self.db, self.goal, self.weekly, projection=self.projection)
+
+    def dashboard(self) -> DashboardOut:
+        goal = self.goal
+        return DashboardOut(
+            goal=goal,
+            projection=self.projection,
+            weekly=self.weekly,
+            clothing_spent=self.clothing_spent,
+            clothing_remaining=max(0, self.clothing_cap - self.clothing_spent),
+            balance_state=self.balance_state,
+            cc_total=self.cc_total,
+        )
+
+    def simulate(self, amount: int, category: str) -> SimulateOut:
+        return self.simulate_many([[(amount, category)]])[0]
+
+    def simulate_many(self, scenarios) -> List[SimulateOut]:
+        """
+        Evaluate many what-if scenarios against one base state. Each scenario
+        is a sequence of (amount, category) purchases applied together; the
+        goal, weekly limit, totals and balance are read once for all of them.
+        """
+        goal = self.goal
+        wl   = self.weekly_limit
+        balance_state = self.balance_state
+
+        weekly_left   = wl.weekly_cap - wl.spent_this_week
+        clothing_left = self.clothing_cap - self.clothing_spent
+        if goal:
+            monthly_fixed = goal.emi + goal.rent
+            remaining     = max(0, goal.target_amount - self.total_saved)
+            days_left     = (goal.deadline - date.today()).days
+            months_left   = max(0.01, days_left / 30.44)
+            usable        = goal.monthly_income - goal.emi - goal.rent
+
+        results = []
+        for purchases in scenarios:
+            amount   = sum(a for a, _ in purchases)
+            clothing = [a for a, c in purchases if c == "clothes"]
+
+            clothing_remaining_after = None
+            if clothing:
+                clothing_remaining_after = max(0, clothing_left - sum(clothing))
+
+            # Balance impact
+            actual_balance_after = None
+            safe_to_spend_after  = None
+            if balance_state:
+                actual_balance_after = balance_state.current_balance - amount
+                if goal:
+                    usable_after = max(0, actual_balance_after - monthly_fixed)
+                    safe_to_spend_after = max(0, usable_after - balance_state.locked_for_goal)
+
+            # Projection impact
+            if goal:
+                req = (remaining + amount) / months_left
+                if req <= usable * 0.6:
+                    status, risk = "On Track", "Low"
+                elif req <= usable * 0.85:
+                    status, risk = "Slight Risk", "Medium"
+                else:
+                    status, risk = "High Risk", "High"
+            else:
+                status, risk = "Unknown", "Unknown"
+
+            results.append(SimulateOut(
+                weekly_balance_after=weekly_left - amount,
+                actual_balance_after=actual_balance_after,
+                clothing_remaining_after=clothing_remaining_after,
+                updated_projection_status=status,
+                risk_level=risk,
+                safe_to_spend_after=safe_to_spend_after,
+            ))
+        return results
+
+
+def build_dashboard(db: Session) -> DashboardOut:
+    return ComputationContext(db).dashboard()
+
+
+def build_analytics(db: Session) -> AnalyticsOut:
+    goal = db.query(Goal).order_by(Goal.id.desc()).first()
+    return compute_analytics(db, goal)
+
+
+def simulate_purchase(db: Session, amount: int, category: str) -> SimulateOut:
+    return ComputationContext(db).simulate(amount, category)
+
+
+def simulate_batch(db: Session, scenarios) -> List[SimulateOut]:
+    return ComputationContext(db).simulate_many(scenarios)
+
+
+def simulate_goal_paths(
     db: Session,
-    goal: Optional[Goal],
-    weekly_limit: Optional[WeeklyLimit],
-) -> Optional[BalanceState]:
+    paths: int,
+    history_days: int,
+    amount: int = 0,
+    seed: Optional[int] = None,
+) -> Optional[MonteCarloOut]:
+    """Stochastic counterpart of compute_projection(); None when no goal is set."""
+    import montecarlo   # pulls in NumPy, a good share of process start-up; only this endpoint needs it
+
+    ctx = ComputationContext(db)
+    if not ctx.goal:
+        return None
+    return montecarlo.project_goal(
+        db, ctx.goal, ctx.total_saved,
+        paths=paths, history_days=history_days, amount=amount, seed=seed,
+    )
+
+
+# ─── Async Variants ───────────────────────────────────────────────────────────
+# Used when SPENDER_ASYNC_DB=1. The computations are plain SQLAlchemy ORM code;
+# AsyncSession.run_sync runs them over the aiosqlite connection without
+# blocking the event loop, so sync and async modes share one implementation.
+
+async def build_dashboard_async(db: "AsyncSession") -> DashboardOut:
+    return await db.run_sync(build_dashboard)
+
+
+async def build_analytics_async(db: "AsyncSession") -> AnalyticsOut:
+    return await db.run_sync(build_analytics)
+
+
+async def analytics_fields_async(db: "AsyncSession") -> dict:
+    return await db.run_sync(analytics_fields)
+
+
+async def simulate_purchase_async(db: "AsyncSession", amount: int, category: str) -> SimulateOut:
+    return await db.run_sync(simulate_purchase, amount, category)
+
+
+async def simulate_batch_async(db: "AsyncSession", scenarios) -> List[SimulateOut]:
+    return await db.run_sync(simulate_batch, scenarios)
+
+
+async def simulate_goal_paths_async(db: "AsyncSession", *args, **kwargs) -> Optional[MonteCarloOut]:
+    return await db.run_sync(simulate_goal_paths, *args, **kwargs)
+
+
+# ─── Balance Ledger Engine ────────────────────────────────────────────────────
+
+# One checkpoint row per user; its id is the user id.
+
+def get_balance_checkpoint(db: Session) -> Optional[BalanceCheckpoint]:
+    """The running balance, or None if no 'set' entry exists yet."""
+    return db.get(BalanceCheckpoint, _user(db))
+
+
+def record_ledger_entry(db: Session, type: str, amount: int, note: Optional[str] = None) -> BalanceLedger:
     """
-    Current balance = last 'set' amount
-                    + sum of 'credit' entries after that set
-                    - sum of 'debit'  entries after that set
+    Append one ledger row and move the checkpoint with it.
+    Runs inside the caller's transaction; commit together with the triggering write.
     """
-    # Find the most recent 'set' entry
+    entry = BalanceLedger(type=type, amount=amount, note=note, recorded_at=datetime.utcnow())
+    db.add(entry)
+    db.info.setdefault("ledger_pending", []).append(entry)
+
+    if type == "set":
+        db.flush()
+        checkpoint = get_balance_checkpoint(db) or BalanceCheckpoint(id=_user(db))
+        checkpoint.last_set_id     = entry.id
+        checkpoint.last_set_amount = amount
+        checkpoint.last_set_at     = entry.recorded_at
+        checkpoint.last_set_note   = note
+        checkpoint.credits_since   = 0
+        checkpoint.debits_since    = 0
+        checkpoint.current_balance = amount
+        db.add(checkpoint)
+        _note_balance_anchor(db)
+    else:
+        signed = amount if type == "credit" else -amount
+        column = BalanceCheckpoint.credits_since if type == "credit" else BalanceCheckpoint.debits_since
+        db.query(BalanceCheckpoint).filter(BalanceCheckpoint.id == _user(db)).update(
+            {
+                column: column + amount,
+                BalanceCheckpoint.current_balance: BalanceCheckpoint.current_balance + signed,
+            }
+        )
+    return entry
+
+
+# Entries a session's transactions add wait in info["ledger_pending"] and move
+# to info["ledger_written"] when their transaction commits, so the write's
+# stream event can carry them; rolled-back entries are dropped.
+@event.listens_for(Session, "after_commit")
+def _commit_ledger_entries(session):
+    pending = session.info.pop("ledger_pending", None)
+    if pending:
+        session.info.setdefault("ledger_written", []).extend(pending)
+
+
+@event.listens_for(Session, "after_rollback")
+def _drop_ledger_entries(session):
+    session.info.pop("ledger_pending", None)
+
+
+def ledger_written(db: Session) -> List[BalanceLedger]:
+    """Ledger entries committed through this session since the last call, oldest first."""
+    return db.info.pop("ledger_written", [])
+
+
+# 'set' entries are never deleted, so once one is committed it always will
+# exist; remember that instead of re-reading the checkpoint on every expense
+# write. A session notes the anchors it writes or reads in
+# info["balance_anchors"], and they are remembered only when it commits: a
+# 'set' that is rolled back must not count.
+_balance_anchor_known: set = set()   # user ids
+
+
+def _note_balance_anchor(db: Session) -> None:
+    db.info.setdefault("balance_anchors", set()).add(_user(db))
+
+
+@event.listens_for(Session, "after_commit")
+def _remember_balance_anchors(session):
+    _balance_anchor_known.update(session.info.pop("balance_anchors", ()))
+
+
+@event.listens_for(Session, "after_rollback")
+def _drop_balance_anchors(session):
+    session.info.pop("balance_anchors", None)
+
+
+def has_balance_anchor(db: Session) -> bool:
+    """True once any 'set' entry exists (i.e. the ledger tracks a balance)."""
+    user_id = _user(db)
+    if user_id in _balance_anchor_known or user_id in db.info.get("balance_anchors", ()):
+        return True
+    if get_balance_checkpoint(db) is None:
+        return False
+    _note_balance_anchor(db)
+    return True
+
+
+def rebuild_balance_checkpoint(db: Session) -> Optional[BalanceCheckpoint]:
+    """Recompute the checkpoint by scanning the ledger since the last 'set'. Caller commits."""
+    db.query(BalanceCheckpoint).filter(BalanceCheckpoint.id == _user(db)).delete()
     last_set = (
         db.query(BalanceLedger)
         .filter(BalanceLedger.type == "set")
@@ -106,17 +910,48 @@ def compute_balance_state(
     if not last_set:
         return None
 
-    # Sum credits and debits since that set
-    since = last_set.recorded_at
-    rows_since = (
-        db.query(BalanceLedger)
-        .filter(BalanceLedger.recorded_at > since)
+    sums = dict(
+        db.query(BalanceLedger.type, func.sum(BalanceLedger.amount))
+        .filter(BalanceLedger.recorded_at > last_set.recorded_at)
+        .group_by(BalanceLedger.type)
         .all()
     )
-    total_credits = sum(r.amount for r in rows_since if r.type == "credit")
-    total_debits  = sum(r.amount for r in rows_since if r.type == "debit")
+    credits = sums.get("credit", 0) or 0
+    debits  = sums.get("debit", 0) or 0
+    checkpoint = BalanceCheckpoint(
+        id=_user(db),
+        last_set_id=last_set.id,
+        last_set_amount=last_set.amount,
+        last_set_at=last_set.recorded_at,
+        last_set_note=last_set.note,
+        credits_since=credits,
+        debits_since=debits,
+        current_balance=last_set.amount + credits - debits,
+    )
+    db.add(checkpoint)
+    return checkpoint
+
+
+@metrics.timed
+def compute_balance_state(
+    db: Session,
+    goal: Optional[Goal],
+    weekly_limit: Optional[WeeklyLimit],
+    projection: Optional[ProjectionOut] = None,
+) -> Optional[BalanceState]:
+    """
+    Current balance = last 'set' amount
+                    + sum of 'credit' entries after that set
+                    - sum of 'debit'  entries after that set
+    read from the balance checkpoint maintained by record_ledger_entry().
+    """
+    checkpoint = get_balance_checkpoint(db)
+    if not checkpoint:
+        return None
 
-    current_balance = last_set.amount + total_credits - total_debits
+    total_credits   = checkpoint.credits_since
+    total_debits    = checkpoint.debits_since
+    current_balance = checkpoint.current_balance
 
     # ── Analysis ──────────────────────────────────────────────────────────────
     today = date.today()
@@ -127,7 +962,7 @@ def compute_balance_state(
     # How much must be locked for the goal this month
     locked_for_goal = 0
     if goal:
-        proj = compute_projection(db, goal)
+        proj = projection or compute_projection(db, goal)
         locked_for_goal = max(0, int(proj.required_monthly_saving))
 
     # Weekly remaining
@@ -181,9 +1016,9 @@ def compute_balance_state(
 
     return BalanceState(
         current_balance=current_balance,
-        last_set_amount=last_set.amount,
-        last_set_at=last_set.recorded_at,
-        last_set_note=last_set.note,
+        last_set_amount=checkpoint.last_set_amount,
+        last_set_at=checkpoint.last_set_at,
+        last_set_note=checkpoint.last_set_note,
         total_credits_since=total_credits,
         total_debits_since=total_debits,
         usable_balance=usable_balance,
@@ -201,81 +1036,93 @@ def compute_balance_state(
 
 # ─── Analytics Engine ─────────────────────────────────────────────────────────
 
-def compute_analytics(db: Session, goal: Optional[Goal]) -> AnalyticsOut:
+# Where compute_analytics gets its category / payment-mode / daily totals:
+#   totals   → the incrementally maintained expense_totals table (default)
+#   sql      → GROUP BY over the raw expenses table
+#   columnar → full load into arrays + vectorized group-by (columnar.py)
+ANALYTICS_BACKEND = os.getenv("SPENDER_ANALYTICS_BACKEND", "totals")
+
+
+def _analytics_aggregates(db: Session, daily_since: date) -> dict:
+    if ANALYTICS_BACKEND == "sql":
+        return aggregate_expenses(db, daily_since=daily_since)
+    if ANALYTICS_BACKEND == "columnar":
+        from columnar import aggregate_expenses_columnar
+        return aggregate_expenses_columnar(db, daily_since=daily_since)
+    return read_expense_totals(db, daily_since=daily_since)
+
+
+@metrics.timed
+def analytics_fields(db: Session) -> dict:
+    """AnalyticsOut's fields as plain dicts and lists, in schema order, built without per-row models."""
     today = date.today()
 
-    # ── Weekly history (all WeeklyLimit rows, sorted) ──────────────────────
-    all_wl = db.query(WeeklyLimit).order_by(WeeklyLimit.week_start_date.asc()).all()
+    # ── Weekly history: frozen snapshots + every later week live ─────────────
+    # Completed weeks the write path has not frozen yet are folded into a
+    # copy of the stats here, so this GET never writes.
     current_week_start = get_week_start(today)
+    frozen = db.get(WeeklyHistoryStats, _user(db))
+    stats = WeeklyHistoryStats(weeks=0, spent_sum=0)
+    if frozen is not None:
+        stats.weeks                = frozen.weeks
+        stats.spent_sum            = frozen.spent_sum
+        stats.best_week_saved      = frozen.best_week_saved
+        stats.worst_week_overspend = frozen.worst_week_overspend
+        stats.last_frozen_week     = frozen.last_frozen_week
 
-    weekly_history: List[WeeklyHistoryOut] = []
+    weekly_history = [
+        {"week_start_date": week_start, "weekly_cap": cap, "spent": spent, "saved": saved}
+        for week_start, cap, spent, saved in (
+            db.query(WeeklyHistory.week_start_date, WeeklyHistory.weekly_cap,
+                     WeeklyHistory.spent, WeeklyHistory.saved)
+            .order_by(WeeklyHistory.week_start_date.asc())
+        )
+    ]
     current_week_underspend = None
 
-    for wl in all_wl:
-        saved = wl.weekly_cap - wl.spent_this_week
-        if wl.week_start_date == current_week_start:
+    for week_start, cap, spent in _weeks_after(db, stats.last_frozen_week):
+        saved = cap - spent
+        if week_start < current_week_start:
+            _fold_week(stats, spent, saved)
+        elif week_start == current_week_start:
             current_week_underspend = saved  # positive = under, negative = over
-        weekly_history.append(WeeklyHistoryOut(
-            week_start_date=wl.week_start_date,
-            weekly_cap=wl.weekly_cap,
-            spent=wl.spent_this_week,
-            saved=saved,
-        ))
+        weekly_history.append({"week_start_date": week_start, "weekly_cap": cap, "spent": spent, "saved": saved})
 
-    # ── Category breakdown (all time) ──────────────────────────────────────
-    expenses = db.query(Expense).all()
-    cat_map: dict = {}
-    for e in expenses:
-        if e.category not in cat_map:
-            cat_map[e.category] = {"total": 0, "count": 0}
-        cat_map[e.category]["total"] += e.amount
-        cat_map[e.category]["count"] += 1
+    # ── Category breakdown (all time) + daily spend last 30 days ───────────
+    cutoff = today - timedelta(days=30)
+    agg = _analytics_aggregates(db, daily_since=cutoff)
 
     category_breakdown = [
-        CategoryBreakdownItem(category=cat, total=v["total"], count=v["count"])
-        for cat, v in sorted(cat_map.items(), key=lambda x: -x[1]["total"])
+        {"category": cat, "total": v["total"], "count": v["count"]}
+        for cat, v in sorted(agg["by_category"].items(), key=lambda x: -x[1]["total"])
     ]
 
-    # ── Daily spend last 30 days ────────────────────────────────────────────
-    cutoff = today - timedelta(days=30)
-    recent = [e for e in expenses if e.date >= cutoff]
-    day_map: dict = {}
-    for e in recent:
-        key = e.date
-        day_map[key] = day_map.get(key, 0) + e.amount
-
     daily_spend_30d = [
-        DailySpendItem(date=d, total=t)
-        for d, t in sorted(day_map.items())
+        {"date": d, "total": v["total"]}
+        for d, v in sorted(agg["daily"].items())
     ]
 
     # ── Aggregates ─────────────────────────────────────────────────────────
-    total_spent_all = sum(e.amount for e in expenses)
-    completed_weeks = [w for w in weekly_history if w.week_start_date < current_week_start]
-    avg_weekly_spend = (
-        sum(w.spent for w in completed_weeks) / len(completed_weeks)
-        if completed_weeks else 0.0
-    )
+    total_spent_all = agg["total"]
+    avg_weekly_spend = stats.spent_sum / stats.weeks if stats.weeks else 0.0
+
+    # ── Payment mode totals ──────────────────────────────────────────────────────
+    cc_total  = agg["by_payment_mode"].get("card", {}).get("total", 0)
+    upi_total = total_spent_all - cc_total
 
-    underspends = [w.saved for w in completed_weeks if w.saved > 0]
-    overspends  = [abs(w.saved) for w in completed_weeks if w.saved < 0]
+    return {
+        "weekly_history":          weekly_history,
+        "category_breakdown":      category_breakdown,
+        "daily_spend_30d":         daily_spend_30d,
+        "total_spent_all":         total_spent_all,
+        "avg_weekly_spend":        round(avg_weekly_spend, 0),
+        "best_week_saved":         stats.best_week_saved,
+        "worst_week_overspend":    stats.worst_week_overspend,
+        "current_week_underspend": current_week_underspend,
+        "cc_total":                cc_total,
+        "upi_total":               upi_total,
+    }
 
-    best_week_saved     = max(underspends) if underspends else None
-    worst_week_overspend = max(overspends) if overspends else None
 
-    # ── Payment mode totals ──────────────────────────────────────────────────────
-    cc_total  = sum(e.amount for e in expenses if getattr(e, 'payment_mode', 'upi') == 'card')
-    upi_total = sum(e.amount for e in expenses if getattr(e, 'payment_mode', 'upi') != 'card')
-
-    return AnalyticsOut(
-        weekly_history=weekly_history,
-        category_breakdown=category_breakdown,
-        daily_spend_30d=daily_spend_30d,
-        total_spent_all=total_spent_all,
-        avg_weekly_spend=round(avg_weekly_spend, 0),
-        best_week_saved=best_week_saved,
-        worst_week_overspend=worst_week_overspend,
-        current_week_underspend=current_week_underspend,
-        cc_total=cc_total,
-        upi_total=upi_total,
-    )
+def compute_analytics(db: Session, goal: Optional[Goal]) -> AnalyticsOut:
+    return AnalyticsOut.model_validate(analytics_fields(db))
@@ -0,0 +1,146 @@
+"""
+Server-Sent Events push for open dashboards.
+
+Write endpoints call publish() after they commit. It computes the part of
+the dashboard the write can change once (balance and weekly writes only move
+balance_state / weekly; the rest get the whole dashboard), plus the totals of
+any category the write touched, and fans the same JSON message out to the
+writing user's subscribers of /api/stream. The expense and ledger entries the
+write added travel in the message too.
+Open tabs apply the message in place instead of refetching /api/dashboard,
+/api/expenses and /api/balance/ledger. A whole dashboard body also primes the
+response cache, so a tab that does refetch gets it without another computation.
+
+Subscribers are per process, like cache.py's bodies: with several uvicorn
+workers a tab only hears about writes handled by its own worker, though its
+next refetch is still current (the data version lives in the database).
+"""
+import asyncio
+import threading
+from collections import defaultdict
+from typing import AsyncIterator, Dict, Iterable, Set, Tuple
+
+import cache
+from database import user_session
+from engine import ComputationContext
+from models import ExpenseTotal
+from schemas import CategoryBreakdownItem, StreamEvent
+
+QUEUE_SIZE = 64
+HEARTBEAT_SECONDS = 15
+
+_lock = threading.Lock()
+_subscribers: Dict[int, Set[Tuple[asyncio.AbstractEventLoop, asyncio.Queue]]] = defaultdict(set)   # by user
+
+# Writes that can only move these dashboard fields send just those.
+PARTIAL_EVENTS = {
+    "balance_set":        ("balance_state",),
+    "credit_added":       ("balance_state",),
+    "weekly_cap_updated": ("weekly", "balance_state"),
+}
+
+# Sent instead of the backlog to a subscriber that fell QUEUE_SIZE messages behind.
+RESYNC = StreamEvent(event="resync", version=0).model_dump_json(exclude_unset=True)
+
+
+def has_subscribers(user_id: int) -> bool:
+    return bool(_subscribers.get(user_id))
+
+
+def subscribe(user_id: int) -> Tuple[int, asyncio.AbstractEventLoop, asyncio.Queue]:
+    """Register the calling coroutine's loop; returns the handle for unsubscribe()."""
+    sub = (user_id, asyncio.get_running_loop(), asyncio.Queue(QUEUE_SIZE))
+    with _lock:
+        _subscribers[user_id].add(sub[1:])
+    return sub
+
+
+def unsubscribe(sub) -> None:
+    user_id, loop, queue = sub
+    with _lock:
+        subs = _subscribers.get(user_id)
+        if subs is not None:
+            subs.discard((loop, queue))
+            if not subs:
+                del _subscribers[user_id]
+
+
+def _offer(queue: asyncio.Queue, message: str) -> None:
+    # Runs on the subscriber's loop.
+    if queue.full():
+        while not queue.empty():
+            queue.get_nowait()
+        message = RESYNC
+    queue.put_nowait(message)
+
+
+def broadcast(user_id: int, message: str) -> None:
+    """Thread-safe: write endpoints run on the threadpool, subscribers on the event loop."""
+    with _lock:
+        subs = list(_subscribers.get(user_id, ()))
+    for loop, queue in subs:
+        loop.call_soon_threadsafe(_offer, queue, message)
+
+
+def publish(user_id: int, event: str, version: int, categories: Iterable[str] = (), **extra) -> None:
+    """
+    Compute the user's post-write state once and push it to their open streams.
+    Meant to run as a background task after the write's response is sent,
+    so it opens its own session.
+    """
+    if not has_subscribers(user_id):
+        return
+    db = user_session(user_id)
+    try:
+        _publish(db, user_id, event, version, categories, extra)
+    finally:
+        db.close()
+
+
+def _publish(db, user_id: int, event: str, version: int, categories: Iterable[str], extra: dict) -> None:
+    ctx = ComputationContext(db)
+    fields = PARTIAL_EVENTS.get(event)
+    if fields is None:
+        dashboard = ctx.dashboard()
+        cache.prime(user_id, "dashboard", version, dashboard.model_dump_json().encode())
+        state = {"dashboard": dashboard}
+    else:
+        state = {name: getattr(ctx, name) for name in fields}
+
+    categories = sorted(set(categories))
+    totals = {}
+    if categories:
+        rows = db.query(ExpenseTotal.key, ExpenseTotal.total, ExpenseTotal.count).filter(
+            ExpenseTotal.dimension == "category",
+            ExpenseTotal.key.in_(categories),
+        )
+        totals = {key: (total, count) for key, total, count in rows}
+    message = StreamEvent(
+        event=event,
+        version=version,
+        categories=[
+            CategoryBreakdownItem(category=c, total=totals.get(c, (0, 0))[0], count=totals.get(c, (0, 0))[1])
+            for c in categories
+        ],
+        **state,
+        **extra,
+    )
+    broadcast(user_id, message.model_dump_json(exclude_unset=True))
+
+
+async def stream(request, sub) -> AsyncIterator[str]:
+    """SSE frames for one subscriber until the client disconnects."""
+    _, _, queue = sub
+    try:
+        yield "retry: 3000\n\n"
+        while True:
+            try:
+                message = await asyncio.wait_for(queue.get(), HEARTBEAT_SECONDS)
+            except asyncio.TimeoutError:
+                if await request.is_disconnected():
+                    break
+                yield ": ping\n\n"
+                continue
+            yield f"data: {message}\n\n"
+    finally:
+        unsubscribe(sub)
@@ -0,0 +1,228 @@
+"""
+Streaming exports of expenses and the balance ledger.
+
+Rows are read with column-only queries and yield_per, so memory stays
+bounded by one chunk regardless of history size. Three encodings:
+
+  csv       header row + one line per record
+  ndjson    one JSON object per line
+  columnar  compact binary blocks, one per chunk (see write_columnar_block)
+
+Columnar layout (all integers little-endian):
+
+  file   := b"SPNDCOL1" block*
+  block  := u32 header_len, header (JSON, utf-8), column buffers in header order
+  header := {"rows": n, "columns": [{"name", "type", "nbytes", ["dictionary"]}]}
+
+  type int64     n × i64
+  type date32    n × i32 days since 1970-01-01
+  type ts_us     n × i64 microseconds since 1970-01-01 (naive UTC; -2**63 = null)
+  type dict      n × i32 codes into "dictionary" (-1 = null)
+  type str       n × u8 validity, (n+1) × i32 offsets, utf-8 data
+"""
+import csv
+import io
+import json
+import struct
+import sys
+from array import array
+from datetime import date, datetime, timedelta
+from typing import Iterator, List, Tuple
+
+from sqlalchemy.orm import Session
+
+from models import Expense, BalanceLedger
+
+CHUNK_ROWS = 5000
+COLUMNAR_MAGIC = b"SPNDCOL1"
+
+_EPOCH_DATE = date(1970, 1, 1)
+_EPOCH_DT   = datetime(1970, 1, 1)
+_US         = timedelta(microseconds=1)
+_NULL_TS    = -2 ** 63
+
+# name → (column, columnar type)
+EXPENSE_COLUMNS = [
+    ("id",           Expense.id,           "int64"),
+    ("date",         Expense.date,         "date32"),
+    ("amount",       Expense.amount,       "int64"),
+    ("category",     Expense.category,     "dict"),
+    ("payment_mode", Expense.payment_mode, "dict"),
+    ("mood",         Expense.mood,         "dict"),
+    ("note",         Expense.note,         "str"),
+]
+
+LEDGER_COLUMNS = [
+    ("id",          BalanceLedger.id,          "int64"),
+    ("type",        BalanceLedger.type,        "dict"),
+    ("amount",      BalanceLedger.amount,      "int64"),
+    ("note",        BalanceLedger.note,        "str"),
+    ("recorded_at", BalanceLedger.recorded_at, "ts_us"),
+]
+
+MEDIA_TYPES = {
+    "csv":      "text/csv",
+    "ndjson":   "application/x-ndjson",
+    "columnar": "application/octet-stream",
+}
+
+
+def iter_chunks(db: Session, columns, criteria: list, order_by) -> Iterator[List[tuple]]:
+    """Yield lists of row tuples, CHUNK_ROWS at a time, from a streamed query."""
+    query = (
+        db.query(*[col for _, col, _ in columns])
+        .filter(*criteria)
+        .order_by(order_by)
+        .execution_options(stream_results=True)
+        .yield_per(CHUNK_ROWS)
+    )
+    chunk = []
+    for row in query:
+        chunk.append(tuple(row))
+        if len(chunk) >= CHUNK_ROWS:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+# ─── Encoders ─────────────────────────────────────────────────────────────────
+
+def _plain(value):
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    return value
+
+
+def encode_csv(names: List[str], chunks: Iterator[List[tuple]]) -> Iterator[bytes]:
+    buf = io.StringIO()
+    writer = csv.writer(buf)
+    writer.writerow(names)
+    for chunk in chunks:
+        writer.writerows([[("" if v is None else _plain(v)) for v in row] for row in chunk])
+        yield buf.getvalue().encode()
+        buf.seek(0)
+        buf.truncate()
+    if buf.tell():
+        yield buf.getvalue().encode()
+
+
+def encode_ndjson(names: List[str], chunks: Iterator[List[tuple]]) -> Iterator[bytes]:
+    for chunk in chunks:
+        yield "".join(
+            json.dumps(dict(zip(names, map(_plain, row)))) + "\n" for row in chunk
+        ).encode()
+
+
+def _le(arr: array) -> bytes:
+    if sys.byteorder == "big":
+        arr.byteswap()
+    return arr.tobytes()
+
+
+def _encode_column(kind: str, values: list) -> Tuple[dict, bytes]:
+    if kind == "int64":
+        return {}, _le(array("q", values))
+    if kind == "date32":
+        return {}, _le(array("i", [(v - _EPOCH_DATE).days for v in values]))
+    if kind == "ts_us":
+        return {}, _le(array("q", [
+            _NULL_TS if v is None else (v - _EPOCH_DT) // _US for v in values
+        ]))
+    if kind == "dict":
+        dictionary: dict = {}
+        codes = array("i", [
+            -1 if v is None else dictionary.setdefault(v, len(dictionary)) for v in values
+        ])
+        return {"dictionary": list(dictionary)}, _le(codes)
+    # str
+    validity = bytes(0 if v is None else 1 for v in values)
+    encoded = [(v or "").encode() for v in values]
+    offsets = array("i", [0])
+    for e in encoded:
+        offsets.append(offsets[-1] + len(e))
+    return {}, validity + _le(offsets) + b"".join(encoded)
+
+
+def write_columnar_block(columns, rows: List[tuple]) -> bytes:
+    header = {"rows": len(rows), "columns": []}
+    buffers = []
+    for i, (name, _, kind) in enumerate(columns):
+        meta, data = _encode_column(kind, [row[i] for row in rows])
+        header["columns"].append({"name": name, "type": kind, "nbytes": len(data), **meta})
+        buffers.append(data)
+    head = json.dumps(header, separators=(",", ":")).encode()
+    return struct.pack("<I", len(head)) + head + b"".join(buffers)
+
+
+def encode_columnar(columns, chunks: Iterator[List[tuple]]) -> Iterator[bytes]:
+    yield COLUMNAR_MAGIC
+    for chunk in chunks:
+        yield write_columnar_block(columns, chunk)
+
+
+def read_columnar(data: bytes) -> Iterator[dict]:
+    """Decode a columnar export back into row dicts (for tooling and checks)."""
+    if not data.startswith(COLUMNAR_MAGIC):
+        raise ValueError("not a Spender columnar export")
+    pos = len(COLUMNAR_MAGIC)
+    while pos < len(data):
+        (head_len,) = struct.unpack_from("<I", data, pos)
+        pos += 4
+        header = json.loads(data[pos:pos + head_len])
+        pos += head_len
+        n = header["rows"]
+        cols = {}
+        for col in header["columns"]:
+            buf = data[pos:pos + col["nbytes"]]
+            pos += col["nbytes"]
+            cols[col["name"]] = _decode_column(col, buf, n)
+        for i in range(n):
+            yield {name: values[i] for name, values in cols.items()}
+
+
+def _from_le(typecode: str, buf: bytes) -> array:
+    arr = array(typecode)
+    arr.frombytes(buf)
+    if sys.byteorder == "big":
+        arr.byteswap()
+    return arr
+
+
+def _decode_column(col: dict, buf: bytes, n: int) -> list:
+    kind = col["type"]
+    if kind == "int64":
+        return list(_from_le("q", buf))
+    if kind == "date32":
+        return [_EPOCH_DATE + timedelta(days=d) for d in _from_le("i", buf)]
+    if kind == "ts_us":
+        return [None if v == _NULL_TS else _EPOCH_DT + v * _US for v in _from_le("q", buf)]
+    if kind == "dict":
+        dictionary = col["dictionary"]
+        return [None if c < 0 else dictionary[c] for c in _from_le("i", buf)]
+    validity = buf[:n]
+    offsets = _from_le("i", buf[n:n + 4 * (n + 1)])
+    data = buf[n + 4 * (n + 1):]
+    return [
+        data[offsets[i]:offsets[i + 1]].decode() if validity[i] else None
+        for i in range(n)
+    ]
+
+
+def stream_export(session_factory, columns, criteria: list, order_by, fmt: str) -> Iterator[bytes]:
+    """
+    Generator for StreamingResponse. Opens its own session so the export
+    outlives the request-scoped one; Starlette iterates it on the threadpool.
+    """
+    db = session_factory()
+    try:
+        chunks = iter_chunks(db, columns, criteria, order_by)
+        names = [name for name, _, _ in columns]
+        if fmt == "csv":
+            yield from encode_csv(names, chunks)
+        elif fmt == "ndjson":
+            yield from encode_ndjson(names, chunks)
+        else:
+            yield from encode_columnar(columns, chunks)
+    finally:
+        db.close()
@@ -0,0 +1,61 @@
+"""
+Fast JSON bodies for the list-heavy endpoints.
+
+The response_model path builds a Pydantic model for every ORM row and then
+runs the result through jsonable_encoder and json.dumps. That dominates CPU
+once a response holds thousands of expenses. Here the rows come from
+column-only queries as plain tuples and go straight to orjson, keyed by the
+*Out schema's field names in the schema's order, so the bytes on the wire
+are the same as before.
+
+Opt-in with SPENDER_FAST_JSON=1; by default the endpoints keep the
+response_model path. Without orjson the stdlib encoder is used, which still
+skips the per-row models.
+"""
+import json
+import os
+from datetime import date, datetime
+from typing import Iterable, List, Tuple
+
+from fastapi import Response
+
+from models import BalanceLedger, Expense
+from schemas import BalanceLedgerOut, ExpenseOut
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional dependency
+    orjson = None
+
+ENABLED = os.getenv("SPENDER_FAST_JSON", "0") == "1"
+
+# (wire name, column), in the order the schema serializes them
+EXPENSE_FIELDS: List[Tuple[str, object]] = [(name, getattr(Expense, name)) for name in ExpenseOut.model_fields]
+LEDGER_FIELDS:  List[Tuple[str, object]] = [(name, getattr(BalanceLedger, name)) for name in BalanceLedgerOut.model_fields]
+
+
+def columns(fields) -> list:
+    return [column for _, column in fields]
+
+
+def _default(value):
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+
+def dumps(obj) -> bytes:
+    """Compact UTF-8 JSON, formatted like FastAPI's JSONResponse."""
+    if orjson is not None:
+        return orjson.dumps(obj)
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":"), default=_default).encode()
+
+
+def rows_json(fields, rows: Iterable[tuple]) -> bytes:
+    """A JSON array of objects from row tuples selected with columns(fields)."""
+    names = [name for name, _ in fields]
+    return dumps([dict(zip(names, row)) for row in rows])
+
+
+def response(body: bytes, headers=None) -> Response:
+    return Response(content=body, media_type="application/json", headers=headers)
@@ -0,0 +1,228 @@
+"""
+Cash-flow forecast.
+
+Projects the bank balance one day at a time from today to the goal deadline:
+
+    balance(d) = balance(d - 1)
+               + monthly_income - emi - rent    on the 1st of each month
+               - expected UPI spend for d's weekday
+
+The starting point is the balance checkpoint. Expected spend is the average
+UPI spend per weekday over the last HISTORY_WEEKS weeks. Rent/EMI expenses
+are left out because the goal's fixed costs already cover them. Card spend
+is left out because it never touches the balance (see record_expense()).
+Active recurring series (recurring.py) are scheduled on their own dates
+instead, and their past expenses are kept out of the weekday average.
+
+The model inputs (start balance, per-weekday spend sums, recurring schedule,
+goal terms) are kept in memory per user, tagged with the data version
+(database.data_version()) they were built at, for the cache.MAX_USERS most
+recently active users. expense_written() folds a single expense add/delete
+into them without touching the database. Every other commit bumps the
+version in the database, whichever worker or manage.py command made it,
+and the next request rebuilds the inputs with a few small queries. Turning
+the inputs into the timeline is a few hundred additions.
+"""
+import os
+import threading
+from collections import OrderedDict
+from datetime import date, timedelta
+from typing import List, Optional
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+import cache
+import recurring
+from database import data_version
+from models import BalanceCheckpoint, Expense, ExpenseTotal, Goal
+from schemas import ForecastOut, ForecastPoint
+
+HISTORY_WEEKS = int(os.getenv("SPENDER_FORECAST_HISTORY_WEEKS", "12"))
+FIXED_CATEGORIES = ("rent", "emi")
+
+_lock = threading.Lock()
+_inputs: "OrderedDict[int, ForecastInputs]" = OrderedDict()   # user → inputs, least recent first
+
+
+class ForecastInputs:
+    """Everything the timeline is derived from, as of one data version and day."""
+
+    def __init__(self, user_id: int, version: int, goal: Goal, today: date):
+        self.user_id        = user_id
+        self.version        = version
+        self.today          = today
+        self.deadline       = goal.deadline
+        self.monthly_income = goal.monthly_income
+        self.monthly_fixed  = goal.emi + goal.rent
+        self.start_balance  = 0
+        self.balance_known  = False
+        self.cutoff         = today - timedelta(weeks=HISTORY_WEEKS)
+        self.since          = today   # first history day in use
+        self.until          = today - timedelta(days=1)
+        self.weekday_spend  = [0] * 7
+        self.schedule_version = recurring.schedule_version(user_id)
+        self.scheduled: dict = {}   # signature → (next_date, period, amount) of active UPI series
+
+    def weekday_days(self) -> List[int]:
+        """How many of each weekday fall in [since, until]."""
+        days = [0] * 7
+        span = (self.until - self.since).days + 1
+        if span <= 0:
+            return days
+        full, rest = divmod(span, 7)
+        for i in range(7):
+            days[i] = full
+        for i in range(rest):
+            days[(self.since.weekday() + i) % 7] += 1
+        return days
+
+    def counts_toward_profile(self, expense: Expense) -> bool:
+        return (
+            expense.payment_mode != "card"
+            and expense.category not in FIXED_CATEGORIES
+            and recurring.signature(expense.category, expense.note) not in self.scheduled
+        )
+
+
+def build_inputs(db: Session, goal: Goal, today: date, version: int) -> ForecastInputs:
+    """The session user's inputs; version is the data version read before any of these queries."""
+    user_id = db.info["user_id"]
+    inputs = ForecastInputs(user_id, version, goal, today)
+
+    checkpoint = db.get(BalanceCheckpoint, user_id)
+    if checkpoint:
+        inputs.start_balance = checkpoint.current_balance
+        inputs.balance_known = True
+
+    # Don't count the days before the first logged expense as zero-spend days.
+    first_day = (
+        db.query(func.min(ExpenseTotal.key))
+        .filter(ExpenseTotal.dimension == "day", ExpenseTotal.count > 0)
+        .scalar()
+    )
+    if first_day:
+        inputs.since = max(inputs.cutoff, date.fromisoformat(first_day))
+
+    inputs.scheduled = {
+        s.signature: (s.next_date, s.period, s.amount)
+        for s in recurring.active_series(db, today)
+        if s.payment_mode != "card" and s.category not in FIXED_CATEGORIES
+    }
+
+    rows = (
+        db.query(Expense.date, Expense.category, Expense.note, func.sum(Expense.amount))
+        .filter(
+            Expense.date >= inputs.since,
+            Expense.date <= inputs.until,
+            Expense.payment_mode != "card",
+            Expense.category.notin_(FIXED_CATEGORIES),
+        )
+        .group_by(Expense.date, Expense.category, Expense.note)
+    )
+    for day, category, note, total in rows:
+        if recurring.signature(category, note) not in inputs.scheduled:
+            inputs.weekday_spend[day.weekday()] += total
+    return inputs
+
+
+def _scheduled_spend(inputs: ForecastInputs) -> dict:
+    """date → recurring spend expected that day, between tomorrow and the deadline."""
+    tomorrow = inputs.today + timedelta(days=1)
+    by_day: dict = {}
+    for d, period, amount in inputs.scheduled.values():
+        if d < tomorrow:
+            # Due but not logged yet: expect it right away.
+            by_day[tomorrow] = by_day.get(tomorrow, 0) + amount
+            while d < tomorrow:
+                d = recurring.advance(d, period)
+        while d <= inputs.deadline:
+            by_day[d] = by_day.get(d, 0) + amount
+            d = recurring.advance(d, period)
+    return by_day
+
+
+def project(inputs: ForecastInputs) -> ForecastOut:
+    days = inputs.weekday_days()
+    daily = [
+        (inputs.weekday_spend[i] / days[i]) if days[i] else 0.0
+        for i in range(7)
+    ]
+
+    scheduled = _scheduled_spend(inputs)
+
+    balance = float(inputs.start_balance)
+    points = [ForecastPoint(date=inputs.today, balance=inputs.start_balance, income=0, spend=0)]
+    low, low_date, first_negative = inputs.start_balance, inputs.today, None
+    if inputs.start_balance < 0:
+        first_negative = inputs.today
+
+    d = inputs.today
+    while d < inputs.deadline:
+        d += timedelta(days=1)
+        income = inputs.monthly_income - inputs.monthly_fixed if d.day == 1 else 0
+        spend = daily[d.weekday()] + scheduled.get(d, 0)
+        balance += income - spend
+        rounded = int(round(balance))
+        points.append(ForecastPoint(date=d, balance=rounded, income=income, spend=int(round(spend))))
+        if rounded < low:
+            low, low_date = rounded, d
+        if rounded < 0 and first_negative is None:
+            first_negative = d
+
+    return ForecastOut(
+        balance_known=inputs.balance_known,
+        start_balance=inputs.start_balance,
+        end_balance=points[-1].balance,
+        min_balance=low,
+        min_balance_date=low_date,
+        first_negative_date=first_negative,
+        expected_daily_spend=[int(round(x)) for x in daily],
+        points=points,
+    )
+
+
+def get_forecast(db: Session) -> Optional[ForecastOut]:
+    """Timeline for the session user's current data version; None when no goal is set."""
+    user_id = db.info["user_id"]
+    today = date.today()
+    version = data_version(db)
+    with _lock:
+        inputs = _inputs.get(user_id)
+    if inputs is None or inputs.version != version or inputs.today != today:
+        goal = db.query(Goal).order_by(Goal.id.desc()).first()
+        if not goal:
+            return None
+        inputs = build_inputs(db, goal, today, version)
+        with _lock:
+            _inputs[user_id] = inputs
+            _inputs.move_to_end(user_id)
+            while len(_inputs) > cache.MAX_USERS:
+                _inputs.popitem(last=False)
+    return project(inputs)
+
+
+def expense_written(user_id: int, expense: Expense, sign: int, version: int) -> None:
+    """
+    Fold one committed expense add (sign=1) or delete (sign=-1) into the
+    cached inputs. version is the data version that write committed
+    (database.committed_version()); the cached inputs are only adjusted if
+    they were current just before it, i.e. built at version - 1.
+    Otherwise they are left stale and the next request rebuilds them.
+    """
+    with _lock:
+        inputs = _inputs.get(user_id)
+        if inputs is None or inputs.version != version - 1 or inputs.today != date.today():
+            return
+        if (inputs.cutoff <= expense.date < inputs.since
+                or inputs.schedule_version != recurring.schedule_version(user_id)):
+            # Extends the history window backwards, or moved a recurring series;
+            # let the next read rebuild.
+            del _inputs[user_id]
+            return
+
+        if inputs.balance_known and expense.payment_mode != "card":
+            inputs.start_balance -= sign * expense.amount
+        if inputs.since <= expense.date <= inputs.until and inputs.counts_toward_profile(expense):
+            inputs.weekday_spend[expense.date.weekday()] += sign * expense.amount
+        inputs.version = version
@@ -0,0 +1,224 @@
+"""
+Bulk expense import: parses streamed CSV / NDJSON lines into batches and
+writes each batch in one transaction — expenses, expense_totals, the cube
+rollups, weekly spend and a single aggregated ledger debit. Recurring series
+are brought up to date once, by finish(), after the last batch.
+"""
+import csv
+import json
+from collections import defaultdict
+from typing import Iterable, List, Optional, Set, Tuple
+
+from pydantic import ValidationError
+from sqlalchemy import insert
+from sqlalchemy.orm import Session
+
+import cube
+import recurring
+from models import Goal, Expense
+from schemas import ExpenseCreate
+from engine import (
+    get_week_start,
+    add_weekly_spend,
+    refresh_frozen_weeks,
+    roll_over_weeks,
+    expense_total_deltas,
+    upsert_expense_totals,
+    has_balance_anchor,
+    record_ledger_entry,
+)
+
+BATCH_SIZE = 5000
+MAX_REPORTED_ERRORS = 1000
+
+ParsedRow = Tuple[int, Optional[dict], Optional[str]]   # (row number, fields, parse error)
+
+
+def _format_validation_error(exc: ValidationError) -> str:
+    return "; ".join(
+        f"{'.'.join(str(p) for p in err['loc'])}: {err['msg']}" for err in exc.errors()
+    )
+
+
+class LineParser:
+    """
+    Incremental parser for CSV (header row required) or NDJSON. feed() takes
+    raw byte chunks and returns the records completed so far. NDJSON is one
+    record per line; a CSV record runs on while a quoted field is open, so
+    quoted fields may span lines. A record that is not valid UTF-8 becomes
+    that row's error instead of failing the import.
+    """
+
+    def __init__(self, fmt: str):
+        self.fmt = fmt
+        self.header: Optional[List[str]] = None
+        self.row_no = 0
+        self._pending = b""                 # bytes after the last newline
+        self._open: List[bytes] = []        # lines of a CSV record inside a quoted field
+        self._started = False
+
+    def feed(self, chunk: bytes) -> List[ParsedRow]:
+        data = self._pending + chunk
+        lines = data.split(b"\n")
+        self._pending = lines.pop()
+        return self._parse(self._records(lines))
+
+    def close(self) -> List[ParsedRow]:
+        lines, self._pending = [self._pending], b""
+        records = self._records(lines)
+        if self._open:   # quote never closed: the rest of the input is one record
+            records.append(b"\n".join(self._open))
+            self._open = []
+        return self._parse(records)
+
+    def _records(self, lines: List[bytes]) -> List[bytes]:
+        if not self._started and lines:
+            lines[0] = lines[0].removeprefix(b"\xef\xbb\xbf")
+            self._started = True
+        if self.fmt != "csv":
+            return lines
+        # A quote is escaped by doubling it, so a line with an odd number of
+        # quotes opens or closes a quoted field.
+        records = []
+        for line in lines:
+            if self._open:
+                self._open.append(line)
+                if line.count(b'"') % 2:
+                    records.append(b"\n".join(self._open))
+                    self._open = []
+            elif line.count(b'"') % 2:
+                self._open.append(line)
+            else:
+                records.append(line)
+        return records
+
+    def _parse(self, records: List[bytes]) -> List[ParsedRow]:
+        records = [r for r in records if r.strip()]
+        if self.fmt == "csv":
+            return self._parse_csv(records)
+        return self._parse_ndjson(records)
+
+    def _parse_csv(self, records: List[bytes]) -> List[ParsedRow]:
+        if self.header is None and records:
+            self.header = [h.strip() for h in next(csv.reader([records[0].decode("utf-8", "replace")]))]
+            records = records[1:]
+
+        rows: List[Optional[ParsedRow]] = []
+        texts, slots = [], []
+        for raw in records:
+            self.row_no += 1
+            try:
+                texts.append(raw.decode("utf-8"))
+            except UnicodeDecodeError as exc:
+                rows.append((self.row_no, None, _decode_error(exc)))
+                continue
+            slots.append((len(rows), self.row_no))
+            rows.append(None)
+        # One reader for the whole batch; every text is a complete record.
+        # If it fails (e.g. a field over csv.field_size_limit()), parse them
+        # one at a time so only the bad records become errors.
+        try:
+            parsed = list(csv.reader(texts))
+        except csv.Error:
+            parsed = []
+            for text in texts:
+                try:
+                    parsed.append(next(csv.reader([text])))
+                except csv.Error as exc:
+                    parsed.append(exc)
+        for (slot, row_no), values in zip(slots, parsed):
+            if isinstance(values, csv.Error):
+                rows[slot] = (row_no, None, f"invalid CSV: {values}")
+            else:
+                rows[slot] = (row_no, {k: v for k, v in zip(self.header, values) if v != ""}, None)
+        return rows
+
+    def _parse_ndjson(self, records: List[bytes]) -> List[ParsedRow]:
+        rows = []
+        for raw in records:
+            self.row_no += 1
+            try:
+                obj = json.loads(raw.decode("utf-8"))
+            except UnicodeDecodeError as exc:
+                rows.append((self.row_no, None, _decode_error(exc)))
+                continue
+            except ValueError as exc:
+                rows.append((self.row_no, None, f"invalid JSON: {exc}"))
+                continue
+            if not isinstance(obj, dict):
+                rows.append((self.row_no, None, "expected a JSON object"))
+                continue
+            rows.append((self.row_no, obj, None))
+        return rows
+
+
+def _decode_error(exc: UnicodeDecodeError) -> str:
+    return f"not valid UTF-8 (byte {exc.start} of the record)"
+
+def import_batch(db: Session, rows: List[ParsedRow], signatures: Set[str]) -> Tuple[int, List[dict]]:
+    """
+    Validate and insert one batch in a single transaction, adding the
+    recurring signatures it touched to `signatures` for finish().
+    Returns (inserted count, per-row errors); invalid rows never abort the batch.
+    """
+    valid: List[dict] = []
+    errors: List[dict] = []
+    for row_no, fields, parse_error in rows:
+        if parse_error:
+            errors.append({"row": row_no, "error": parse_error})
+            continue
+        try:
+            item = ExpenseCreate(**fields)
+        except ValidationError as exc:
+            errors.append({"row": row_no, "error": _format_validation_error(exc)})
+            continue
+        valid.append({
+            "user_id":      db.info["user_id"],
+            "amount":       item.amount,
+            "category":     item.category.value,
+            "date":         item.date,
+            "note":         item.note,
+            "mood":         item.mood.value if item.mood else None,
+            "payment_mode": item.payment_mode,
+            "signature":    recurring.signature(item.category.value, item.note),
+        })
+
+    if not valid:
+        return 0, errors
+
+    db.execute(insert(Expense.__table__), valid)
+
+    upsert_expense_totals(db, expense_total_deltas(
+        (r["amount"], r["category"], r["payment_mode"], r["date"]) for r in valid
+    ))
+    cube.record(db, (
+        (r["date"], r["category"], r["mood"], r["payment_mode"], r["amount"]) for r in valid
+    ))
+
+    signatures.update(r["signature"] for r in valid if r["signature"] is not None)
+
+    spend_by_week: dict = defaultdict(int)
+    for r in valid:
+        spend_by_week[get_week_start(r["date"])] += r["amount"]
+    goal = db.query(Goal).order_by(Goal.id.desc()).first()
+    add_weekly_spend(db, goal, spend_by_week)
+    refresh_frozen_weeks(db, spend_by_week)
+    roll_over_weeks(db)
+
+    upi = [r["amount"] for r in valid if r["payment_mode"] != "card"]
+    if upi and has_balance_anchor(db):
+        record_ledger_entry(db, "debit", sum(upi), note=f"[UPI] Bulk import ({len(upi)} expenses)")
+
+    db.commit()
+    return len(valid), errors
+
+
+def finish(db: Session, signatures: Set[str]) -> None:
+    """
+    Rebuild the recurring series an import touched, in one pass and one
+    transaction. Per batch, an import of unsorted history would rescan the
+    same series over and over.
+    """
+    if signatures:
+        recurring.rescan(db, signatures)
+        db.commit()
@@ -1,29 +1,67 @@
-from fastapi import FastAPI, Depends, HTTPException
+from fastapi import FastAPI, BackgroundTasks, Depends, HTTPException, Query, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse
+from fastapi.responses import StreamingResponse
+from fastapi.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
 from datetime import date, datetime
+from hashlib import blake2b
+from typing import List, Optional
 import os
 
-from database import get_db, init_db
+import assets
+import cache
+import cube
+import events
+import exporter
+import fastjson
+import forecast
+import importer
+import metrics
+import recurring
+from auth import current_user, stream_user
+from database import (
+    ASYNC_DB, committed_version, data_version, data_version_async, get_db, get_async_db, init_db,
+    session_user, user_session,
+)
+
+if ASYNC_DB:
+    from sqlalchemy.ext.asyncio import AsyncSession
 from models import Goal, Expense, WeeklyLimit, BalanceLedger
 from schemas import (
     GoalCreate, GoalOut,
-    ExpenseCreate, ExpenseOut,
+    CategoryEnum, MoodEnum,
+    ExpenseCreate, ExpenseOut, BulkImportOut,
+    RecurringSeriesOut, RecurringSuggestionOut,
     WeeklyLimitOut,
     BalanceSetRequest, BalanceCreditRequest, BalanceLedgerOut,
     DashboardOut,
-    SimulateRequest, SimulateOut,
-    AnalyticsOut,
+    SimulateRequest, SimulateBatchRequest, SimulateOut, MonteCarloRequest, MonteCarloOut,
+    AnalyticsOut, CubeDimension, CubeOut,
+    ForecastOut,
 )
 from engine import (
-    compute_projection,
-    compute_clothing_spent,
-    compute_cc_total,
-    get_or_create_weekly_limit,
-    compute_balance_state,
-    compute_analytics,
+    build_dashboard,
+    build_dashboard_async,
+    analytics_fields,
+    analytics_fields_async,
+    build_analytics,
+    build_analytics_async,
+    simulate_purchase,
+    simulate_purchase_async,
+    simulate_batch,
+    simulate_batch_async,
+    simulate_goal_paths,
+    simulate_goal_paths_async,
+    get_weekly_limit,
+    set_weekly_cap,
+    expense_filters,
+    expense_page,
+    record_expense,
+    remove_expense,
+    get_balance_checkpoint,
+    record_ledger_entry,
+    ledger_written,
 )
 
 app = FastAPI(title="Spender — Mission Budget API", version="2.0.0")
@@ -33,7 +71,10 @@ app.add_middleware(
     allow_origins=["*"],
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["ETag", "X-Next-Cursor", "X-Total-Count"],
 )
+if metrics.ENABLED:
+    app.add_middleware(metrics.MetricsMiddleware)
 
 
 @app.on_event("startup")
@@ -41,6 +82,44 @@ def on_startup():
     init_db()
 
 
+def cached_json(request: Request, db: Session, name: str, compute) -> Response:
+    """Serve the session user's cached JSON body, or an empty 304 if the client already has it."""
+    user_id, version = session_user(db), data_version(db)
+    etag = cache.etag_for(user_id, name, version)
+    if cache.etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=_cache_headers(etag))
+    etag, body = cache.get_or_compute(user_id, name, version, compute)
+    return Response(content=body, media_type="application/json", headers=_cache_headers(etag))
+
+
+async def cached_json_async(request: Request, db: "AsyncSession", name: str, compute) -> Response:
+    """cached_json() for coroutine computations (async DB mode)."""
+    user_id, version = session_user(db), await data_version_async(db)
+    etag = cache.etag_for(user_id, name, version)
+    if cache.etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=_cache_headers(etag))
+    etag, body = await cache.get_or_compute_async(user_id, name, version, compute)
+    return Response(content=body, media_type="application/json", headers=_cache_headers(etag))
+
+
+def _cache_headers(etag: str) -> dict:
+    return {"ETag": etag, "Cache-Control": "no-cache"}
+
+
+def _written(db: Session, background: BackgroundTasks, event: str) -> int:
+    """After a commit: push the new state, at the version it committed, to the user's open tabs."""
+    user_id = session_user(db)
+    version = committed_version(db)
+    background.add_task(events.publish, user_id, event, version, **_ledger_written(db))
+    return version
+
+
+def _ledger_written(db: Session) -> dict:
+    """The ledger entries the request committed, as publish() extras, so tabs needn't refetch the ledger."""
+    entries = ledger_written(db)
+    return {"ledger_entries": [BalanceLedgerOut.model_validate(e) for e in entries]} if entries else {}
+
+
 # ─── GOAL ─────────────────────────────────────────────────────────────────────
 
 @app.get("/api/goal", response_model=GoalOut)
@@ -52,11 +131,12 @@ def get_goal(db: Session = Depends(get_db)):
 
 
 @app.post("/api/goal", response_model=GoalOut)
-def set_goal(payload: GoalCreate, db: Session = Depends(get_db)):
+def set_goal(payload: GoalCreate, background: BackgroundTasks, db: Session = Depends(get_db)):
     db.query(Goal).delete()
     goal = Goal(**payload.dict())
     db.add(goal)
     db.commit()
+    _written(db, background, "goal_set")
     db.refresh(goal)
     return goal
 
@@ -64,63 +144,123 @@ def set_goal(payload: GoalCreate, db: Session = Depends(get_db)):
 # ─── EXPENSES ─────────────────────────────────────────────────────────────────
 
 @app.get("/api/expenses", response_model=list[ExpenseOut])
-def list_expenses(db: Session = Depends(get_db)):
-    return db.query(Expense).order_by(Expense.date.desc(), Expense.id.desc()).all()
-
-
-@app.post("/api/expenses", response_model=ExpenseOut)
-def add_expense(payload: ExpenseCreate, db: Session = Depends(get_db)):
-    expense = Expense(**payload.dict())
-    db.add(expense)
-    db.commit()
+def list_expenses(
+    response: Response,
+    limit:         Optional[int]          = Query(None, ge=1, le=500),
+    cursor:        Optional[str]          = None,
+    category:      Optional[CategoryEnum] = None,
+    payment_mode:  Optional[str]          = None,
+    mood:          Optional[MoodEnum]     = None,
+    date_from:     Optional[date]         = None,
+    date_to:       Optional[date]         = None,
+    min_amount:    Optional[int]          = None,
+    max_amount:    Optional[int]          = None,
+    include_total: bool                   = False,
+    db: Session = Depends(get_db),
+):
+    """
+    Expenses newest first. Pass `limit` to page: the next page's cursor comes
+    back in the X-Next-Cursor header (absent on the last page).
+    `include_total=true` adds X-Total-Count for the filtered set.
+    """
+    criteria = expense_filters(
+        category=category, payment_mode=payment_mode, mood=mood,
+        date_from=date_from, date_to=date_to,
+        min_amount=min_amount, max_amount=max_amount,
+    )
+    headers = {}
+    if include_total:
+        headers["X-Total-Count"] = str(db.query(Expense.id).filter(*criteria).count())
+    columns = fastjson.columns(fastjson.EXPENSE_FIELDS) if fastjson.ENABLED else None
+
+    if limit is None:
+        query = db.query(*columns) if columns else db.query(Expense)
+        rows = query.filter(*criteria).order_by(Expense.date.desc(), Expense.id.desc()).all()
+    else:
+        try:
+            rows, next_cursor = expense_page(db, criteria, limit, cursor, columns)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+        if next_cursor:
+            headers["X-Next-Cursor"] = next_cursor
 
-    # Update weekly spending (counts for both UPI and card)
-    goal = db.query(Goal).order_by(Goal.id.desc()).first()
-    wl = get_or_create_weekly_limit(db, goal, payload.date)
-    wl.spent_this_week += payload.amount
-    db.commit()
+    if columns:
+        return fastjson.response(fastjson.rows_json(fastjson.EXPENSE_FIELDS, rows), headers)
+    response.headers.update(headers)
+    return rows
 
-    # Auto-debit from balance ledger ONLY for UPI payments
-    if payload.payment_mode != "card":
-        has_set = db.query(BalanceLedger).filter(BalanceLedger.type == "set").first()
-        if has_set:
-            debit = BalanceLedger(
-                type="debit",
-                amount=payload.amount,
-                note=f"[UPI] {payload.note or payload.category}",
-            )
-            db.add(debit)
-            db.commit()
 
+@app.post("/api/expenses", response_model=ExpenseOut)
+def add_expense(payload: ExpenseCreate, background: BackgroundTasks, db: Session = Depends(get_db)):
+    expense = record_expense(db, payload.dict())
+    user_id = session_user(db)
+    version = committed_version(db)
     db.refresh(expense)
+    forecast.expense_written(user_id, expense, 1, version)
+    background.add_task(
+        events.publish, user_id, "expense_added", version,
+        categories=[expense.category], expense=ExpenseOut.model_validate(expense), **_ledger_written(db),
+    )
     return expense
 
 
+@app.post("/api/expenses/bulk", response_model=BulkImportOut)
+async def bulk_import_expenses(
+    request: Request,
+    background: BackgroundTasks,
+    format: Optional[str] = Query(None, pattern="^(csv|ndjson)$"),
+    db: Session = Depends(get_db),
+):
+    """
+    Stream CSV (with header row) or NDJSON expenses, one record per line.
+    Format comes from ?format= or the Content-Type (text/csv vs anything else).
+    Rows are inserted in batches of importer.BATCH_SIZE, each in one transaction;
+    invalid rows are reported and skipped.
+    """
+    if format is None:
+        format = "csv" if "csv" in request.headers.get("content-type", "") else "ndjson"
+
+    parser = importer.LineParser(format)
+    pending: list = []
+    signatures: set = set()
+    inserted, failed, errors = 0, 0, []
+
+    async def flush(rows):
+        nonlocal inserted, failed
+        n, errs = await run_in_threadpool(importer.import_batch, db, rows, signatures)
+        inserted += n
+        failed += len(errs)
+        errors.extend(errs[: importer.MAX_REPORTED_ERRORS - len(errors)])
+
+    async for chunk in request.stream():
+        pending.extend(parser.feed(chunk))
+        while len(pending) >= importer.BATCH_SIZE:
+            batch, pending = pending[: importer.BATCH_SIZE], pending[importer.BATCH_SIZE:]
+            await flush(batch)
+    pending.extend(parser.close())
+    if pending:
+        await flush(pending)
+    await run_in_threadpool(importer.finish, db, signatures)
+
+    if inserted:
+        _written(db, background, "expenses_imported")
+    return BulkImportOut(inserted=inserted, failed=failed, errors=errors)
+
+
 @app.delete("/api/expenses/{expense_id}")
-def delete_expense(expense_id: int, db: Session = Depends(get_db)):
+def delete_expense(expense_id: int, background: BackgroundTasks, db: Session = Depends(get_db)):
     expense = db.query(Expense).filter(Expense.id == expense_id).first()
     if not expense:
         raise HTTPException(status_code=404, detail="Expense not found")
 
-    # Reverse the weekly debit
-    goal = db.query(Goal).order_by(Goal.id.desc()).first()
-    wl = get_or_create_weekly_limit(db, goal, expense.date)
-    wl.spent_this_week = max(0, wl.spent_this_week - expense.amount)
-
-    # Reverse the balance debit ONLY for UPI payments
-    mode = getattr(expense, 'payment_mode', 'upi') or 'upi'
-    if mode != "card":
-        has_set = db.query(BalanceLedger).filter(BalanceLedger.type == "set").first()
-        if has_set:
-            reversal = BalanceLedger(
-                type="credit",
-                amount=expense.amount,
-                note=f"Reversal [UPI]: {expense.note or expense.category}",
-            )
-            db.add(reversal)
-
-    db.delete(expense)
-    db.commit()
+    remove_expense(db, expense)
+    user_id = session_user(db)
+    version = committed_version(db)
+    forecast.expense_written(user_id, expense, -1, version)
+    background.add_task(
+        events.publish, user_id, "expense_deleted", version,
+        categories=[expense.category], expense_id=expense_id, **_ledger_written(db),
+    )
     return {"ok": True}
 
 
@@ -129,143 +269,272 @@ def delete_expense(expense_id: int, db: Session = Depends(get_db)):
 @app.get("/api/weekly", response_model=WeeklyLimitOut)
 def get_weekly(db: Session = Depends(get_db)):
     goal = db.query(Goal).order_by(Goal.id.desc()).first()
-    wl = get_or_create_weekly_limit(db, goal)
-    return wl
+    return get_weekly_limit(db, goal)
 
 
 @app.patch("/api/weekly/cap")
-def update_weekly_cap(cap: int, db: Session = Depends(get_db)):
-    goal = db.query(Goal).order_by(Goal.id.desc()).first()
-    wl = get_or_create_weekly_limit(db, goal)
-    wl.weekly_cap = cap
+def update_weekly_cap(cap: int, background: BackgroundTasks, db: Session = Depends(get_db)):
+    set_weekly_cap(db, cap)
     db.commit()
+    _written(db, background, "weekly_cap_updated")
     return {"ok": True, "new_cap": cap}
 
 
 # ─── BALANCE LEDGER ───────────────────────────────────────────────────────────
 
 @app.post("/api/balance/set", response_model=BalanceLedgerOut)
-def set_balance(payload: BalanceSetRequest, db: Session = Depends(get_db)):
+def set_balance(payload: BalanceSetRequest, background: BackgroundTasks, db: Session = Depends(get_db)):
     """Manually set the current balance (e.g. after checking bank app)."""
-    entry = BalanceLedger(type="set", amount=payload.amount, note=payload.note)
-    db.add(entry)
+    entry = record_ledger_entry(db, "set", payload.amount, note=payload.note)
     db.commit()
+    _written(db, background, "balance_set")
     db.refresh(entry)
     return entry
 
 
 @app.post("/api/balance/credit", response_model=BalanceLedgerOut)
-def add_credit(payload: BalanceCreditRequest, db: Session = Depends(get_db)):
+def add_credit(payload: BalanceCreditRequest, background: BackgroundTasks, db: Session = Depends(get_db)):
     """Add money: salary, transfer, cashback, gift, etc."""
     # Check a base balance exists
-    has_set = db.query(BalanceLedger).filter(BalanceLedger.type == "set").first()
-    if not has_set:
+    if not get_balance_checkpoint(db):
         raise HTTPException(
             status_code=400,
             detail="Set your current balance first before adding credits."
         )
-    entry = BalanceLedger(type="credit", amount=payload.amount, note=payload.note)
-    db.add(entry)
+    entry = record_ledger_entry(db, "credit", payload.amount, note=payload.note)
     db.commit()
+    _written(db, background, "credit_added")
     db.refresh(entry)
     return entry
 
 
 @app.get("/api/balance/ledger", response_model=list[BalanceLedgerOut])
 def get_ledger(db: Session = Depends(get_db)):
-    return (
-        db.query(BalanceLedger)
-        .order_by(BalanceLedger.recorded_at.desc())
-        .limit(50)
-        .all()
+    if fastjson.ENABLED:
+        query = db.query(*fastjson.columns(fastjson.LEDGER_FIELDS))
+        rows = query.order_by(BalanceLedger.recorded_at.desc()).limit(50).all()
+        return fastjson.response(fastjson.rows_json(fastjson.LEDGER_FIELDS, rows))
+    return db.query(BalanceLedger).order_by(BalanceLedger.recorded_at.desc()).limit(50).all()
+
+
+# ─── RECURRING ────────────────────────────────────────────────────────────────
+
+@app.get("/api/recurring", response_model=list[RecurringSeriesOut])
+def list_recurring(db: Session = Depends(get_db)):
+    """Detected subscriptions / EMIs / rent that are still being paid."""
+    return recurring.active_series(db)
+
+
+@app.get("/api/recurring/suggestions", response_model=list[RecurringSuggestionOut])
+def recurring_suggestions(within_days: int = Query(3, ge=0, le=31), db: Session = Depends(get_db)):
+    """Pre-filled expenses for series due in the next `within_days` days (or overdue)."""
+    return [
+        RecurringSuggestionOut(
+            series_id=s.id,
+            amount=s.amount,
+            category=s.category,
+            date=s.next_date,
+            note=s.note,
+            payment_mode=s.payment_mode,
+        )
+        for s in recurring.due_suggestions(db, within_days)
+    ]
+
+
+# ─── LIVE UPDATES ─────────────────────────────────────────────────────────────
+
+@app.get("/api/stream")
+async def stream_updates(request: Request, user_id: int = Depends(stream_user)):
+    """
+    Server-Sent Events: one StreamEvent JSON message per committed
+    write of this user, so open dashboards update without refetching.
+    EventSource can't send headers; pass the token as ?token= instead.
+    """
+    return StreamingResponse(
+        events.stream(request, events.subscribe(user_id)),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
     )
 
 
 # ─── DASHBOARD ────────────────────────────────────────────────────────────────
 
-@app.get("/api/dashboard", response_model=DashboardOut)
-def dashboard(db: Session = Depends(get_db)):
-    goal            = db.query(Goal).order_by(Goal.id.desc()).first()
-    projection      = compute_projection(db, goal) if goal else None
-    weekly          = get_or_create_weekly_limit(db, goal) if goal else None
-    clothing_spent  = compute_clothing_spent(db)
-    clothing_cap    = goal.clothing_cap if goal else 10000
-    clothing_remaining = max(0, clothing_cap - clothing_spent)
-    balance_state   = compute_balance_state(db, goal, weekly)
-    cc_total        = compute_cc_total(db)
-
-    return DashboardOut(
-        goal=goal,
-        projection=projection,
-        weekly=weekly,
-        clothing_spent=clothing_spent,
-        clothing_remaining=clothing_remaining,
-        balance_state=balance_state,
-        cc_total=cc_total,
-    )
+if ASYNC_DB:
+    @app.get("/api/dashboard", response_model=DashboardOut)
+    async def dashboard(request: Request, db: AsyncSession = Depends(get_async_db)):
+        async def compute() -> bytes:
+            return (await build_dashboard_async(db)).model_dump_json().encode()
+
+        return await cached_json_async(request, db, "dashboard", compute)
+else:
+    @app.get("/api/dashboard", response_model=DashboardOut)
+    def dashboard(request: Request, db: Session = Depends(get_db)):
+        return cached_json(request, db, "dashboard", lambda: build_dashboard(db).model_dump_json().encode())
 
 
 # ─── SIMULATE ─────────────────────────────────────────────────────────────────
 
-@app.post("/api/simulate", response_model=SimulateOut)
-def simulate(payload: SimulateRequest, db: Session = Depends(get_db)):
-    goal = db.query(Goal).order_by(Goal.id.desc()).first()
-    wl   = get_or_create_weekly_limit(db, goal)
-
-    weekly_balance_after = wl.weekly_cap - wl.spent_this_week - payload.amount
-
-    clothing_spent = compute_clothing_spent(db)
-    clothing_cap   = goal.clothing_cap if goal else 10000
-    clothing_remaining_after = None
-    if payload.category == "clothes":
-        clothing_remaining_after = max(0, clothing_cap - clothing_spent - payload.amount)
-
-    # Balance impact
-    balance_state = compute_balance_state(db, goal, wl)
-    actual_balance_after = None
-    safe_to_spend_after  = None
-    if balance_state:
-        actual_balance_after = balance_state.current_balance - payload.amount
-        if goal:
-            monthly_fixed = goal.emi + goal.rent
-            usable_after  = max(0, actual_balance_after - monthly_fixed)
-            safe_to_spend_after = max(0, usable_after - balance_state.locked_for_goal)
-
-    # Projection impact
-    if goal:
-        from engine import compute_total_saved
-        total_saved = compute_total_saved(db, goal)
-        remaining   = max(0, goal.target_amount - total_saved)
-        days_left   = (goal.deadline - date.today()).days
-        months_left = max(0.01, days_left / 30.44)
-        usable      = goal.monthly_income - goal.emi - goal.rent
-        req         = (remaining + payload.amount) / months_left
-
-        if req <= usable * 0.6:
-            status, risk = "On Track", "Low"
-        elif req <= usable * 0.85:
-            status, risk = "Slight Risk", "Medium"
-        else:
-            status, risk = "High Risk", "High"
+if ASYNC_DB:
+    @app.post("/api/simulate", response_model=SimulateOut)
+    async def simulate(payload: SimulateRequest, db: AsyncSession = Depends(get_async_db)):
+        return await simulate_purchase_async(db, payload.amount, payload.category)
+else:
+    @app.post("/api/simulate", response_model=SimulateOut)
+    def simulate(payload: SimulateRequest, db: Session = Depends(get_db)):
+        return simulate_purchase(db, payload.amount, payload.category)
+
+
+def _batch_scenarios(payload: SimulateBatchRequest) -> list:
+    return [
+        [(p.amount, p.category) for p in (s if isinstance(s, list) else [s])]
+        for s in payload.scenarios
+    ]
+
+
+if ASYNC_DB:
+    @app.post("/api/simulate/batch", response_model=list[SimulateOut])
+    async def simulate_many(payload: SimulateBatchRequest, db: AsyncSession = Depends(get_async_db)):
+        return await simulate_batch_async(db, _batch_scenarios(payload))
+else:
+    @app.post("/api/simulate/batch", response_model=list[SimulateOut])
+    def simulate_many(payload: SimulateBatchRequest, db: Session = Depends(get_db)):
+        return simulate_batch(db, _batch_scenarios(payload))
+
+
+def _require_projection(result: Optional[MonteCarloOut]) -> MonteCarloOut:
+    if result is None:
+        raise HTTPException(status_code=404, detail="No goal set")
+    return result
+
+
+if ASYNC_DB:
+    @app.post("/api/simulate/montecarlo", response_model=MonteCarloOut)
+    async def simulate_montecarlo(payload: MonteCarloRequest, db: AsyncSession = Depends(get_async_db)):
+        return _require_projection(await simulate_goal_paths_async(db, **payload.model_dump()))
+else:
+    @app.post("/api/simulate/montecarlo", response_model=MonteCarloOut)
+    def simulate_montecarlo(payload: MonteCarloRequest, db: Session = Depends(get_db)):
+        return _require_projection(simulate_goal_paths(db, **payload.model_dump()))
+
+
+# ─── ANALYTICS ────────────────────────────────────────────────────────────────
+
+if ASYNC_DB:
+    @app.get("/api/analytics", response_model=AnalyticsOut)
+    async def analytics(request: Request, db: AsyncSession = Depends(get_async_db)):
+        async def compute() -> bytes:
+            if fastjson.ENABLED:
+                return fastjson.dumps(await analytics_fields_async(db))
+            return (await build_analytics_async(db)).model_dump_json().encode()
+
+        return await cached_json_async(request, db, "analytics", compute)
+else:
+    @app.get("/api/analytics", response_model=AnalyticsOut)
+    def analytics(request: Request, db: Session = Depends(get_db)):
+        def compute() -> bytes:
+            if fastjson.ENABLED:
+                return fastjson.dumps(analytics_fields(db))
+            return build_analytics(db).model_dump_json().encode()
+
+        return cached_json(request, db, "analytics", compute)
+
+
+@app.get("/api/analytics/cube", response_model=CubeOut)
+def analytics_cube(
+    request: Request,
+    dimensions:   List[CubeDimension] = Query([]),
+    date_from:    Optional[date]      = None,
+    date_to:      Optional[date]      = None,
+    category:     List[CategoryEnum]  = Query([]),
+    mood:         List[MoodEnum]      = Query([]),
+    payment_mode: List[str]           = Query([]),
+    db: Session = Depends(get_db),
+):
+    """
+    Expense sums and counts grouped by any of category, mood, payment_mode,
+    weekday, week and month (repeat `dimensions`), over an optional date
+    range and optionally limited to some categories, moods or payment modes.
+    No dimensions gives the grand total. Served from the cube rollups.
+    """
+    # One ETag per slice, but no cached bodies: there are too many slices.
+    digest = blake2b(str(request.query_params).encode(), digest_size=8).hexdigest()
+    etag = cache.etag_for(session_user(db), f"cube-{digest}", data_version(db))
+    if cache.etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=_cache_headers(etag))
+
+    result = cube.query(db, dimensions, date_from, date_to,
+                        {"category": category, "mood": mood, "payment_mode": payment_mode})
+    if fastjson.ENABLED:
+        body = fastjson.dumps(result)
     else:
-        status, risk = "Unknown", "Unknown"
-
-    return SimulateOut(
-        weekly_balance_after=weekly_balance_after,
-        actual_balance_after=actual_balance_after,
-        clothing_remaining_after=clothing_remaining_after,
-        updated_projection_status=status,
-        risk_level=risk,
-        safe_to_spend_after=safe_to_spend_after,
+        body = CubeOut(**result).model_dump_json().encode()
+    return Response(content=body, media_type="application/json", headers=_cache_headers(etag))
+
+
+# ─── FORECAST ─────────────────────────────────────────────────────────────────
+
+def _forecast_json(db: Session) -> bytes:
+    result = forecast.get_forecast(db)
+    if result is None:
+        raise HTTPException(status_code=404, detail="No goal set")
+    return result.model_dump_json().encode()
+
+
+if ASYNC_DB:
+    @app.get("/api/forecast", response_model=ForecastOut)
+    async def get_forecast(request: Request, db: AsyncSession = Depends(get_async_db)):
+        async def compute() -> bytes:
+            return await db.run_sync(_forecast_json)
+
+        return await cached_json_async(request, db, "forecast", compute)
+else:
+    @app.get("/api/forecast", response_model=ForecastOut)
+    def get_forecast(request: Request, db: Session = Depends(get_db)):
+        return cached_json(request, db, "forecast", lambda: _forecast_json(db))
+
+
+# ─── EXPORT ───────────────────────────────────────────────────────────────────
+
+EXPORT_FORMAT = Query("csv", pattern="^(csv|ndjson|columnar)$")
+
+
+def _export_response(user_id: int, name: str, columns, criteria: list, order_by, fmt: str) -> StreamingResponse:
+    ext = {"csv": "csv", "ndjson": "ndjson", "columnar": "spcol"}[fmt]
+    return StreamingResponse(
+        exporter.stream_export(lambda: user_session(user_id), columns, criteria, order_by, fmt),
+        media_type=exporter.MEDIA_TYPES[fmt],
+        headers={"Content-Disposition": f'attachment; filename="{name}.{ext}"'},
     )
 
 
-# ─── ANALYTICS ────────────────────────────────────────────────────────────────
+@app.get("/api/export/expenses")
+def export_expenses(
+    format:       str                    = EXPORT_FORMAT,
+    category:     Optional[CategoryEnum] = None,
+    payment_mode: Optional[str]          = None,
+    mood:         Optional[MoodEnum]     = None,
+    date_from:    Optional[date]         = None,
+    date_to:      Optional[date]         = None,
+    user_id:      int                    = Depends(current_user),
+):
+    """Stream every (filtered) expense, oldest first, in constant memory."""
+    criteria = expense_filters(
+        category=category, payment_mode=payment_mode, mood=mood,
+        date_from=date_from, date_to=date_to,
+    )
+    return _export_response(user_id, "expenses", exporter.EXPENSE_COLUMNS, criteria, Expense.id, format)
 
-@app.get("/api/analytics", response_model=AnalyticsOut)
-def analytics(db: Session = Depends(get_db)):
-    goal = db.query(Goal).order_by(Goal.id.desc()).first()
-    return compute_analytics(db, goal)
+
+@app.get("/api/export/ledger")
+def export_ledger(format: str = EXPORT_FORMAT, user_id: int = Depends(current_user)):
+    """Stream the full balance ledger, oldest first, in constant memory."""
+    return _export_response(user_id, "ledger", exporter.LEDGER_COLUMNS, [], BalanceLedger.id, format)
+
+
+@app.get("/api/_metrics", include_in_schema=False, dependencies=[Depends(current_user)])
+def get_metrics():
+    """Request, SQL and computation metrics in Prometheus text format; needs a token in multi-user mode."""
+    return Response(metrics.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
 
 
 # ─── STATIC FRONTEND ────────────────────────────────────────────────────────────────
@@ -275,24 +544,30 @@ frontend_path = os.path.abspath(
 )
 
 if os.path.exists(frontend_path):
+    assets.load(frontend_path)
     app.mount("/assets", StaticFiles(directory=frontend_path), name="assets")
 
     @app.get("/")
-    def serve_frontend():
-        return FileResponse(os.path.join(frontend_path, "index.html"))
+    def serve_frontend(request: Request):
+        return assets.serve(request, "index.html")
 
     @app.get("/analytics")
-    def serve_analytics():
-        return FileResponse(os.path.join(frontend_path, "analytics.html"))
+    def serve_analytics(request: Request):
+        return assets.serve(request, "analytics.html")
+
+    @app.get("/static/{path}")
+    def serve_static(request: Request, path: str):
+        return assets.serve_fingerprinted(request, path)
 
+    # Unfingerprinted names, for pages cached before the /static/ URLs existed.
     @app.get("/style.css")
-    def serve_css():
-        return FileResponse(os.path.join(frontend_path, "style.css"), media_type="text/css")
+    def serve_css(request: Request):
+        return assets.serve(request, "style.css")
 
     @app.get("/app.js")
-    def serve_js():
-        return FileResponse(os.path.join(frontend_path, "app.js"), media_type="application/javascript")
+    def serve_js(request: Request):
+        return assets.serve(request, "app.js")
 
     @app.get("/analytics.js")
-    def serve_analytics_js():
-        return FileResponse(os.path.join(frontend_path, "analytics.js"), media_type="application/javascript")
+    def serve_analytics_js(request: Request):
+        return assets.serve(request, "analytics.js")
@@ -0,0 +1,154 @@
+"""
+Maintenance commands.
+
+    python manage.py verify-totals    # report drift between expense_totals / the cube rollups and expenses
+    python manage.py rebuild-totals   # recompute expense_totals and the cube rollups from expenses
+    python manage.py rebuild-balance  # recompute the balance checkpoint from the ledger
+    python manage.py detect-recurring # rebuild recurring_series from expenses
+    python manage.py create-user NAME # add a user and print their API token
+    python manage.py issue-token ID   # replace a user's API token and print it
+
+The maintenance commands run for every user, or just one with --user ID.
+"""
+import argparse
+import sys
+import time
+
+import auth
+import recurring
+from database import SessionLocal, init_db, user_session
+from engine import rebuild_expense_totals, verify_expense_totals, rebuild_balance_checkpoint
+from models import User
+
+
+def verify_totals(user_id: int) -> int:
+    db = user_session(user_id)
+    try:
+        drift = verify_expense_totals(db)
+    finally:
+        db.close()
+    if not drift:
+        print("expense_totals and cube rollups OK — no drift")
+        return 0
+    print(f"expense_totals / cube rollup drift in {len(drift)} bucket(s):")
+    for d in drift:
+        print(
+            f"  {d['dimension']:<13} {d['key'] or '-':<12} "
+            f"total {d['stored_total']} → {d['actual_total']}   "
+            f"count {d['stored_count']} → {d['actual_count']}"
+        )
+    return 1
+
+
+def rebuild_totals(user_id: int) -> int:
+    db = user_session(user_id)
+    try:
+        drift = verify_expense_totals(db)
+        rebuild_expense_totals(db)
+        db.commit()
+    finally:
+        db.close()
+    print(f"expense_totals and cube rollups rebuilt ({len(drift)} drifted bucket(s) corrected)")
+    return 0
+
+
+def rebuild_balance(user_id: int) -> int:
+    db = user_session(user_id)
+    try:
+        checkpoint = rebuild_balance_checkpoint(db)
+        db.commit()
+        balance = checkpoint.current_balance if checkpoint else None
+    finally:
+        db.close()
+    if balance is None:
+        print("No 'set' entry in the ledger — checkpoint cleared")
+    else:
+        print(f"Balance checkpoint rebuilt: current balance {balance}")
+    return 0
+
+
+def detect_recurring(user_id: int) -> int:
+    db = user_session(user_id)
+    try:
+        started = time.perf_counter()
+        found = recurring.detect_all(db)
+        db.commit()
+        elapsed = time.perf_counter() - started
+    finally:
+        db.close()
+    print(f"recurring_series rebuilt: {found} recurring series ({elapsed:.2f}s)")
+    return 0
+
+
+def create_user(name: str) -> int:
+    db = SessionLocal()
+    try:
+        user, token = auth.create_user(db, name)
+        db.commit()
+        print(f"Created user {user.id} ({name}). API token (shown once):\n{token}")
+    finally:
+        db.close()
+    return 0
+
+
+def issue_token(user_id: str) -> int:
+    db = SessionLocal()
+    try:
+        user = db.get(User, int(user_id))
+        if user is None:
+            print(f"No user {user_id}")
+            return 1
+        token = auth.issue_token(db, user)
+        db.commit()
+        print(f"New API token for user {user.id} ({user.name}); the old one no longer works:\n{token}")
+    finally:
+        db.close()
+    return 0
+
+
+COMMANDS = {
+    "verify-totals":    verify_totals,
+    "rebuild-totals":   rebuild_totals,
+    "rebuild-balance":  rebuild_balance,
+    "detect-recurring": detect_recurring,
+}
+USER_COMMANDS = {
+    "create-user": create_user,
+    "issue-token": issue_token,
+}
+
+
+def _user_ids(only) -> list:
+    if only is not None:
+        return [only]
+    db = SessionLocal()
+    try:
+        return [uid for (uid,) in db.query(User.id).order_by(User.id)]
+    finally:
+        db.close()
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Spender maintenance commands")
+    parser.add_argument("command", choices=sorted({**COMMANDS, **USER_COMMANDS}))
+    parser.add_argument("args", nargs="*", help="NAME for create-user, ID for issue-token")
+    parser.add_argument("--user", type=int, help="run a maintenance command for this user only")
+    args = parser.parse_args(argv)
+    init_db()
+
+    if args.command in USER_COMMANDS:
+        if len(args.args) != 1:
+            parser.error(f"{args.command} takes exactly one argument")
+        return USER_COMMANDS[args.command](args.args[0])
+
+    user_ids = _user_ids(args.user)
+    status = 0
+    for user_id in user_ids:
+        if len(user_ids) > 1:
+            print(f"[user {user_id}] ", end="")
+        status = max(status, COMMANDS[args.command](user_id))
+    return status
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,231 @@
+"""
+Request, query and computation metrics in Prometheus text format.
+
+    MetricsMiddleware   per-route latency histogram and request counts, plus
+                        the number of SQL statements / ORM rows each request used
+    record_query()      called from the engine hooks in database.py for every
+                        statement; statements slower than SLOW_QUERY_MS are logged
+                        to the "spender.sql" logger
+    @timed              wraps the compute_* functions in engine.py
+
+Everything lives in this process (like cache.py): with several uvicorn
+workers each one exposes its own numbers at /api/_metrics.
+SPENDER_METRICS=0 turns the middleware and engine hooks off.
+"""
+import logging
+import os
+import threading
+import time
+from contextvars import ContextVar
+from functools import wraps
+from typing import Dict, Optional, Tuple
+
+ENABLED = os.getenv("SPENDER_METRICS", "1") != "0"
+SLOW_QUERY_MS = float(os.getenv("SPENDER_SLOW_QUERY_MS", "100"))
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+QUERY_BUCKETS   = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.1, 0.5)
+COUNT_BUCKETS   = (0, 1, 2, 3, 5, 8, 13, 21, 34, 55, 100)
+
+# Long-lived or self-referential routes that would only distort the histograms.
+EXCLUDED_ROUTES = {"/api/stream", "/api/_metrics"}
+
+slow_log = logging.getLogger("spender.sql")
+
+_lock = threading.Lock()
+
+
+class _RequestStats:
+    __slots__ = ("queries", "query_seconds", "rows")
+
+    def __init__(self):
+        self.queries = 0
+        self.query_seconds = 0.0
+        self.rows = 0
+
+
+_current: ContextVar[Optional[_RequestStats]] = ContextVar("spender_request_stats", default=None)
+
+
+# ─── Metric Types ─────────────────────────────────────────────────────────────
+
+class Histogram:
+    def __init__(self, name: str, help: str, buckets: tuple, labels: Tuple[str, ...] = ()):
+        self.name, self.help, self.buckets, self.labels = name, help, buckets, labels
+        self.series: Dict[tuple, list] = {}   # label values → [bucket counts..., sum, count]
+
+    def observe(self, value: float, *label_values) -> None:
+        with _lock:
+            s = self.series.get(label_values)
+            if s is None:
+                s = self.series[label_values] = [0] * (len(self.buckets) + 2)
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    s[i] += 1
+            s[-2] += value
+            s[-1] += 1
+
+    def render(self) -> list:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        for label_values, s in sorted(self.series.items()):
+            base = _labels(self.labels, label_values)
+            for bound, n in zip(self.buckets, s):
+                lines.append(f"{self.name}_bucket{_join(base, 'le=' + _quote(bound))} {n}")
+            lines.append(f"{self.name}_bucket{_join(base, 'le=' + _quote('+Inf'))} {s[-1]}")
+            lines.append(f"{self.name}_sum{_wrap(base)} {s[-2]:.6f}")
+            lines.append(f"{self.name}_count{_wrap(base)} {s[-1]}")
+        return lines
+
+
+class Counter:
+    def __init__(self, name: str, help: str, labels: Tuple[str, ...] = ()):
+        self.name, self.help, self.labels = name, help, labels
+        self.series: Dict[tuple, float] = {}
+
+    def inc(self, amount: float = 1, *label_values) -> None:
+        with _lock:
+            self.series[label_values] = self.series.get(label_values, 0) + amount
+
+    def render(self) -> list:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        series = self.series or ({} if self.labels else {(): 0})
+        for label_values, value in sorted(series.items()):
+            lines.append(f"{self.name}{_wrap(_labels(self.labels, label_values))} {value:g}")
+        return lines
+
+
+def _labels(names: tuple, values: tuple) -> str:
+    return ",".join(f"{n}={_quote(v)}" for n, v in zip(names, values))
+
+
+def _quote(value) -> str:
+    escaped = str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+    return '"' + escaped + '"'
+
+
+def _join(base: str, extra: str) -> str:
+    return "{" + (f"{base},{extra}" if base else extra) + "}"
+
+
+def _wrap(base: str) -> str:
+    return "{" + base + "}" if base else ""
+
+
+REQUEST_SECONDS = Histogram(
+    "spender_http_request_duration_seconds", "Request latency by route.",
+    LATENCY_BUCKETS, ("method", "route"),
+)
+REQUESTS = Counter(
+    "spender_http_requests_total", "Requests by route and status.",
+    ("method", "route", "status"),
+)
+REQUEST_QUERIES = Histogram(
+    "spender_db_queries_per_request", "SQL statements issued per request.",
+    COUNT_BUCKETS, ("method", "route"),
+)
+REQUEST_DB_SECONDS = Counter(
+    "spender_db_seconds_total", "Time spent executing SQL, by route.",
+    ("method", "route"),
+)
+REQUEST_ROWS = Counter(
+    "spender_db_rows_loaded_total", "ORM rows loaded, by route.",
+    ("method", "route"),
+)
+QUERY_SECONDS = Histogram(
+    "spender_db_query_duration_seconds", "Duration of each SQL statement.", QUERY_BUCKETS,
+)
+SLOW_QUERIES = Counter(
+    "spender_db_slow_queries_total", "Statements slower than SPENDER_SLOW_QUERY_MS.",
+)
+COMPUTE_SECONDS = Histogram(
+    "spender_compute_duration_seconds", "Time spent in engine computations.",
+    LATENCY_BUCKETS, ("function",),
+)
+
+REGISTRY = (
+    REQUEST_SECONDS, REQUESTS, REQUEST_QUERIES, REQUEST_DB_SECONDS, REQUEST_ROWS,
+    QUERY_SECONDS, SLOW_QUERIES, COMPUTE_SECONDS,
+)
+
+
+def render() -> str:
+    lines = []
+    for metric in REGISTRY:
+        lines += metric.render()
+    return "\n".join(lines) + "\n"
+
+
+# ─── Hooks ────────────────────────────────────────────────────────────────────
+
+def record_query(statement: str, seconds: float) -> None:
+    QUERY_SECONDS.observe(seconds)
+    stats = _current.get()
+    if stats is not None:
+        stats.queries += 1
+        stats.query_seconds += seconds
+    if seconds * 1000 >= SLOW_QUERY_MS:
+        SLOW_QUERIES.inc()
+        slow_log.warning("slow query (%.1f ms): %s", seconds * 1000, " ".join(statement.split())[:500])
+
+
+def record_row_loaded() -> None:
+    stats = _current.get()
+    if stats is not None:
+        stats.rows += 1
+
+
+def timed(fn):
+    """Record fn's wall time under spender_compute_duration_seconds{function=...}."""
+    if not ENABLED:
+        return fn
+    name = fn.__name__
+
+    @wraps(fn)
+    def wrapper(*args, **kwargs):
+        started = time.perf_counter()
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            COMPUTE_SECONDS.observe(time.perf_counter() - started, name)
+    return wrapper
+
+
+class MetricsMiddleware:
+    """Pure ASGI middleware, so streamed responses aren't buffered."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        stats = _RequestStats()
+        token = _current.set(stats)
+        status = 500
+        finished = None
+
+        async def send_wrapper(message):
+            nonlocal status, finished
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            elif message["type"] == "http.response.body" and not message.get("more_body"):
+                # Background tasks run after this; they aren't the client's latency.
+                finished = time.perf_counter()
+            await send(message)
+
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = (finished or time.perf_counter()) - started
+            _current.reset(token)
+            route = scope.get("route")
+            path = getattr(route, "path", None) or "unmatched"
+            if path not in EXCLUDED_ROUTES:
+                method = scope["method"]
+                REQUEST_SECONDS.observe(elapsed, method, path)
+                REQUESTS.inc(1, method, path, status)
+                REQUEST_QUERIES.observe(stats.queries, method, path)
+                REQUEST_DB_SECONDS.inc(stats.query_seconds, method, path)
+                REQUEST_ROWS.inc(stats.rows, method, path)
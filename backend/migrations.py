@@ -0,0 +1,259 @@
+"""
+Versioned schema migrations.
+
+schema_version holds one row per step applied to a database. migrate()
+reads the highest version with one query and returns right away when it is
+LATEST, so a normal start does no schema introspection at all.
+
+  empty database      create_all() from models.py, stamped LATEST
+  versioned database  the steps above its version, in order
+  older database      tables but no schema_version: every step, from 1
+
+Steps 1-8 bring a database from before versioning up to date. That
+database could come from any earlier release, so these steps check what
+is already there. Step 1 creates missing tables straight from models.py,
+so every step after it must also cope with a table that already has its
+final shape. Pending steps run in one BEGIN IMMEDIATE transaction. A step
+that fails leaves the database as it was, and workers starting together
+apply each step once.
+
+To change the schema: change models.py, then append a step to STEPS.
+"""
+import logging
+import time
+from datetime import datetime
+from typing import Callable, List, Optional, Tuple
+
+from sqlalchemy import Connection, text
+from sqlalchemy.orm import Session
+
+from auth import DEFAULT_USER_ID
+from models import (
+    Base, BalanceCheckpoint, BalanceLedger, DataVersion, Expense, ExpenseTotal, RecurringSeries, SchemaVersion,
+)
+
+log = logging.getLogger("spender.db")
+
+
+# ─── Steps 1-5: schema from before versioning ─────────────────────────────────
+
+def _create_missing_tables(conn: Connection, owner_id: int) -> None:
+    Base.metadata.create_all(bind=conn)
+
+
+def _column_names(conn: Connection, table: str) -> List[str]:
+    return [row[1] for row in conn.execute(text(f"PRAGMA table_info({table})"))]
+
+
+def _goals_initial_savings(conn: Connection, owner_id: int) -> None:
+    if "initial_savings" not in _column_names(conn, "goals"):
+        conn.execute(text("ALTER TABLE goals ADD COLUMN initial_savings INTEGER NOT NULL DEFAULT 0"))
+
+
+def _expenses_payment_mode(conn: Connection, owner_id: int) -> None:
+    if "payment_mode" not in _column_names(conn, "expenses"):
+        conn.execute(text("ALTER TABLE expenses ADD COLUMN payment_mode TEXT NOT NULL DEFAULT 'upi'"))
+
+
+# Tables whose unique constraints gained user_id; SQLite can't alter a
+# constraint, so they are copied into a freshly created table.
+_USER_UNIQUE_TABLES = {"expense_totals", "weekly_limits", "weekly_history", "recurring_series"}
+_PRE_USER_INDEXES = (
+    "ix_expenses_category_amount", "ix_expenses_payment_mode_amount",
+    "ix_expenses_date_amount", "ix_expenses_date_id", "ix_balance_ledger_type_recorded_at",
+)
+
+
+def _user_id_columns(conn: Connection, owner_id: int) -> None:
+    """user_id on every user-owned table; existing rows belong to owner_id."""
+    for table in Base.metadata.sorted_tables:
+        if "user_id" not in table.c:
+            continue
+        columns = _column_names(conn, table.name)
+        if "user_id" in columns:
+            continue
+        if table.name in _USER_UNIQUE_TABLES:
+            _rebuild_with_user_id(conn, table, columns, owner_id)
+        else:
+            conn.execute(text(
+                f"ALTER TABLE {table.name} ADD COLUMN user_id INTEGER NOT NULL DEFAULT {owner_id}"
+            ))
+    for name in _PRE_USER_INDEXES:
+        conn.execute(text(f"DROP INDEX IF EXISTS {name}"))
+
+
+def _rebuild_with_user_id(conn: Connection, table, old_columns: List[str], owner_id: int) -> None:
+    old = f"{table.name}_pre_users"
+    conn.execute(text(f"ALTER TABLE {table.name} RENAME TO {old}"))
+    # Named indexes move with the renamed table and would clash with the new ones.
+    indexes = conn.execute(text(
+        "SELECT name FROM sqlite_master WHERE type = 'index' AND tbl_name = :t AND sql IS NOT NULL"
+    ), {"t": old}).scalars().all()
+    for index in indexes:
+        conn.execute(text(f"DROP INDEX {index}"))
+    table.create(bind=conn)
+    cols = ", ".join(c for c in old_columns if c in table.c)
+    conn.execute(text(
+        f"INSERT INTO {table.name} ({cols}, user_id) SELECT {cols}, {owner_id} FROM {old}"
+    ))
+    conn.execute(text(f"DROP TABLE {old}"))
+
+
+def _model_indexes(conn: Connection, owner_id: int) -> None:
+    # create_all skips indexes on tables that already exist; indexes on
+    # columns a later step adds are created by that step.
+    for table in Base.metadata.sorted_tables:
+        columns = set(_column_names(conn, table.name))
+        for index in table.indexes:
+            if all(c.name in columns for c in index.columns):
+                index.create(bind=conn, checkfirst=True)
+
+
+# ─── Steps 6-8: derived tables for data from before they existed ──────────────
+
+def _owner_session(conn: Connection, owner_id: int) -> Session:
+    # Joins the migration's transaction; flushed, never committed, by the steps.
+    return Session(bind=conn, info={"user_id": owner_id}, autoflush=False)
+
+
+def _backfill_expense_totals(conn: Connection, owner_id: int) -> None:
+    from engine import rebuild_expense_totals
+
+    db = _owner_session(conn, owner_id)
+    if db.query(ExpenseTotal.id).first() is None and db.query(Expense.id).first() is not None:
+        rebuild_expense_totals(db)
+        db.flush()
+    db.close()
+
+
+def _backfill_balance_checkpoint(conn: Connection, owner_id: int) -> None:
+    from engine import rebuild_balance_checkpoint
+
+    db = _owner_session(conn, owner_id)
+    has_set = db.query(BalanceLedger.id).filter(BalanceLedger.type == "set").first()
+    if has_set and db.get(BalanceCheckpoint, owner_id) is None:
+        rebuild_balance_checkpoint(db)
+        db.flush()
+    db.close()
+
+
+def _backfill_recurring_series(conn: Connection, owner_id: int) -> None:
+    import recurring
+
+    db = _owner_session(conn, owner_id)
+    if db.query(RecurringSeries.id).first() is None and db.query(Expense.id).first() is not None:
+        recurring.detect_all(db)
+        db.flush()
+    db.close()
+
+
+# ─── Steps 9+ ─────────────────────────────────────────────────────────────────
+
+def _ledger_recorded_at_index(conn: Connection, owner_id: int) -> None:
+    conn.execute(text(
+        "CREATE INDEX IF NOT EXISTS ix_balance_ledger_user_recorded_at ON balance_ledger (user_id, recorded_at)"
+    ))
+
+
+def _expense_rollups(conn: Connection, owner_id: int) -> None:
+    # Every user's expenses, not just owner_id's: the database may already be shared.
+    import cube
+
+    for model in cube.GRAINS:
+        model.__table__.create(bind=conn, checkfirst=True)
+    cube.backfill(conn)
+
+
+def _data_versions(conn: Connection, owner_id: int) -> None:
+    DataVersion.__table__.create(bind=conn, checkfirst=True)
+
+
+def _expense_signatures(conn: Connection, owner_id: int) -> None:
+    # Every user's expenses, as in _expense_rollups.
+    import recurring
+
+    if "signature" not in _column_names(conn, "expenses"):
+        conn.execute(text("ALTER TABLE expenses ADD COLUMN signature VARCHAR"))
+    rows = conn.execute(text("SELECT id, category, note FROM expenses WHERE signature IS NULL"))
+    updates = [
+        {"id": id_, "signature": sig}
+        for id_, category, note in rows
+        if (sig := recurring.signature(category, note)) is not None
+    ]
+    if updates:
+        conn.execute(text("UPDATE expenses SET signature = :signature WHERE id = :id"), updates)
+    for index in Expense.__table__.indexes:
+        index.create(bind=conn, checkfirst=True)
+    # Word-less notes used to share one series per category; they no longer have one.
+    blank = [
+        id_ for id_, note in conn.execute(text("SELECT id, note FROM recurring_series"))
+        if not recurring.normalize_note(note)
+    ]
+    for i in range(0, len(blank), 500):
+        conn.execute(RecurringSeries.__table__.delete().where(RecurringSeries.__table__.c.id.in_(blank[i:i + 500])))
+
+
+# (version, name, step); append only, never renumber
+STEPS: List[Tuple[int, str, Callable[[Connection, int], None]]] = [
+    (1, "create missing tables",           _create_missing_tables),
+    (2, "goals.initial_savings",           _goals_initial_savings),
+    (3, "expenses.payment_mode",           _expenses_payment_mode),
+    (4, "user_id on user-owned tables",    _user_id_columns),
+    (5, "model indexes",                   _model_indexes),
+    (6, "backfill expense_totals",         _backfill_expense_totals),
+    (7, "backfill balance_checkpoint",     _backfill_balance_checkpoint),
+    (8, "backfill recurring_series",       _backfill_recurring_series),
+    (9, "ix_balance_ledger_user_recorded_at", _ledger_recorded_at_index),
+    (10, "expense_rollup tables",          _expense_rollups),
+    (11, "data_versions",                  _data_versions),
+    (12, "expenses.signature",             _expense_signatures),
+]
+LATEST = STEPS[-1][0]
+
+
+# ─── Runner ───────────────────────────────────────────────────────────────────
+
+def current_version(conn: Connection) -> Optional[int]:
+    """The database's schema version: 0 if it predates versioning, None if it is empty."""
+    tables = set(conn.execute(text("SELECT name FROM sqlite_master WHERE type = 'table'")).scalars())
+    if SchemaVersion.__tablename__ in tables:
+        return conn.execute(text("SELECT MAX(version) FROM schema_version")).scalar() or 0
+    return 0 if tables else None
+
+
+def migrate(conn: Connection, owner_id: int = DEFAULT_USER_ID) -> int:
+    """
+    Bring the database behind `conn` to LATEST and commit. Rows that predate
+    multi-user support go to owner_id. Returns the number of steps applied.
+    """
+    if current_version(conn) == LATEST:
+        conn.rollback()
+        return 0
+
+    conn.execute(text("BEGIN IMMEDIATE"))
+    try:
+        version = current_version(conn)   # another process may have got here first
+        applied = 0
+        if version is None:
+            Base.metadata.create_all(bind=conn)
+            conn.execute(SchemaVersion.__table__.insert(), {
+                "version": LATEST, "name": "create_all", "applied_at": datetime.utcnow(),
+            })
+            log.info("created schema at version %d", LATEST)
+        else:
+            SchemaVersion.__table__.create(bind=conn, checkfirst=True)
+            for number, name, step in STEPS:
+                if number <= version:
+                    continue
+                started = time.perf_counter()
+                step(conn, owner_id)
+                conn.execute(SchemaVersion.__table__.insert(), {
+                    "version": number, "name": name, "applied_at": datetime.utcnow(),
+                })
+                applied += 1
+                log.info("applied migration %d (%s) in %.2fs", number, name, time.perf_counter() - started)
+        conn.commit()
+        return applied
+    except BaseException:
+        conn.rollback()
+        raise
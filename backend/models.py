@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Date, DateTime, Text, Enum
+from sqlalchemy import Column, Integer, String, Date, DateTime, Text, Enum, Index, UniqueConstraint, JSON
 from sqlalchemy.ext.declarative import declarative_base
 from datetime import datetime
 import enum
@@ -26,7 +26,37 @@ class MoodEnum(str, enum.Enum):
     happy    = "happy"
 
 
-class Goal(Base):
+class SchemaVersion(Base):
+    """One row per migration step applied to this database (see migrations.py)."""
+    __tablename__ = "schema_version"
+
+    version    = Column(Integer, primary_key=True)
+    name       = Column(String,  nullable=False)
+    applied_at = Column(DateTime, default=datetime.utcnow)
+
+
+class User(Base):
+    """An account. Only a SHA-256 of the API token is stored (see auth.py)."""
+    __tablename__ = "users"
+
+    id         = Column(Integer, primary_key=True)
+    name       = Column(String,  nullable=False)
+    token_hash = Column(String,  nullable=True, unique=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+
+class UserOwned:
+    """
+    Rows that belong to one user. Sessions are scoped to a user
+    (database.user_session), which adds user_id = :user to every ORM query
+    on these tables and stamps it on new rows, so indexes lead on user_id
+    and every query reads one user's slice. Not a foreign key: in shard
+    mode the rows live in a per-user file without the users table.
+    """
+    user_id = Column(Integer, nullable=False)
+
+
+class Goal(UserOwned, Base):
     __tablename__ = "goals"
 
     id               = Column(Integer, primary_key=True, index=True)
@@ -39,8 +69,13 @@ class Goal(Base):
     initial_savings  = Column(Integer, nullable=False, default=0)
     created_at       = Column(DateTime, default=datetime.utcnow)
 
+    __table_args__ = (
+        # "Latest goal" is order_by(id desc).first() within the user
+        Index("ix_goals_user_id", "user_id", "id"),
+    )
 
-class Expense(Base):
+
+class Expense(UserOwned, Base):
     __tablename__ = "expenses"
 
     id           = Column(Integer, primary_key=True, index=True)
@@ -50,29 +85,172 @@ class Expense(Base):
     note         = Column(Text,    nullable=True)
     mood         = Column(String,  nullable=True)
     payment_mode = Column(String,  nullable=False, default="upi")  # 'upi' | 'card'
+    signature    = Column(String,  nullable=True)   # recurring.signature(category, note); NULL for word-less notes
+
+    # Covering indexes for the SUM/GROUP BY aggregates in engine.py
+    __table_args__ = (
+        Index("ix_expenses_user_category_amount",     "user_id", "category",     "amount"),
+        Index("ix_expenses_user_payment_mode_amount", "user_id", "payment_mode", "amount"),
+        # Also covers the columnar.py scan of one user's (date, amount, category, payment_mode)
+        Index("ix_expenses_user_date_amount",         "user_id", "date",         "amount", "category", "payment_mode"),
+        # Keyset pagination on (date desc, id desc) in GET /api/expenses
+        Index("ix_expenses_user_date_id",             "user_id", "date",         "id"),
+        # One signature's expenses in date order, for recurring.rescan()
+        Index("ix_expenses_user_signature_date",      "user_id", "signature",    "date", "id"),
+    )
+
+
+class ExpenseTotal(UserOwned, Base):
+    """
+    Running totals of the expenses table, maintained in the same transaction
+    as every expense insert/delete:
+      dimension='all'          key=''            → grand total
+      dimension='category'     key=<category>
+      dimension='payment_mode' key=<'upi'|'card'>
+      dimension='day'          key=<YYYY-MM-DD>
+    """
+    __tablename__ = "expense_totals"
+
+    id        = Column(Integer, primary_key=True, index=True)
+    dimension = Column(String,  nullable=False)
+    key       = Column(String,  nullable=False)
+    total     = Column(Integer, nullable=False, default=0)
+    count     = Column(Integer, nullable=False, default=0)
+
+    __table_args__ = (
+        UniqueConstraint("user_id", "dimension", "key", name="uq_expense_totals_user_dimension_key"),
+    )
+
+
+class ExpenseRollup(UserOwned, Base):
+    """
+    Expenses summed per (day, category, mood, payment_mode), maintained
+    alongside expense_totals; /api/analytics/cube slices it (see cube.py).
+    mood is '' for expenses without one, so it can be part of the key.
+    Without rowid, the primary key is the table: a date range is one seek
+    and the sums are read straight off it.
+    """
+    __tablename__ = "expense_rollup"
+
+    user_id      = Column(Integer, primary_key=True)
+    day          = Column(Date,    primary_key=True)
+    category     = Column(String,  primary_key=True)
+    mood         = Column(String,  primary_key=True)
+    payment_mode = Column(String,  primary_key=True)
+    total        = Column(Integer, nullable=False, default=0)
+    count        = Column(Integer, nullable=False, default=0)
+
+    __table_args__ = {"sqlite_with_rowid": False}
+
+
+class ExpenseRollupMonth(UserOwned, Base):
+    """expense_rollup summed per calendar month (month = 'YYYY-MM'), for the whole months of long ranges."""
+    __tablename__ = "expense_rollup_month"
+
+    user_id      = Column(Integer, primary_key=True)
+    month        = Column(String,  primary_key=True)
+    category     = Column(String,  primary_key=True)
+    mood         = Column(String,  primary_key=True)
+    payment_mode = Column(String,  primary_key=True)
+    total        = Column(Integer, nullable=False, default=0)
+    count        = Column(Integer, nullable=False, default=0)
+
+    __table_args__ = {"sqlite_with_rowid": False}
+
 
+class ExpenseRollupMonthWeekday(UserOwned, Base):
+    """
+    expense_rollup summed per calendar month and weekday (0 = Monday), for
+    weekday slices of long ranges. The key leads on (weekday, mood), so the
+    mood × weekday heatmap is grouped in key order, without a sort.
+    """
+    __tablename__ = "expense_rollup_month_weekday"
+
+    user_id      = Column(Integer, primary_key=True)
+    weekday      = Column(Integer, primary_key=True)
+    mood         = Column(String,  primary_key=True)
+    month        = Column(String,  primary_key=True)
+    category     = Column(String,  primary_key=True)
+    payment_mode = Column(String,  primary_key=True)
+    total        = Column(Integer, nullable=False, default=0)
+    count        = Column(Integer, nullable=False, default=0)
+
+    __table_args__ = {"sqlite_with_rowid": False}
 
-class WeeklyLimit(Base):
+
+class WeeklyLimit(UserOwned, Base):
     __tablename__ = "weekly_limits"
 
     id              = Column(Integer, primary_key=True, index=True)
-    week_start_date = Column(Date,    nullable=False, unique=True)
+    week_start_date = Column(Date,    nullable=False)
     weekly_cap      = Column(Integer, nullable=False, default=4000)
     spent_this_week = Column(Integer, nullable=False, default=0)
 
+    __table_args__ = (
+        UniqueConstraint("user_id", "week_start_date", name="uq_weekly_limits_user_week"),
+    )
+
 
-class WeeklyHistory(Base):
+class WeeklyHistory(UserOwned, Base):
     """Snapshot of each completed week for analytics."""
     __tablename__ = "weekly_history"
 
     id              = Column(Integer, primary_key=True, index=True)
-    week_start_date = Column(Date,    nullable=False, unique=True)
+    week_start_date = Column(Date,    nullable=False)
     weekly_cap      = Column(Integer, nullable=False)
     spent           = Column(Integer, nullable=False)
     saved           = Column(Integer, nullable=False)  # cap - spent (can be negative)
 
+    __table_args__ = (
+        UniqueConstraint("user_id", "week_start_date", name="uq_weekly_history_user_week"),
+    )
 
-class BalanceLedger(Base):
+
+class WeeklyHistoryStats(Base):
+    """
+    One row per user (id = user id) of aggregates over weekly_history,
+    advanced as weeks are frozen so analytics never rescans past weeks.
+    """
+    __tablename__ = "weekly_history_stats"
+
+    id                   = Column(Integer, primary_key=True)
+    weeks                = Column(Integer, nullable=False, default=0)
+    spent_sum            = Column(Integer, nullable=False, default=0)
+    best_week_saved      = Column(Integer, nullable=True)   # largest positive saved
+    worst_week_overspend = Column(Integer, nullable=True)   # largest overspend, as a positive number
+    last_frozen_week     = Column(Date,    nullable=True)
+
+
+class RecurringSeries(UserOwned, Base):
+    """
+    One row per (category, normalized note) signature seen in expenses,
+    carrying the running state recurring.py needs to extend it one expense
+    at a time. period is set once the intervals settle on a cadence
+    ('weekly' | 'biweekly' | 'monthly' | 'quarterly' | 'yearly').
+    """
+    __tablename__ = "recurring_series"
+
+    id             = Column(Integer, primary_key=True, index=True)
+    signature      = Column(String,  nullable=False)                # hash of category + normalized note
+    category       = Column(String,  nullable=False)
+    note           = Column(Text,    nullable=True)                 # latest raw note
+    payment_mode   = Column(String,  nullable=False, default="upi")
+    amount         = Column(Integer, nullable=False)                # latest amount
+    first_date     = Column(Date,    nullable=False)
+    last_date      = Column(Date,    nullable=False)
+    occurrences    = Column(Integer, nullable=False, default=1)
+    gap_counts     = Column(JSON,    nullable=False, default=dict)  # period → intervals that matched it
+    stable_amounts = Column(Integer, nullable=False, default=0)     # intervals where the amount held steady
+    period         = Column(String,  nullable=True)
+    next_date      = Column(Date,    nullable=True)
+
+    __table_args__ = (
+        UniqueConstraint("user_id", "signature", name="uq_recurring_series_user_signature"),
+        Index("ix_recurring_series_user_period_next_date", "user_id", "period", "next_date"),
+    )
+
+
+class BalanceLedger(UserOwned, Base):
     """
     Every row is one event that changes the balance:
       type='set'    → user manually set balance (e.g. after checking bank app)
@@ -87,3 +265,39 @@ class BalanceLedger(Base):
     amount      = Column(Integer,  nullable=False)   # always positive
     note        = Column(Text,     nullable=True)
     recorded_at = Column(DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        Index("ix_balance_ledger_user_type_recorded_at", "user_id", "type", "recorded_at"),
+        Index("ix_balance_ledger_user_recorded_at",      "user_id", "recorded_at"),   # newest-first ledger page
+    )
+
+
+class BalanceCheckpoint(Base):
+    """
+    One row per user (id = user id) holding the running balance, updated by
+    every ledger write so the current balance is one primary-key read instead
+    of a scan since the last 'set'.
+    """
+    __tablename__ = "balance_checkpoint"
+
+    id              = Column(Integer,  primary_key=True)
+    last_set_id     = Column(Integer,  nullable=False)
+    last_set_amount = Column(Integer,  nullable=False)
+    last_set_at     = Column(DateTime, nullable=False)
+    last_set_note   = Column(Text,     nullable=True)
+    credits_since   = Column(Integer,  nullable=False, default=0)
+    debits_since    = Column(Integer,  nullable=False, default=0)
+    current_balance = Column(Integer,  nullable=False)
+
+
+class DataVersion(Base):
+    """
+    One row per user (id = user id) counting their committed writes. Every
+    transaction that writes through a user's session bumps it before it
+    commits (database.py), so every worker reads the same version and
+    response ETags (cache.py) survive restarts.
+    """
+    __tablename__ = "data_versions"
+
+    id      = Column(Integer, primary_key=True)
+    version = Column(Integer, nullable=False, default=0)
@@ -0,0 +1,163 @@
+"""
+Monte Carlo goal projection.
+
+compute_projection() assumes every remaining month saves the same amount.
+This module instead bootstraps future spending from the user's own history:
+every path to the goal deadline is built from whole historical weeks drawn
+with replacement (so a week's rhythm — weekend spikes, rent day — stays
+intact) plus single historical days for the trailing partial week. Each
+path's end balance is
+
+    total_saved + usable income until the deadline - resampled spend
+
+and the distribution over all paths gives the probability of reaching
+target_amount and percentile balances.
+
+History comes from the per-day buckets of the expense_totals table, so the
+cost is one indexed range read plus a (paths × weeks) draw. NumPy (in
+requirements.txt) does the draw in a few milliseconds. Without it the same
+bootstrap runs in Python with random.choices, which is too slow at
+MAX_PATHS to stay interactive.
+"""
+import random
+from datetime import date, timedelta
+from typing import List, Optional
+
+from sqlalchemy.orm import Session
+
+from models import ExpenseTotal, Goal
+from schemas import MC_MAX_PATHS, MonteCarloOut, PercentileBalance
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - optional dependency
+    np = None
+
+MAX_PATHS = MC_MAX_PATHS   # requests over it get a 422 (schemas.MonteCarloRequest)
+PERCENTILES = (5, 25, 50, 75, 95)
+
+
+def daily_spend_history(db: Session, history_days: int, today: Optional[date] = None) -> List[int]:
+    """
+    Total spend per calendar day over the last history_days complete days,
+    zero-filled, oldest first. Starts at the first day anything was logged
+    so a new user's empty past doesn't read as a streak of zero-spend days.
+    """
+    today = today or date.today()
+    until = today - timedelta(days=1)
+    since = today - timedelta(days=max(1, history_days))
+
+    rows = (
+        db.query(ExpenseTotal.key, ExpenseTotal.total)
+        .filter(
+            ExpenseTotal.dimension == "day",
+            ExpenseTotal.count > 0,
+            ExpenseTotal.key >= since.isoformat(),
+            ExpenseTotal.key <= until.isoformat(),
+        )
+        .all()
+    )
+    if not rows:
+        # Nothing logged before today: today's partial spend is the only signal there is.
+        today_total = _stored_day(db, today)
+        return [today_total] if today_total else []
+
+    by_day = {date.fromisoformat(k): total for k, total in rows}
+    start = min(by_day)
+    return [by_day.get(start + timedelta(days=i), 0) for i in range((until - start).days + 1)]
+
+
+def _stored_day(db: Session, d: date) -> int:
+    total = (
+        db.query(ExpenseTotal.total)
+        .filter(ExpenseTotal.dimension == "day", ExpenseTotal.key == d.isoformat())
+        .scalar()
+    )
+    return total or 0
+
+
+def weekly_blocks(daily: List[int]) -> List[int]:
+    """Consecutive 7-day sums, newest block ending on the last history day."""
+    offset = len(daily) % 7
+    return [sum(daily[i:i + 7]) for i in range(offset, len(daily), 7)]
+
+
+def simulate_spend(daily: List[int], horizon_days: int, paths: int, seed: Optional[int] = None):
+    """Resampled total spend over horizon_days for each of `paths` paths."""
+    weeks, rest = divmod(max(0, horizon_days), 7)
+    blocks = weekly_blocks(daily)
+    if not blocks:
+        # Under a week of history: build every day of the horizon from single days.
+        weeks, rest = 0, max(0, horizon_days)
+
+    if np is not None:
+        spend = np.zeros(paths, dtype=np.int64)
+        if not daily:
+            return spend
+        rng = np.random.default_rng(seed)
+        if weeks:
+            spend += rng.choice(np.asarray(blocks, dtype=np.int64), size=(paths, weeks)).sum(axis=1)
+        if rest:
+            spend += rng.choice(np.asarray(daily, dtype=np.int64), size=(paths, rest)).sum(axis=1)
+        return spend
+
+    if not daily:
+        return [0] * paths
+    rng = random.Random(seed)
+    spend = []
+    for _ in range(paths):
+        total = sum(rng.choices(blocks, k=weeks)) if weeks else 0
+        spend.append(total + sum(rng.choices(daily, k=rest)))
+    return spend
+
+
+def _percentile(sorted_values: list, pct: float) -> float:
+    """Linear interpolation between closest ranks (NumPy's default method)."""
+    pos = (len(sorted_values) - 1) * pct / 100
+    lo = int(pos)
+    hi = min(lo + 1, len(sorted_values) - 1)
+    return sorted_values[lo] + (sorted_values[hi] - sorted_values[lo]) * (pos - lo)
+
+
+def project_goal(
+    db: Session,
+    goal: Goal,
+    total_saved: int,
+    paths: int = 10000,
+    history_days: int = 180,
+    amount: int = 0,
+    seed: Optional[int] = None,
+) -> MonteCarloOut:
+    today = date.today()
+    paths = max(1, min(paths, MAX_PATHS))
+    horizon_days = max(0, (goal.deadline - today).days)
+    months_left  = horizon_days / 30.44
+    usable       = goal.monthly_income - goal.emi - goal.rent
+    start        = total_saved + int(usable * months_left) - amount
+
+    daily = daily_spend_history(db, history_days, today)
+    spend = simulate_spend(daily, horizon_days, paths, seed)
+
+    if np is not None:
+        final = start - spend
+        hit = float((final >= goal.target_amount).mean())
+        mean = float(final.mean())
+        pcts = np.percentile(final, PERCENTILES)
+    else:
+        final = sorted(start - s for s in spend)
+        hit = sum(1 for f in final if f >= goal.target_amount) / paths
+        mean = sum(final) / paths
+        pcts = [_percentile(final, p) for p in PERCENTILES]
+
+    return MonteCarloOut(
+        paths=paths,
+        horizon_days=horizon_days,
+        history_days=len(daily),
+        target_amount=goal.target_amount,
+        probability_hit_target=round(hit, 4),
+        expected_balance=int(round(mean)),
+        percentiles=[
+            PercentileBalance(percentile=p, balance=int(round(v)))
+            for p, v in zip(PERCENTILES, pcts)
+        ],
+    )
@@ -0,0 +1,308 @@
+"""
+Recurring-expense detector.
+
+Expenses are grouped by a signature: a hash of the category plus the note
+with digits, punctuation and month names stripped, so "Netflix – Oct 2025"
+and "netflix nov" land together. A signature becomes a series once it has
+MIN_OCCURRENCES expenses and most of its gaps (and amounts) agree on one
+cadence — weekly, biweekly, monthly, quarterly or yearly. A note with no
+words left after that (blank, or just "12/10") has no signature, so
+un-noted expenses never form a series on their category alone.
+
+Each expense stores its signature (expenses.signature, indexed), set when
+it is inserted. The per-signature running state lives in recurring_series:
+  detect_all() rebuilds the table in one pass over expenses in date order
+  observe()    extends it with newly inserted expenses (record_expense)
+  forget()     rescans the signature of a deleted expense
+  rescan()     rebuilds given signatures (once at the end of a bulk import)
+Expenses dated before their signature's last_date can't simply be appended,
+so those signatures are rescanned too. A rescan reads only that
+signature's expenses, through the index.
+"""
+import calendar
+import re
+from collections import defaultdict
+from datetime import date, timedelta
+from functools import lru_cache
+from hashlib import blake2b
+from typing import Dict, Iterable, List, Optional, Set
+
+from sqlalchemy import insert, select
+from sqlalchemy.orm import Session
+from sqlalchemy.orm.attributes import flag_modified
+
+from models import Expense, RecurringSeries
+
+# name → (shortest, longest) gap in days that counts as that cadence
+PERIODS = {
+    "weekly":    (6, 8),
+    "biweekly":  (13, 15),
+    "monthly":   (27, 32),
+    "quarterly": (88, 93),
+    "yearly":    (360, 371),
+}
+PERIOD_MONTHS = {"monthly": 1, "quarterly": 3, "yearly": 12}
+PERIOD_DAYS   = {"weekly": 7, "biweekly": 14, "monthly": 30, "quarterly": 91, "yearly": 365}
+
+MIN_OCCURRENCES  = 3
+MATCH_RATIO      = 0.75   # share of intervals that must agree on cadence and amount
+AMOUNT_TOLERANCE = 0.10
+FETCH_ROWS       = 65536
+
+_NON_ALPHA = re.compile(r"[^a-z]+")
+_MONTHS = {
+    name.lower()
+    for name in list(calendar.month_name[1:]) + list(calendar.month_abbr[1:]) + ["Sept"]
+}
+
+# Bumped (per user) whenever a series gains or loses a cadence or its next
+# date moves, so forecast.py knows its scheduled debits are stale.
+_schedule_versions: Dict[int, int] = defaultdict(int)
+
+
+def schedule_version(user_id: int) -> int:
+    return _schedule_versions[user_id]
+
+
+# ─── Signatures ───────────────────────────────────────────────────────────────
+
+@lru_cache(maxsize=65536)
+def normalize_note(note: Optional[str]) -> str:
+    if not note:
+        return ""
+    words = _NON_ALPHA.sub(" ", note.lower()).split()
+    return " ".join(w for w in words if w not in _MONTHS)
+
+
+@lru_cache(maxsize=65536)
+def signature(category: str, note: Optional[str]) -> Optional[str]:
+    """None for a note with no words to group on."""
+    words = normalize_note(note)
+    if not words:
+        return None
+    category = getattr(category, "value", category)
+    return blake2b(f"{category}\x1f{words}".encode(), digest_size=8).hexdigest()
+
+
+# gap in days → cadence name, precomputed so the million-row pass is a list index
+_GAP_PERIOD: List[Optional[str]] = [None] * (max(hi for _, hi in PERIODS.values()) + 1)
+for _name, (_lo, _hi) in PERIODS.items():
+    _GAP_PERIOD[_lo:_hi + 1] = [_name] * (_hi - _lo + 1)
+
+
+def classify_gap(days: int) -> Optional[str]:
+    return _GAP_PERIOD[days] if 0 <= days < len(_GAP_PERIOD) else None
+
+
+def advance(d: date, period: str) -> date:
+    months = PERIOD_MONTHS.get(period)
+    if months is None:
+        return d + timedelta(days=PERIOD_DAYS[period])
+    year, month = divmod(d.month - 1 + months, 12)
+    year += d.year
+    month += 1
+    return date(year, month, min(d.day, calendar.monthrange(year, month)[1]))
+
+
+def is_active(series: RecurringSeries, today: date) -> bool:
+    """A series lapses once a whole period passes after its expected next date."""
+    if not series.period or not series.next_date:
+        return False
+    return series.next_date + timedelta(days=PERIOD_DAYS[series.period]) >= today
+
+
+# ─── Running State ────────────────────────────────────────────────────────────
+
+class _State:
+    """Same attributes as RecurringSeries; used for bulk passes without ORM overhead."""
+    __slots__ = (
+        "signature", "category", "note", "payment_mode", "amount", "first_date",
+        "last_date", "occurrences", "gap_counts", "stable_amounts", "period", "next_date",
+    )
+
+    def __init__(self, sig: str, day: date, amount: int, category: str, note, payment_mode):
+        self.signature      = sig
+        self.category       = category
+        self.note           = note
+        self.payment_mode   = payment_mode or "upi"
+        self.amount         = amount
+        self.first_date     = day
+        self.last_date      = day
+        self.occurrences    = 1
+        self.gap_counts     = {}
+        self.stable_amounts = 0
+        self.period         = None
+        self.next_date      = None
+
+    def as_row(self) -> dict:
+        return {name: getattr(self, name) for name in self.__slots__}
+
+
+def _extend(series, day: date, amount: int, note, payment_mode) -> None:
+    """Append one expense dated on/after series.last_date."""
+    gap = (day - series.last_date).days
+    period = _GAP_PERIOD[gap] if gap < len(_GAP_PERIOD) else None
+    if period:
+        series.gap_counts[period] = series.gap_counts.get(period, 0) + 1
+    if abs(amount - series.amount) <= AMOUNT_TOLERANCE * max(amount, series.amount):
+        series.stable_amounts += 1
+    series.last_date    = day
+    series.amount       = amount
+    series.note         = note
+    series.payment_mode = payment_mode or "upi"
+    series.occurrences += 1
+
+
+def _settle(series, user_id: int) -> None:
+    period = None
+    intervals = series.occurrences - 1
+    if series.occurrences >= MIN_OCCURRENCES and series.gap_counts:
+        best = max(series.gap_counts, key=series.gap_counts.get)
+        if (series.gap_counts[best] >= MATCH_RATIO * intervals
+                and series.stable_amounts >= MATCH_RATIO * intervals):
+            period = best
+    next_date = advance(series.last_date, period) if period else None
+    if period != series.period or next_date != series.next_date:
+        _schedule_versions[user_id] += 1
+    series.period    = period
+    series.next_date = next_date
+
+
+def _scan(db: Session, stmt) -> Dict[str, _State]:
+    """One pass over (date, amount, category, note, payment_mode) rows in date order."""
+    # Straight off the DBAPI cursor, as in columnar.py: Row construction and
+    # per-row date parsing would dominate a million-row pass.
+    sql = str(stmt.compile(db.get_bind(), compile_kwargs={"literal_binds": True}))
+    cursor = db.connection().connection.cursor()
+    cursor.execute(sql)
+
+    states: Dict[str, _State] = {}
+    days: Dict[str, date] = {}
+    while True:
+        part = cursor.fetchmany(FETCH_ROWS)
+        if not part:
+            break
+        for raw_day, amount, category, note, payment_mode in part:
+            sig = signature(category, note)
+            if sig is None:
+                continue
+            day = days.get(raw_day)
+            if day is None:
+                day = days[raw_day] = date.fromisoformat(raw_day)
+            state = states.get(sig)
+            if state is None:
+                states[sig] = _State(sig, day, amount, category, note, payment_mode)
+            else:
+                _extend(state, day, amount, note, payment_mode)
+    cursor.close()
+
+    user_id = db.info["user_id"]
+    for state in states.values():
+        _settle(state, user_id)
+    return states
+
+
+def _expense_rows(db: Session):
+    # Compiled for a raw cursor, so the session's user scoping doesn't apply.
+    return (
+        select(Expense.date, Expense.amount, Expense.category, Expense.note, Expense.payment_mode)
+        .where(Expense.user_id == db.info["user_id"])
+        .order_by(Expense.date, Expense.id)
+    )
+
+
+def _replace(db: Session, states: Iterable[_State], signatures=None) -> None:
+    query = db.query(RecurringSeries)
+    if signatures is not None:
+        query = query.filter(RecurringSeries.signature.in_(list(signatures)))
+    query.delete(synchronize_session=False)
+    user_id = db.info["user_id"]
+    rows = [dict(s.as_row(), user_id=user_id) for s in states]
+    for i in range(0, len(rows), FETCH_ROWS):
+        db.execute(insert(RecurringSeries.__table__), rows[i:i + FETCH_ROWS])
+
+
+# ─── Maintenance ──────────────────────────────────────────────────────────────
+
+def detect_all(db: Session) -> int:
+    """Rebuild recurring_series from scratch. Caller commits. Returns series found."""
+    states = _scan(db, _expense_rows(db))
+    _replace(db, states.values())
+    return sum(1 for s in states.values() if s.period)
+
+
+def rescan(db: Session, signatures: Iterable[str]) -> None:
+    """Rebuild the given signatures from their expenses, found through ix_expenses_user_signature_date."""
+    db.flush()
+    sigs = sorted(signatures)
+    for i in range(0, len(sigs), 500):
+        chunk = sigs[i:i + 500]
+        states = _scan(db, _expense_rows(db).where(Expense.signature.in_(chunk)))
+        _replace(db, states.values(), chunk)
+
+
+# ─── Incremental Updates ──────────────────────────────────────────────────────
+
+def observe(db: Session, expenses) -> None:
+    """
+    Fold newly inserted expenses — (date, amount, category, note, payment_mode)
+    tuples — into their series. Runs inside the caller's transaction.
+    """
+    by_signature = defaultdict(list)
+    for day, amount, category, note, payment_mode in expenses:
+        category = getattr(category, "value", category)
+        sig = signature(category, note)
+        if sig is not None:
+            by_signature[sig].append((day, amount, category, note, payment_mode))
+    if not by_signature:
+        return
+
+    existing = {}
+    sigs = list(by_signature)
+    for i in range(0, len(sigs), 500):
+        for series in db.query(RecurringSeries).filter(RecurringSeries.signature.in_(sigs[i:i + 500])):
+            existing[series.signature] = series
+
+    stale: Set[str] = set()
+    for sig, items in by_signature.items():
+        items.sort(key=lambda item: item[0])
+        series = existing.get(sig)
+        if series is not None and items[0][0] < series.last_date:
+            stale.add(sig)
+            continue
+        for day, amount, category, note, payment_mode in items:
+            if series is None:
+                series = RecurringSeries(**_State(sig, day, amount, category, note, payment_mode).as_row())
+                db.add(series)
+            else:
+                _extend(series, day, amount, note, payment_mode)
+        flag_modified(series, "gap_counts")
+        _settle(series, db.info["user_id"])
+
+    if stale:
+        rescan(db, stale)
+
+
+def forget(db: Session, expense: Expense) -> None:
+    """Re-derive the series of an expense that has just been deleted (and flushed)."""
+    if expense.signature is not None:
+        rescan(db, {expense.signature})
+
+
+# ─── Queries ──────────────────────────────────────────────────────────────────
+
+def active_series(db: Session, today: Optional[date] = None) -> List[RecurringSeries]:
+    today = today or date.today()
+    rows = (
+        db.query(RecurringSeries)
+        .filter(RecurringSeries.period.isnot(None))
+        .order_by(RecurringSeries.next_date)
+    )
+    return [s for s in rows if is_active(s, today)]
+
+
+def due_suggestions(db: Session, within_days: int = 3, today: Optional[date] = None) -> List[RecurringSeries]:
+    """Active series whose next expense is due within `within_days` (or overdue)."""
+    today = today or date.today()
+    horizon = today + timedelta(days=within_days)
+    return [s for s in active_series(db, today) if s.next_date <= horizon]
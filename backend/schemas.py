@@ -1,5 +1,7 @@
-from pydantic import BaseModel
-from typing import Optional, List
+import os
+
+from pydantic import BaseModel, Field
+from typing import Dict, Optional, List, Union
 from datetime import date, datetime
 from enum import Enum
 
@@ -60,6 +62,39 @@ class ExpenseOut(ExpenseCreate):
         from_attributes = True
 
 
+class BulkImportError(BaseModel):
+    row:   int    # 1-based data row (CSV header excluded)
+    error: str
+
+
+class BulkImportOut(BaseModel):
+    inserted: int
+    failed:   int
+    errors:   List[BulkImportError]   # first 1000 failures
+
+
+# ─── Recurring ────────────────────────────────────────────────────────────────
+class RecurringSeriesOut(BaseModel):
+    id:           int
+    category:     str
+    note:         Optional[str]
+    payment_mode: str
+    amount:       int          # most recent amount
+    period:       str          # weekly / biweekly / monthly / quarterly / yearly
+    occurrences:  int
+    first_date:   date
+    last_date:    date
+    next_date:    date
+
+    class Config:
+        from_attributes = True
+
+
+class RecurringSuggestionOut(ExpenseCreate):
+    """A pre-filled expense for a series that is due; POST it to /api/expenses to log it."""
+    series_id: int
+
+
 # ─── WeeklyLimit ──────────────────────────────────────────────────────────────
 class WeeklyLimitOut(BaseModel):
     week_start_date: date
@@ -143,6 +178,11 @@ class SimulateRequest(BaseModel):
     category: CategoryEnum
 
 
+class SimulateBatchRequest(BaseModel):
+    """Each scenario is one purchase or a sequence of purchases made together."""
+    scenarios: List[Union[SimulateRequest, List[SimulateRequest]]]
+
+
 class SimulateOut(BaseModel):
     weekly_balance_after:      int
     actual_balance_after:      Optional[int]
@@ -152,6 +192,51 @@ class SimulateOut(BaseModel):
     safe_to_spend_after:       Optional[int]
 
 
+MC_MAX_PATHS = int(os.getenv("SPENDER_MC_MAX_PATHS", "100000"))
+MC_MAX_HISTORY_DAYS = 3660
+
+
+class MonteCarloRequest(BaseModel):
+    paths:        int           = Field(10000, ge=1, le=MC_MAX_PATHS)
+    history_days: int           = Field(180, ge=1, le=MC_MAX_HISTORY_DAYS)   # how far back to resample spend from
+    amount:       int           = 0      # optional purchase made today
+    seed:         Optional[int] = Field(None, ge=0)   # fixes the draw for reproducible output
+
+
+class PercentileBalance(BaseModel):
+    percentile: int
+    balance:    int
+
+
+class MonteCarloOut(BaseModel):
+    paths:                  int
+    horizon_days:           int
+    history_days:           int     # days of history actually resampled
+    target_amount:          int
+    probability_hit_target: float   # 0–1
+    expected_balance:       int
+    percentiles:            List[PercentileBalance]   # balance at deadline
+
+
+# ─── Forecast ─────────────────────────────────────────────────────────────────
+class ForecastPoint(BaseModel):
+    date:    date
+    balance: int
+    income:  int   # salary minus fixed costs, on the 1st
+    spend:   int   # expected UPI spend
+
+
+class ForecastOut(BaseModel):
+    balance_known:        bool            # False until a balance has been set
+    start_balance:        int
+    end_balance:          int             # projected balance on the goal deadline
+    min_balance:          int
+    min_balance_date:     date
+    first_negative_date:  Optional[date]
+    expected_daily_spend: List[int]       # Monday … Sunday
+    points:               List[ForecastPoint]
+
+
 # ─── Analytics ────────────────────────────────────────────────────────────────
 class WeeklyHistoryOut(BaseModel):
     week_start_date: date
@@ -185,3 +270,35 @@ class AnalyticsOut(BaseModel):
     current_week_underspend: Optional[int]
     cc_total:                int   # total credit-card spend (all time)
     upi_total:               int   # total UPI spend (all time)
+
+
+class CubeDimension(str, Enum):
+    category     = "category"
+    mood         = "mood"
+    payment_mode = "payment_mode"
+    weekday      = "weekday"   # 0 = Monday … 6 = Sunday
+    week         = "week"      # the Monday starting it
+    month        = "month"     # YYYY-MM
+
+
+class CubeOut(BaseModel):
+    dimensions: List[CubeDimension]
+    date_from:  Optional[date]
+    date_to:    Optional[date]
+    cells:      List[Dict[str, Union[int, str, None]]]   # {dimension: value, ..., "total", "count"}, one per combination
+    total:      int
+    count:      int
+
+
+# ─── Live Updates ─────────────────────────────────────────────────────────────
+class StreamEvent(BaseModel):
+    """One /api/stream message, pushed after a write commits."""
+    event:          str                                  # expense_added / expense_deleted / balance_set / ...
+    version:        int                                  # cache data version the state belongs to
+    dashboard:      Optional[DashboardOut]      = None   # the whole state, or else just the parts below
+    balance_state:  Optional[BalanceState]      = None
+    weekly:         Optional[WeeklyLimitOut]    = None
+    categories:     List[CategoryBreakdownItem] = []     # new totals of the categories the write touched
+    expense:        Optional[ExpenseOut]        = None
+    expense_id:     Optional[int]               = None
+    ledger_entries: List[BalanceLedgerOut]      = []     # entries the write added, oldest first
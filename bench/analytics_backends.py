@@ -0,0 +1,120 @@
+"""
+compute_analytics at scale: the original ORM-loop implementation versus the
+SQL, columnar (NumPy / array.array) and running-totals backends.
+
+    python bench/analytics_backends.py [--rows 1000000] [--repeat 3]
+"""
+import argparse
+import json
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+BACKEND = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "backend")
+
+CATEGORIES = ["food", "travel", "clothes", "skincare", "studies", "rent", "emi", "health", "subscriptions", "misc"]
+
+
+def fill(path: str, rows: int, seed: int = 7) -> None:
+    rng = random.Random(seed)
+    start = date.today() - timedelta(days=5 * 365)
+    con = sqlite3.connect(path)
+    batch = []
+    for _ in range(rows):
+        batch.append((
+            rng.randint(20, 5000),
+            rng.choice(CATEGORIES),
+            (start + timedelta(days=rng.randrange(5 * 365))).isoformat(),
+            rng.choice(("upi", "upi", "card")),
+        ))
+        if len(batch) == 100000:
+            con.executemany("INSERT INTO expenses (user_id, amount, category, date, payment_mode) VALUES (1,?,?,?,?)", batch)
+            batch = []
+    if batch:
+        con.executemany("INSERT INTO expenses (user_id, amount, category, date, payment_mode) VALUES (1,?,?,?,?)", batch)
+    con.commit()
+    con.close()
+
+
+def orm_loop_breakdowns(db, daily_since):
+    """The pre-optimization path: every Expense as an ORM object, summed in Python."""
+    from models import Expense
+    expenses = db.query(Expense).all()
+    cat_map: dict = {}
+    for e in expenses:
+        if e.category not in cat_map:
+            cat_map[e.category] = {"total": 0, "count": 0}
+        cat_map[e.category]["total"] += e.amount
+        cat_map[e.category]["count"] += 1
+    recent = [e for e in expenses if e.date >= daily_since]
+    day_map: dict = {}
+    for e in recent:
+        day_map[e.date] = day_map.get(e.date, 0) + e.amount
+    total = sum(e.amount for e in expenses)
+    cc = sum(e.amount for e in expenses if e.payment_mode == "card")
+    upi = sum(e.amount for e in expenses if e.payment_mode != "card")
+    return cat_map, day_map, total, cc, upi
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--skip-orm", action="store_true", help="skip the slow ORM-loop baseline")
+    args = parser.parse_args(argv)
+
+    tmp = tempfile.mkdtemp()
+    os.environ["SPENDER_DATABASE_URL"] = f"sqlite:///{tmp}/bench.db"
+    sys.path.insert(0, BACKEND)
+    import database
+    import engine
+    import columnar
+
+    database.init_db()
+    t0 = time.perf_counter()
+    fill(f"{tmp}/bench.db", args.rows)
+    db = database.SessionLocal()
+    engine.rebuild_expense_totals(db)
+    db.commit()
+    print(f"seeded {args.rows} expenses in {time.perf_counter() - t0:.1f}s")
+
+    cutoff = date.today() - timedelta(days=30)
+    numpy = columnar.np
+    cases = {
+        "sql":    lambda: engine.aggregate_expenses(db, daily_since=cutoff),
+        "totals": lambda: engine.read_expense_totals(db, daily_since=cutoff),
+    }
+    if numpy is not None:
+        cases["columnar_numpy"] = lambda: columnar.aggregate_expenses_columnar(db, daily_since=cutoff)
+
+    def columnar_python():
+        columnar.np = None
+        try:
+            return columnar.aggregate_expenses_columnar(db, daily_since=cutoff)
+        finally:
+            columnar.np = numpy
+    cases["columnar_array"] = columnar_python
+    if not args.skip_orm:
+        cases = {"orm_loop": lambda: orm_loop_breakdowns(db, cutoff), **cases}
+
+    results = {}
+    for name, fn in cases.items():
+        timings = []
+        for _ in range(args.repeat):
+            db.expunge_all()
+            t = time.perf_counter()
+            fn()
+            timings.append(time.perf_counter() - t)
+        results[name] = {"best_s": round(min(timings), 4), "runs": [round(x, 4) for x in timings]}
+        print(f"{name:<16} {results[name]['best_s']:>9.4f} s")
+
+    print(json.dumps({"rows": args.rows, "results": results}, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
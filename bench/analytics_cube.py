@@ -0,0 +1,152 @@
+"""
+/api/analytics/cube against the GROUP BY over expenses it replaces.
+
+Seeds one database with datagen.py (or copies --db), then times each slice
+in-process with TestClient, and times the same aggregate run straight on
+the expenses table with sqlite3 ("raw"). Cube times include the request
+round trip; raw times are the bare query. The two results must match cell
+for cell.
+
+    total               no dimensions, all history
+    category            category, all history
+    category_mood_mode  category × mood × payment_mode, all history
+    month_category      month × category, all history
+    mood_weekday        mood × weekday, all history (the spending-mood heatmap)
+    category_365d       category, the last 365 days (partial months at both ends)
+    week_category_90d   week × category, the last 90 days
+
+    python bench/analytics_cube.py [--rows 1m] [--iterations 20] [--out analytics_cube.json]
+"""
+import argparse
+import json
+import os
+import shutil
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+BACKEND = os.path.join(HERE, "..", "backend")
+
+# name → (dimensions, days back from today or None for all history)
+SLICES = {
+    "total":              ([], None),
+    "category":           (["category"], None),
+    "category_mood_mode": (["category", "mood", "payment_mode"], None),
+    "month_category":     (["month", "category"], None),
+    "mood_weekday":       (["mood", "weekday"], None),
+    "category_365d":      (["category"], 365),
+    "week_category_90d":  (["week", "category"], 90),
+}
+
+# The cube's dimensions as expressions on expenses
+RAW_COLUMNS = {
+    "category":     "category",
+    "mood":         "mood",
+    "payment_mode": "payment_mode",
+    "weekday":      "(CAST(strftime('%w', date) AS INTEGER) + 6) % 7",
+    "week":         "date(date, 'weekday 0', '-6 days')",
+    "month":        "substr(date, 1, 7)",
+}
+
+
+def _params(dims, days, today):
+    params = [("dimensions", d) for d in dims]
+    if days is not None:
+        params += [("date_from", (today - timedelta(days=days)).isoformat()), ("date_to", today.isoformat())]
+    return params
+
+
+def raw_cells(con, dims, days, today) -> dict:
+    keys = [RAW_COLUMNS[d] for d in dims]
+    sql = f"SELECT {', '.join(keys + ['SUM(amount)', 'COUNT(*)'])} FROM expenses WHERE user_id = 1"
+    args = []
+    if days is not None:
+        sql += " AND date BETWEEN ? AND ?"
+        args = [(today - timedelta(days=days)).isoformat(), today.isoformat()]
+    if keys:
+        sql += f" GROUP BY {', '.join(keys)}"
+    return {tuple(row[:-2]): [row[-2], row[-1]] for row in con.execute(sql, args) if row[-1]}
+
+
+def _best_ms(fn, iterations: int) -> dict:
+    fn()
+    times = []
+    for _ in range(iterations):
+        t = time.perf_counter()
+        fn()
+        times.append((time.perf_counter() - t) * 1000)
+    times.sort()
+    return {"p50_ms": round(times[len(times) // 2], 2), "max_ms": round(times[-1], 2)}
+
+
+def run(args, path: str) -> dict:
+    sys.path.insert(0, args.backend)
+    os.environ["SPENDER_DATABASE_URL"] = f"sqlite:///{path}"
+    from fastapi.testclient import TestClient
+    import main
+
+    today = date.today()
+    con = sqlite3.connect(path)
+    results = {}
+    with TestClient(main.app) as client:
+        for name, (dims, days) in SLICES.items():
+            params = _params(dims, days, today)
+            body = client.get("/api/analytics/cube", params=params).json()
+            cube = {tuple(c[d] for d in dims): [c["total"], c["count"]] for c in body["cells"]}
+            raw = raw_cells(con, dims, days, today)
+            results[name] = {
+                "cells": len(cube),
+                "match": cube == raw,
+                "cube": _best_ms(lambda: client.get("/api/analytics/cube", params=params), args.iterations),
+                "raw":  _best_ms(lambda: raw_cells(con, dims, days, today), max(3, args.iterations // 5)),
+            }
+    con.close()
+    return results
+
+
+def _copy_db(src: str, dst: str) -> None:
+    con = sqlite3.connect(src)
+    con.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+    con.close()
+    shutil.copyfile(src, dst)
+
+
+def main(argv=None) -> int:
+    from datagen import SCALES
+
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", default="1m", help="expense count, or one of " + ", ".join(SCALES))
+    parser.add_argument("--db", help="existing database to copy instead of seeding one")
+    parser.add_argument("--iterations", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--backend", default=BACKEND, help="backend/ directory to benchmark")
+    parser.add_argument("--out", default="analytics_cube.json")
+    args = parser.parse_args(argv)
+    args.backend = os.path.abspath(args.backend)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "bench.db")
+        if args.db:
+            _copy_db(args.db, path)
+        else:
+            subprocess.run([sys.executable, os.path.join(HERE, "datagen.py"), path, "--rows", args.rows,
+                            "--seed", str(args.seed), "--backend", args.backend], check=True)
+        results = run(args, path)
+
+    for name, r in results.items():
+        print(f"{name:<19} {r['cells']:>5} cells   cube p50 {r['cube']['p50_ms']:>7.2f} ms   "
+              f"raw p50 {r['raw']['p50_ms']:>8.2f} ms ({r['raw']['p50_ms'] / r['cube']['p50_ms']:6.1f}x)"
+              + ("" if r["match"] else "   RESULTS DIFFER"))
+    with open(args.out, "w") as f:
+        json.dump({"meta": {"rows": args.rows, "db": args.db, "seed": args.seed, "iterations": args.iterations,
+                            "created": time.strftime("%Y-%m-%dT%H:%M:%S")}, "slices": results}, f, indent=2)
+    print(f"wrote {args.out}")
+    return 0 if all(r["match"] for r in results.values()) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,133 @@
+"""
+Cold start: process launch to first served request, on an existing database.
+
+Each run is a fresh interpreter pointed at the same database file:
+
+    import     import main (FastAPI app, models, engine)
+    init_db    schema checks / migrations, with the SQL statements it issues counted
+    first      GET /api/dashboard, the first request a browser makes
+    total      wall time from spawning the process to the first response
+
+The database is seeded once with datagen.py, or pass --db to reuse one; it
+is copied, never modified. The first run also applies any pending
+migrations. The OS page cache is warm after that, so later runs measure
+the app's own startup cost, not disk reads.
+
+--target-ms applies to init_db + first request. That is the part that can
+grow with the database. Import time is mostly FastAPI, SQLAlchemy and
+Pydantic, and it does not depend on the data.
+
+    python bench/cold_start.py [--rows 1m] [--runs 5] [--target-ms 150] [--out cold_start.json]
+    python bench/cold_start.py --backend /path/to/other/checkout/backend --db /tmp/spender-1m.db
+"""
+import argparse
+import json
+import os
+import shutil
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+BACKEND = os.path.join(HERE, "..", "backend")
+
+
+# ─── Measurement (child process) ──────────────────────────────────────────────
+
+def run(backend: str) -> dict:
+    t0 = time.perf_counter()
+    sys.path.insert(0, backend)
+    from sqlalchemy import event
+    import database
+    import main
+    imported = time.perf_counter()
+    from fastapi.testclient import TestClient   # bench-only; after the app's own imports
+
+    started = time.perf_counter()
+    statements = []
+    event.listen(database.engine, "before_cursor_execute",
+                 lambda conn, cursor, statement, *args: statements.append(statement))
+    database.init_db()
+    initialized = time.perf_counter()
+    init_statements = list(statements)
+
+    client = TestClient(main.app)   # not entered: startup already ran above
+    r = client.get("/api/dashboard")
+    if r.status_code != 200:
+        raise RuntimeError(f"GET /api/dashboard → {r.status_code}: {r.text[:200]}")
+    served = time.perf_counter()
+    return {
+        "import_ms":  round((imported - t0) * 1000, 1),
+        "init_db_ms": round((initialized - started) * 1000, 1),
+        "init_db_statements": len(init_statements),
+        "pragma_statements": sum(1 for s in init_statements if s.lstrip().upper().startswith("PRAGMA")),
+        "first_request_ms": round((served - initialized) * 1000, 1),
+    }
+
+
+# ─── Driver ───────────────────────────────────────────────────────────────────
+
+def _copy_db(src: str, dst: str) -> None:
+    con = sqlite3.connect(src)
+    con.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+    con.close()
+    shutil.copyfile(src, dst)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", default="1m", help="expense count for the seeded database (1k, 100k, 1m or a number)")
+    parser.add_argument("--db", help="existing database to copy instead of seeding one")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--target-ms", type=float, default=150,
+                        help="exit 1 if the median init_db + first request exceeds this")
+    parser.add_argument("--backend", default=BACKEND, help="backend/ directory to benchmark")
+    parser.add_argument("--out", default="cold_start.json")
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+    args.backend = os.path.abspath(args.backend)
+
+    if args.child:
+        print(json.dumps(run(args.backend)))
+        return 0
+
+    runs = []
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "bench.db")
+        if args.db:
+            _copy_db(args.db, path)
+        else:
+            subprocess.run([sys.executable, os.path.join(HERE, "datagen.py"), path, "--rows", args.rows,
+                            "--backend", args.backend], check=True)
+        env = dict(os.environ, SPENDER_DATABASE_URL=f"sqlite:///{path}")
+        cmd = [sys.executable, os.path.abspath(__file__), "--child", "--backend", args.backend]
+        for i in range(args.runs):
+            started = time.perf_counter()
+            out = subprocess.run(cmd, env=env, capture_output=True, text=True, cwd=tmp)
+            total = (time.perf_counter() - started) * 1000
+            if out.returncode:
+                sys.stderr.write(out.stderr)
+                return out.returncode
+            result = json.loads(out.stdout.strip().splitlines()[-1])
+            result["startup_ms"] = round(result["init_db_ms"] + result["first_request_ms"], 1)
+            result["total_ms"] = round(total, 1)
+            runs.append(result)
+            print(f"run {i + 1}: import {result['import_ms']:>7.1f} ms   init_db {result['init_db_ms']:>7.1f} ms "
+                  f"({result['init_db_statements']} statements, {result['pragma_statements']} PRAGMA)   "
+                  f"first request {result['first_request_ms']:>7.1f} ms   total {total:>7.1f} ms")
+
+    median = {k: sorted(r[k] for r in runs)[len(runs) // 2] for k in runs[0]}
+    print(f"median: init_db + first request {median['startup_ms']:.1f} ms (target {args.target_ms:.0f} ms), "
+          f"total {median['total_ms']:.1f} ms")
+    with open(args.out, "w") as f:
+        json.dump({"meta": {"rows": args.rows, "db": args.db, "backend": args.backend,
+                            "target_ms": args.target_ms, "created": time.strftime("%Y-%m-%dT%H:%M:%S")},
+                   "runs": runs, "median": median}, f, indent=2)
+    print(f"wrote {args.out}")
+    return 0 if median["startup_ms"] <= args.target_ms else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
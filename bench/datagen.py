@@ -0,0 +1,231 @@
+"""
+Seeded synthetic data for benchmarks.
+
+Fills expenses, balance_ledger and weekly_limits straight through sqlite3
+(the ORM would dominate a million-row seed), then derives everything else —
+expense_totals and the cube rollups, the balance checkpoint,
+recurring_series, weekly history — with the app's own rebuild functions, so
+the result looks like a database that grew through the API. The same seed and row count always produce the
+same rows, relative to today's date.
+
+    python bench/datagen.py /tmp/spender.db --rows 100000 [--seed 7]
+
+Or from another script: generate(path, rows, seed) after the backend is on
+sys.path and SPENDER_DATABASE_URL points at path. fill_user() and derive()
+are the per-user halves of it, for databases with many users
+(multi_user.py).
+"""
+import argparse
+import math
+import os
+import random
+import sqlite3
+import sys
+import time
+from datetime import date, datetime, timedelta
+
+BACKEND = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "backend")
+
+SCALES = {"1k": 1_000, "100k": 100_000, "1m": 1_000_000}
+
+# category → (weight, median amount, spread of log(amount), notes)
+CATEGORIES = {
+    "food":          (38, 220,  0.8, ["Swiggy", "Zomato", "groceries", "chai", "lunch", "dinner out", "Blinkit"]),
+    "travel":        (16, 180,  1.0, ["Uber", "Ola", "metro card", "auto", "train ticket", "petrol"]),
+    "misc":          (10, 300,  1.1, ["gift", "stationery", "haircut", "laundry", None]),
+    "clothes":       (7,  1400, 0.7, ["Myntra", "Zara", "shoes", "kurta"]),
+    "skincare":      (6,  650,  0.6, ["Nykaa", "sunscreen", "moisturiser"]),
+    "health":        (6,  500,  0.9, ["pharmacy", "doctor visit", "lab test"]),
+    "studies":       (5,  800,  0.9, ["books", "Udemy course", "printouts"]),
+    "subscriptions": (4,  299,  0.5, ["app store", "cloud storage"]),
+}
+MOODS = [(None, 40), ("calm", 25), ("happy", 15), ("stressed", 12), ("bored", 8)]
+
+# (category, note, monthly day or weekly weekday, amount, payment_mode, cadence)
+RECURRING = [
+    ("rent",          "Rent",              1,  15000, "upi",  "monthly"),
+    ("emi",           "Phone EMI",         5,  5000,  "card", "monthly"),
+    ("subscriptions", "Netflix",           12, 649,   "card", "monthly"),
+    ("subscriptions", "Spotify",           20, 119,   "upi",  "monthly"),
+    ("health",        "Gym membership",    3,  1500,  "upi",  "monthly"),
+    ("food",          "Weekly vegetables", 6,  600,   "upi",  "weekly"),
+]
+
+GOAL = {"emi": 5000, "rent": 15000, "clothing_cap": 10000, "initial_savings": 50000}
+MIN_INCOME = 80000
+INCOME_MARGIN = 1.15   # income over average monthly spend, so balances stay plausible at any scale
+OPENING_BALANCE = 100000
+BATCH = 50_000
+
+
+def _weighted(rng: random.Random, pairs):
+    values = [v for v, _ in pairs]
+    weights = [w for _, w in pairs]
+    return lambda: rng.choices(values, weights)[0]
+
+
+def _history_days(rows: int) -> int:
+    """Roughly 30 logged expenses a day, capped to 10 years and floored to 90 days."""
+    return max(90, min(3650, rows // 30))
+
+
+def expense_rows(rows: int, seed: int = 7, today: date = None):
+    """(amount, category, date, note, mood, payment_mode) tuples, oldest first."""
+    rng = random.Random(seed)
+    today = today or date.today()
+    days = _history_days(rows)
+    start = today - timedelta(days=days)
+
+    fixed = []
+    d = start
+    while d < today:
+        for category, note, day, amount, mode, cadence in RECURRING:
+            due = d.weekday() == day if cadence == "weekly" else d.day == day
+            if due:
+                fixed.append((amount, category, d, f"{note} {d:%b %Y}", None, mode))
+        d += timedelta(days=1)
+    fixed = fixed[:rows // 10]
+
+    pick_category = _weighted(rng, [(c, w) for c, (w, *_rest) in CATEGORIES.items()])
+    pick_mood = _weighted(rng, MOODS)
+    out = list(fixed)
+    for _ in range(rows - len(fixed)):
+        category = pick_category()
+        _, median, spread, notes = CATEGORIES[category]
+        amount = max(10, int(rng.lognormvariate(math.log(median), spread)))
+        # Weekends carry more spend than weekdays.
+        offset = rng.randrange(days)
+        d = start + timedelta(days=offset)
+        if d.weekday() < 5 and rng.random() < 0.25:
+            d += timedelta(days=5 - d.weekday())
+            if d >= today:
+                d = today - timedelta(days=1)
+        mode = "card" if rng.random() < (0.45 if amount > 1000 else 0.2) else "upi"
+        out.append((amount, category, d, rng.choice(notes), pick_mood(), mode))
+    out.sort(key=lambda row: row[2])
+    return out
+
+
+def _ts(d: date, seconds: int) -> str:
+    return (datetime.combine(d, datetime.min.time()) + timedelta(seconds=seconds)).isoformat(" ")
+
+
+def fill_user(con: sqlite3.Connection, user_id: int, expenses: list, today: date = None) -> dict:
+    """
+    Insert one user's goal, expenses, balance ledger and weekly limits on a
+    raw sqlite3 connection (caller commits). Income is scaled to the spend,
+    so balances stay plausible at any row count. Returns row counts.
+    """
+    import engine
+    import recurring
+    from models import Goal
+
+    today = today or date.today()
+    start = expenses[0][2] if expenses else today
+    months = max(1.0, (today - start).days / 30.44)
+    income = max(MIN_INCOME, int(round(sum(e[0] for e in expenses) / months * INCOME_MARGIN, -3)))
+
+    goal = dict(
+        GOAL, target_amount=income * 6, monthly_income=income,
+        deadline=(today + timedelta(days=730)).isoformat(), created_at=_ts(start, 0),
+    )
+    con.execute(
+        f"INSERT INTO goals (user_id, {', '.join(goal)}) VALUES (?{', ?' * len(goal)})",
+        (user_id, *goal.values()),
+    )
+    weekly_cap = engine.default_weekly_cap(Goal(**GOAL, monthly_income=income))
+
+    for i in range(0, len(expenses), BATCH):
+        con.executemany(
+            "INSERT INTO expenses (user_id, amount, category, date, note, mood, payment_mode, signature)"
+            " VALUES (?,?,?,?,?,?,?,?)",
+            [
+                (user_id, a, c, d.isoformat(), n, m, p, recurring.signature(c, n))
+                for a, c, d, n, m, p in expenses[i:i + BATCH]
+            ],
+        )
+
+    # Opening balance, salary on the 1st, and a debit per UPI expense, as record_expense() writes them.
+    ledger = [("set", OPENING_BALANCE, "Opening balance", _ts(start, 0))]
+    d = start
+    while d < today:
+        if d.day == 1:
+            ledger.append(("credit", income, "Salary", _ts(d, 1)))
+        d += timedelta(days=1)
+    for seq, (amount, category, d, note, _mood, mode) in enumerate(expenses):
+        if mode != "card":
+            ledger.append(("debit", amount, f"[UPI] {note or category}", _ts(d, 2 + seq % 80000)))
+    ledger.sort(key=lambda row: row[3])
+    for i in range(0, len(ledger), BATCH):
+        con.executemany(
+            "INSERT INTO balance_ledger (user_id, type, amount, note, recorded_at) VALUES (?,?,?,?,?)",
+            [(user_id, *row) for row in ledger[i:i + BATCH]],
+        )
+
+    spend_by_week: dict = {}
+    for amount, _c, d, _n, _m, _p in expenses:
+        week = engine.get_week_start(d)
+        spend_by_week[week] = spend_by_week.get(week, 0) + amount
+    con.executemany(
+        "INSERT INTO weekly_limits (user_id, week_start_date, weekly_cap, spent_this_week) VALUES (?,?,?,?)",
+        [(user_id, week.isoformat(), weekly_cap, spent) for week, spent in sorted(spend_by_week.items())],
+    )
+    return {"expenses": len(expenses), "ledger": len(ledger), "weeks": len(spend_by_week)}
+
+
+def derive(db) -> None:
+    """Everything else, with the app's own rebuild functions, for db's user. Caller commits."""
+    import engine
+    import recurring
+
+    engine.rebuild_expense_totals(db)
+    engine.rebuild_balance_checkpoint(db)
+    recurring.detect_all(db)
+    engine.roll_over_weeks(db)
+
+
+def generate(path: str, rows: int, seed: int = 7) -> dict:
+    """Create and fill the database at path. Returns row counts and timings."""
+    import database
+    from auth import DEFAULT_USER_ID
+
+    t0 = time.perf_counter()
+    database.init_db()
+    con = sqlite3.connect(path)
+    counts = fill_user(con, DEFAULT_USER_ID, expense_rows(rows, seed))
+    con.commit()
+    con.close()
+    filled = time.perf_counter() - t0
+
+    db = database.user_session(DEFAULT_USER_ID)
+    derive(db)
+    db.commit()
+    db.close()
+
+    return dict(
+        counts,
+        fill_s=round(filled, 2),
+        derive_s=round(time.perf_counter() - t0 - filled, 2),
+    )
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("path", help="SQLite file to create (must not exist)")
+    parser.add_argument("--rows", default="100k", help="expense count, or one of " + ", ".join(SCALES))
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--backend", default=BACKEND, help="backend/ directory whose schema to use")
+    args = parser.parse_args(argv)
+
+    path = os.path.abspath(args.path)
+    if os.path.exists(path):
+        parser.error(f"{path} already exists")
+    os.environ["SPENDER_DATABASE_URL"] = f"sqlite:///{path}"
+    sys.path.insert(0, os.path.abspath(args.backend))
+    rows = SCALES.get(args.rows.lower()) or int(args.rows)
+    print(generate(path, rows, args.seed))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,149 @@
+"""
+List-heavy endpoints with and without the fast JSON path (SPENDER_FAST_JSON).
+
+Seeds one database with datagen.py, then drives each endpoint in-process
+with TestClient, once per mode and in its own process:
+
+    pydantic   SPENDER_FAST_JSON=0: ORM rows → response_model → json.dumps
+    fast       SPENDER_FAST_JSON=1: column-only row tuples → orjson
+
+    expenses_all    GET /api/expenses              (every row)
+    expenses_page   GET /api/expenses?limit=500
+    ledger          GET /api/balance/ledger
+    analytics       GET /api/analytics             (response cache off)
+
+The query each endpoint runs is also timed on its own ("query"), so the rest
+of the request time is serialization. Bodies are hashed per mode and must
+match byte for byte.
+
+    python bench/fast_json.py [--rows 50000] [--iterations 30] [--out fast_json.json]
+"""
+import argparse
+import hashlib
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+BACKEND = os.path.join(HERE, "..", "backend")
+
+MODES = {"pydantic": "0", "fast": "1"}
+ENDPOINTS = {
+    "expenses_all":  "/api/expenses",
+    "expenses_page": "/api/expenses?limit=500",
+    "ledger":        "/api/balance/ledger",
+    "analytics":     "/api/analytics",
+}
+
+
+# ─── Measurement (child process) ──────────────────────────────────────────────
+
+def queries(db) -> dict:
+    """The row fetch behind each list endpoint, in the current mode."""
+    import fastjson
+    from models import BalanceLedger, Expense
+
+    def expenses(limit=None):
+        query = db.query(*fastjson.columns(fastjson.EXPENSE_FIELDS)) if fastjson.ENABLED else db.query(Expense)
+        query = query.order_by(Expense.date.desc(), Expense.id.desc())
+        return lambda: (query.limit(limit) if limit else query).all()
+
+    def ledger():
+        query = db.query(*fastjson.columns(fastjson.LEDGER_FIELDS)) if fastjson.ENABLED else db.query(BalanceLedger)
+        return query.order_by(BalanceLedger.recorded_at.desc()).limit(50).all()
+
+    return {"expenses_all": expenses(), "expenses_page": expenses(501), "ledger": ledger}
+
+
+def run(args) -> dict:
+    sys.path.insert(0, args.backend)
+    sys.path.insert(0, HERE)
+    from fastapi.testclient import TestClient
+    from suite import measure
+    import database
+    import main
+
+    results = {}
+    with TestClient(main.app) as client:
+        for name, url in ENDPOINTS.items():
+            body = client.get(url).content
+            r = measure(lambda: client.get(url), args.iterations, args.warmup, 0)
+            del r["peak_alloc_kb"]
+            r.update(bytes=len(body), sha256=hashlib.sha256(body).hexdigest())
+            results[name] = r
+
+        db = database.user_session(database.DEFAULT_USER_ID)
+        try:
+            for name, fetch in queries(db).items():
+                db.expunge_all()
+                r = measure(lambda: (fetch(), db.expunge_all()), args.iterations, args.warmup, 0)
+                results[name]["query_p50_ms"] = r["p50_ms"]
+        finally:
+            db.close()
+    return results
+
+
+# ─── Driver ───────────────────────────────────────────────────────────────────
+
+def main(argv=None) -> int:
+    from datagen import SCALES
+
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", default="50000", help="expense count, or one of " + ", ".join(SCALES))
+    parser.add_argument("--iterations", type=int, default=30)
+    parser.add_argument("--warmup", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--backend", default=BACKEND, help="backend/ directory to benchmark")
+    parser.add_argument("--out", default="fast_json.json")
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+    args.backend = os.path.abspath(args.backend)
+
+    if args.child:
+        print(json.dumps(run(args)))
+        return 0
+
+    report = {"meta": {"rows": args.rows, "iterations": args.iterations, "seed": args.seed,
+                       "created": time.strftime("%Y-%m-%dT%H:%M:%S")}, "modes": {}}
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "bench.db")
+        subprocess.run([sys.executable, os.path.join(HERE, "datagen.py"), path, "--rows", args.rows,
+                        "--seed", str(args.seed), "--backend", args.backend], check=True)
+        for mode, flag in MODES.items():
+            env = dict(os.environ, SPENDER_DATABASE_URL=f"sqlite:///{path}",
+                       SPENDER_FAST_JSON=flag, SPENDER_RESPONSE_CACHE="0")
+            cmd = [sys.executable, os.path.abspath(__file__), "--child", "--backend", args.backend,
+                   "--iterations", str(args.iterations), "--warmup", str(args.warmup)]
+            out = subprocess.run(cmd, env=env, capture_output=True, text=True, cwd=tmp)
+            if out.returncode:
+                sys.stderr.write(out.stderr)
+                return out.returncode
+            report["modes"][mode] = json.loads(out.stdout.strip().splitlines()[-1])
+
+    slow, fast = report["modes"]["pydantic"], report["modes"]["fast"]
+    identical = True
+    for name in ENDPOINTS:
+        s, f = slow[name], fast[name]
+        same = s["sha256"] == f["sha256"]
+        identical &= same
+        line = (f"{name:<14} {s['bytes']:>9} B   p50 {s['p50_ms']:>9.2f} → {f['p50_ms']:>8.2f} ms "
+                f"({s['p50_ms'] / f['p50_ms']:5.2f}x)")
+        if "query_p50_ms" in s:
+            s_ser = s["p50_ms"] - s["query_p50_ms"]
+            f_ser = f["p50_ms"] - f["query_p50_ms"]
+            line += (f"   query {s['query_p50_ms']:>8.2f} → {f['query_p50_ms']:>7.2f} ms"
+                     f"   rest {s_ser:>8.2f} → {f_ser:>7.2f} ms")
+        print(line + ("" if same else "   BODY DIFFERS"))
+    report["identical_bodies"] = identical
+
+    with open(args.out, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"wrote {args.out}")
+    return 0 if identical else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,146 @@
+"""
+Load test for GET /api/dashboard: sync (threadpool) vs async (aiosqlite) mode.
+
+Starts a uvicorn server per mode on a seeded throwaway database with the
+response cache disabled, then drives it with N concurrent clients and reports
+requests/sec and latency percentiles.
+
+    python bench/load_dashboard.py [--clients 200] [--requests 4000] [--modes sync,async]
+
+Needs uvicorn, httpx and (for async mode) aiosqlite + greenlet.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+
+BACKEND = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "backend")
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _wait_ready(base: str, proc: subprocess.Popen, timeout: float = 30) -> None:
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if proc.poll() is not None:
+            raise RuntimeError(f"server exited with {proc.returncode}")
+        try:
+            httpx.get(base + "/api/goal", timeout=1)
+            return
+        except httpx.HTTPError:
+            time.sleep(0.2)
+    raise RuntimeError("server did not start")
+
+
+def _seed(base: str, expenses: int) -> None:
+    rng = random.Random(42)
+    httpx.post(base + "/api/goal", json={
+        "target_amount": 500000, "deadline": "2030-01-01",
+        "monthly_income": 80000, "emi": 5000, "rent": 15000,
+    })
+    httpx.post(base + "/api/balance/set", json={"amount": 100000})
+    rows = "\n".join(
+        json.dumps({
+            "amount": rng.randint(50, 3000),
+            "category": rng.choice(["food", "travel", "clothes", "misc", "health"]),
+            "date": f"20{rng.randint(22, 25)}-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}",
+            "payment_mode": rng.choice(["upi", "upi", "card"]),
+        })
+        for _ in range(expenses)
+    )
+    httpx.post(base + "/api/expenses/bulk?format=ndjson", content=rows, timeout=600)
+
+
+async def _drive(base: str, clients: int, total: int) -> dict:
+    latencies = []
+    errors = 0
+    remaining = total
+    limits = httpx.Limits(max_connections=clients, max_keepalive_connections=clients)
+
+    async with httpx.AsyncClient(base_url=base, limits=limits, timeout=60) as client:
+        async def worker():
+            nonlocal remaining, errors
+            while remaining > 0:
+                remaining -= 1
+                t0 = time.perf_counter()
+                try:
+                    r = await client.get("/api/dashboard")
+                    r.raise_for_status()
+                except httpx.HTTPError:
+                    errors += 1
+                    continue
+                latencies.append(time.perf_counter() - t0)
+
+        start = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(clients)))
+        elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    pct = lambda p: round(latencies[min(len(latencies) - 1, int(p / 100 * len(latencies)))] * 1000, 1)
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "rps": round(len(latencies) / elapsed, 1),
+        "p50_ms": pct(50),
+        "p95_ms": pct(95),
+        "p99_ms": pct(99),
+    }
+
+
+def run_mode(mode: str, args) -> dict:
+    with tempfile.TemporaryDirectory() as tmp:
+        port = _free_port()
+        env = dict(
+            os.environ,
+            SPENDER_DATABASE_URL=f"sqlite:///{tmp}/bench.db",
+            SPENDER_ASYNC_DB="1" if mode == "async" else "0",
+            SPENDER_RESPONSE_CACHE="0",
+            SPENDER_DB_POOL_SIZE=str(args.pool_size),
+            SPENDER_DB_MAX_OVERFLOW=str(args.clients),
+        )
+        proc = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "main:app", "--port", str(port), "--log-level", "warning"],
+            cwd=BACKEND, env=env,
+        )
+        base = f"http://127.0.0.1:{port}"
+        try:
+            _wait_ready(base, proc)
+            _seed(base, args.expenses)
+            return asyncio.run(_drive(base, args.clients, args.requests))
+        finally:
+            proc.terminate()
+            proc.wait()
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--clients", type=int, default=200)
+    parser.add_argument("--requests", type=int, default=4000)
+    parser.add_argument("--expenses", type=int, default=10000)
+    parser.add_argument("--pool-size", type=int, default=20)
+    parser.add_argument("--modes", default="sync,async")
+    args = parser.parse_args(argv)
+
+    results = {}
+    for mode in args.modes.split(","):
+        results[mode] = run_mode(mode, args)
+        r = results[mode]
+        print(f"{mode:<6} {r['rps']:>8} req/s   p50 {r['p50_ms']} ms   p99 {r['p99_ms']} ms   errors {r['errors']}")
+    print(json.dumps(results, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,217 @@
+"""
+Multi-user benchmark: per-request latency with one user versus many.
+
+Each run seeds a fresh multi-user database (SPENDER_MULTI_USER=1) in its own
+process: --users accounts with about --expenses expenses each, generated
+with datagen.fill_user() and derived with datagen.derive(), exactly as a
+single-user bench database. Then every scenario is driven through the app
+with TestClient, each request as a random user with their bearer token:
+
+    dashboard       GET  /api/dashboard
+    analytics       GET  /api/analytics
+    expenses_page   GET  /api/expenses?limit=50
+    write           POST /api/expenses
+
+Runs cover each --modes entry at 1 user (the baseline) and at --users:
+
+    shared   every user's rows in one SQLite file, scoped by user_id
+    shard    SPENDER_SHARD_DIR: one SQLite file per user, opened per request
+
+The response cache is off, as in suite.py. Latency is flat when the
+many-user p50/p95 stay close to the 1-user ones.
+
+    python bench/multi_user.py [--users 10000] [--modes shared,shard] [--out multi_user.json]
+"""
+import argparse
+import json
+import os
+import random
+import shutil
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+BACKEND = os.path.join(HERE, "..", "backend")
+
+SCENARIOS = ("dashboard", "analytics", "expenses_page", "write")
+
+
+def token_for(user_id: int) -> str:
+    return f"bench-token-{user_id}"
+
+
+# ─── Seeding (child process) ──────────────────────────────────────────────────
+
+def seed(users: int, expenses: int, seed_value: int) -> dict:
+    from sqlalchemy import create_engine
+
+    import auth
+    import database
+    import datagen
+    import migrations
+
+    t0 = time.perf_counter()
+    database.init_db()
+    main_path = database.DATABASE_URL[len("sqlite:///"):]
+    con = sqlite3.connect(main_path)
+    con.execute("DELETE FROM users")
+    con.executemany(
+        "INSERT INTO users (id, name, token_hash, created_at) VALUES (?, ?, ?, datetime('now'))",
+        [(uid, f"user {uid}", auth.hash_token(token_for(uid))) for uid in range(1, users + 1)],
+    )
+    con.commit()
+
+    template = None
+    if database.SHARD_DIR:
+        # Create the schema once; every shard starts as a copy of the empty, current schema.
+        template = os.path.join(database.SHARD_DIR, "template.db")
+        engine = create_engine(f"sqlite:///{template}")
+        with engine.connect() as conn:
+            migrations.migrate(conn)
+        engine.dispose()
+        for uid in range(1, users + 1):
+            shutil.copyfile(template, database.shard_path(uid))
+
+    rng = random.Random(seed_value)
+    total_rows = 0
+    for uid in range(1, users + 1):
+        rows = datagen.expense_rows(max(10, int(rng.gauss(expenses, expenses / 4))), seed_value + uid)
+        target = sqlite3.connect(database.shard_path(uid)) if template else con
+        total_rows += datagen.fill_user(target, uid, rows)["expenses"]
+        target.commit()
+        if template:
+            target.close()
+    con.close()
+    filled = time.perf_counter() - t0
+
+    for uid in range(1, users + 1):
+        db = database.user_session(uid)
+        datagen.derive(db)
+        db.commit()
+        db.close()
+
+    return {
+        "users": users,
+        "expenses": total_rows,
+        "fill_s": round(filled, 2),
+        "derive_s": round(time.perf_counter() - t0 - filled, 2),
+    }
+
+
+# ─── Measurement (child process) ──────────────────────────────────────────────
+
+def scenarios(client, rng: random.Random, users: int) -> dict:
+    from datetime import date, timedelta
+    from suite import CATEGORIES
+
+    today = date.today()
+
+    def headers():
+        return {"Authorization": f"Bearer {token_for(rng.randint(1, users))}"}
+
+    def call(method, url, **kwargs):
+        r = client.request(method, url, headers=headers(), **kwargs)
+        if r.status_code >= 400:
+            raise RuntimeError(f"{method} {url} → {r.status_code}: {r.text[:200]}")
+        return r
+
+    return {
+        "dashboard":     lambda: call("GET", "/api/dashboard"),
+        "analytics":     lambda: call("GET", "/api/analytics"),
+        "expenses_page": lambda: call("GET", "/api/expenses", params={"limit": 50}),
+        "write":         lambda: call("POST", "/api/expenses", json={
+            "amount": rng.randint(20, 3000),
+            "category": rng.choice(CATEGORIES),
+            "date": (today - timedelta(days=rng.randrange(30))).isoformat(),
+            "note": "bench",
+            "payment_mode": rng.choice(["upi", "upi", "card"]),
+        }),
+    }
+
+
+def run(args) -> dict:
+    sys.path.insert(0, args.backend)
+    sys.path.insert(0, HERE)
+    from fastapi.testclient import TestClient
+    from suite import measure
+    import main
+
+    seeded = seed(args.child, args.expenses, args.seed)
+    rng = random.Random(args.seed)
+    results = {}
+    with TestClient(main.app) as client:
+        cases = scenarios(client, rng, args.child)
+        for name in SCENARIOS:
+            results[name] = measure(cases[name], args.iterations, args.warmup, 0)
+            del results[name]["peak_alloc_kb"]
+    return {"seed": seeded, "endpoints": results}
+
+
+# ─── Driver ───────────────────────────────────────────────────────────────────
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--users", type=int, default=10_000)
+    parser.add_argument("--expenses", type=int, default=100, help="mean expenses per user")
+    parser.add_argument("--modes", default="shared,shard")
+    parser.add_argument("--iterations", type=int, default=1000)
+    parser.add_argument("--warmup", type=int, default=50)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--backend", default=BACKEND, help="backend/ directory to benchmark")
+    parser.add_argument("--out", default="multi_user.json")
+    parser.add_argument("--child", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+    args.backend = os.path.abspath(args.backend)
+
+    if args.child is not None:
+        print(json.dumps(run(args)))
+        return 0
+
+    report = {"meta": {
+        "expenses_per_user": args.expenses, "iterations": args.iterations,
+        "seed": args.seed, "sqlite": sqlite3.sqlite_version,
+        "cpus": os.cpu_count(), "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+    }, "runs": {}}
+    for mode in args.modes.split(","):
+        baseline = None
+        for users in (1, args.users):
+            with tempfile.TemporaryDirectory() as tmp:
+                env = dict(
+                    os.environ,
+                    SPENDER_DATABASE_URL=f"sqlite:///{tmp}/bench.db",
+                    SPENDER_MULTI_USER="1",
+                    SPENDER_RESPONSE_CACHE="0",
+                )
+                if mode == "shard":
+                    env["SPENDER_SHARD_DIR"] = os.path.join(tmp, "shards")
+                cmd = [
+                    sys.executable, os.path.abspath(__file__), "--child", str(users),
+                    "--expenses", str(args.expenses), "--iterations", str(args.iterations),
+                    "--warmup", str(args.warmup), "--seed", str(args.seed), "--backend", args.backend,
+                ]
+                out = subprocess.run(cmd, env=env, capture_output=True, text=True, cwd=tmp)
+                if out.returncode:
+                    sys.stderr.write(out.stderr)
+                    return out.returncode
+                result = json.loads(out.stdout.strip().splitlines()[-1])
+            report["runs"][f"{mode}-{users}"] = result
+            baseline = baseline or result
+            s = result["seed"]
+            print(f"{mode:>6} {users:>6} users  {s['expenses']} expenses, "
+                  f"seeded in {s['fill_s'] + s['derive_s']:.1f}s")
+            for name, r in result["endpoints"].items():
+                b = baseline["endpoints"][name]
+                print(f"       {name:<14} p50 {r['p50_ms']:>7} ms ({r['p50_ms'] / b['p50_ms']:4.2f}x)   "
+                      f"p95 {r['p95_ms']:>7} ms ({r['p95_ms'] / b['p95_ms']:4.2f}x)")
+
+    with open(args.out, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"wrote {args.out}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,197 @@
+"""
+Frontend delivery: bytes on the wire and modelled time-to-interactive.
+
+Loads each page (/ and /analytics) the way a browser would, in-process with
+TestClient and Accept-Encoding "gzip, deflate, br":
+
+    first    empty cache: the page, then every local stylesheet/script it links
+    repeat   same tab, later: subresources still fresh (Cache-Control max-age)
+             are not requested; the rest are revalidated with If-None-Match /
+             If-Modified-Since when the first response had a validator
+
+Wire bytes are response bodies as sent (Content-Length, so compressed size).
+Time-to-interactive is modelled for each network profile. It is one
+round trip plus transfer time for the page, then one more round trip for
+its subresources. These are fetched in parallel and share the link, and
+the measured server time is added to both steps. Connection setup, parsing
+and the third-party fonts / Chart.js CDN requests are the same before and
+after, so they are left out.
+
+    python bench/static_assets.py [--backend /path/to/other/checkout/backend] [--out static.json]
+    python bench/static_assets.py --compare old.json new.json
+"""
+import argparse
+import json
+import os
+import re
+import subprocess
+import sys
+import tempfile
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+BACKEND = os.path.join(HERE, "..", "backend")
+
+PAGES = ("/", "/analytics")
+ACCEPT_ENCODING = "gzip, deflate, br"
+# name → (downlink Mbit/s, round-trip ms); Lighthouse's mobile and desktop throttling
+PROFILES = {"slow-4g": (1.6, 150), "desktop": (10.0, 40)}
+
+_LOCAL_REFERENCE = re.compile(r'(?:href|src)="(?!https?:|//)([^"]+\.(?:css|js))"')
+
+
+def _wire_bytes(r) -> int:
+    length = r.headers.get("content-length")
+    return int(length) if length is not None else len(r.content)
+
+
+def _fresh(headers) -> bool:
+    cc = headers.get("cache-control", "")
+    return "no-cache" not in cc and "no-store" not in cc and re.search(r"max-age=[1-9]", cc) is not None
+
+
+# ─── Measurement (child process) ──────────────────────────────────────────────
+
+def visit(client, page: str, cache: dict) -> dict:
+    """Load one page and its subresources; `cache` maps URL → (headers, text) from earlier loads."""
+    fetched = []
+
+    def get(url) -> str:
+        headers = {"Accept-Encoding": ACCEPT_ENCODING}
+        seen = cache.get(url)
+        if seen is not None:
+            if url != page and _fresh(seen[0]):
+                return seen[1]
+            if "etag" in seen[0]:
+                headers["If-None-Match"] = seen[0]["etag"]
+            if "last-modified" in seen[0]:
+                headers["If-Modified-Since"] = seen[0]["last-modified"]
+        t0 = time.perf_counter()
+        r = client.get(url, headers=headers)
+        elapsed = (time.perf_counter() - t0) * 1000
+        if r.status_code not in (200, 304):
+            raise RuntimeError(f"GET {url} → {r.status_code}")
+        fetched.append({"url": url, "status": r.status_code, "bytes": _wire_bytes(r),
+                        "raw_bytes": len(r.content), "encoding": r.headers.get("content-encoding"),
+                        "server_ms": round(elapsed, 3)})
+        if r.status_code == 200:
+            cache[url] = (dict(r.headers), r.text)
+        return cache[url][1]
+
+    subresources = []
+    for ref in _LOCAL_REFERENCE.findall(get(page)):
+        url = ref if ref.startswith("/") else "/" + ref
+        subresources.append(url)
+        get(url)
+    return {"requests": fetched, "subresources": subresources}
+
+
+def summarize(loads: list) -> dict:
+    page, rest = loads[0], loads[1:]
+    out = {
+        "requests": len(loads),
+        "wire_bytes": sum(r["bytes"] for r in loads),
+        "uncompressed_bytes": sum(r["raw_bytes"] for r in loads if r["status"] == 200),
+        "server_ms": round(sum(r["server_ms"] for r in loads), 2),
+        "tti_ms": {},
+    }
+    for name, (mbps, rtt) in PROFILES.items():
+        per_byte = 8 / (mbps * 1000)    # ms per byte
+        t = rtt + page["server_ms"] + page["bytes"] * per_byte
+        if rest:
+            t += rtt + max(r["server_ms"] for r in rest) + sum(r["bytes"] for r in rest) * per_byte
+        out["tti_ms"][name] = round(t, 1)
+    return out
+
+
+def run(backend: str, rounds: int) -> dict:
+    sys.path.insert(0, backend)
+    from fastapi.testclient import TestClient
+    import main
+
+    results = {}
+    with TestClient(main.app) as client:
+        for page in PAGES:
+            best = None
+            for _ in range(rounds):
+                cache = {}
+                first = visit(client, page, cache)
+                repeat = visit(client, page, cache)
+                sample = {"first": first, "repeat": repeat}
+                key = sum(r["server_ms"] for v in sample.values() for r in v["requests"])
+                if best is None or key < best[0]:
+                    best = (key, sample)
+            sample = best[1]
+            results[page] = {
+                "subresources": sample["first"]["subresources"],
+                "first": summarize(sample["first"]["requests"]),
+                "repeat": summarize(sample["repeat"]["requests"]),
+                "detail": sample,
+            }
+    return results
+
+
+# ─── Driver ───────────────────────────────────────────────────────────────────
+
+def _report(results: dict) -> None:
+    for page, r in results.items():
+        print(f"{page}   linked: {', '.join(r['subresources'])}")
+        for visit_name in ("first", "repeat"):
+            s = r[visit_name]
+            tti = "  ".join(f"{k} {v:>7.1f} ms" for k, v in s["tti_ms"].items())
+            print(f"  {visit_name:<7} {s['requests']} req  {s['wire_bytes']:>7} B on wire "
+                  f"({s['uncompressed_bytes']:>7} B uncompressed)  TTI {tti}")
+
+
+def compare(old_path: str, new_path: str) -> int:
+    with open(old_path) as f:
+        old = json.load(f)["pages"]
+    with open(new_path) as f:
+        new = json.load(f)["pages"]
+    for page in new:
+        for visit_name in ("first", "repeat"):
+            o, n = old[page][visit_name], new[page][visit_name]
+            tti = "  ".join(
+                f"{k} {o['tti_ms'][k]:.0f} → {n['tti_ms'][k]:.0f} ms" for k in n["tti_ms"]
+            )
+            print(f"{page:<11} {visit_name:<7} {o['requests']} → {n['requests']} req   "
+                  f"{o['wire_bytes']:>7} → {n['wire_bytes']:>6} B   {tti}")
+    return 0
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--backend", default=BACKEND, help="backend/ directory to benchmark")
+    parser.add_argument("--rounds", type=int, default=20, help="loads per page; the fastest is kept")
+    parser.add_argument("--out", default="static.json")
+    parser.add_argument("--compare", nargs=2, metavar=("OLD", "NEW"))
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+    args.backend = os.path.abspath(args.backend)
+
+    if args.compare:
+        return compare(*args.compare)
+    if args.child:
+        print(json.dumps(run(args.backend, args.rounds)))
+        return 0
+
+    with tempfile.TemporaryDirectory() as tmp:
+        env = dict(os.environ, SPENDER_DATABASE_URL=f"sqlite:///{tmp}/bench.db")
+        cmd = [sys.executable, os.path.abspath(__file__), "--child",
+               "--backend", args.backend, "--rounds", str(args.rounds)]
+        out = subprocess.run(cmd, env=env, capture_output=True, text=True, cwd=tmp)
+    if out.returncode:
+        sys.stderr.write(out.stderr)
+        return out.returncode
+    results = json.loads(out.stdout.strip().splitlines()[-1])
+    _report(results)
+    report = {"meta": {"backend": args.backend, "profiles": PROFILES,
+                       "created": time.strftime("%Y-%m-%dT%H:%M:%S")}, "pages": results}
+    with open(args.out, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"wrote {args.out}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,295 @@
+"""
+Endpoint benchmark suite: latency percentiles and memory peaks per scale.
+
+For each scale, a fresh database is seeded with datagen.py (same seed, same
+rows) in its own process, then every scenario is driven through the app
+in-process with TestClient:
+
+    dashboard       GET  /api/dashboard
+    analytics       GET  /api/analytics
+    simulate        POST /api/simulate          (random amount/category)
+    expenses_page   GET  /api/expenses?limit=50 (first page + one cursor page)
+    expenses_filter GET  /api/expenses?limit=50&category=…&date_from=…
+    write           POST /api/expenses          (dates within the last 30 days)
+    delete          DELETE /api/expenses/{id}   (the rows `write` added)
+
+Each scenario runs --warmup untimed iterations, then --iterations timed ones,
+then --mem-iterations more under tracemalloc for the peak Python allocation
+per request. The response cache is off unless --cache is given, so reads
+measure the computation rather than a cached body.
+
+    python bench/suite.py [--scales 1k,100k,1m] [--out results.json]
+    python bench/suite.py --compare old.json results.json   # exit 1 on regressions
+
+--backend points at another checkout's backend/ to compare commits, e.g.
+
+    git worktree add /tmp/spender-old <ref>
+    python bench/suite.py --backend /tmp/spender-old/backend --out old.json
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import resource
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import date, timedelta
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+BACKEND = os.path.join(HERE, "..", "backend")
+
+PERCENTILES = (50, 90, 95, 99)
+CATEGORIES = ["food", "travel", "clothes", "skincare", "studies", "health", "subscriptions", "misc"]
+
+
+# ─── Scenarios ────────────────────────────────────────────────────────────────
+
+def scenarios(client, rng: random.Random) -> dict:
+    """name → zero-argument callable issuing one request (raises on non-2xx)."""
+    today = date.today()
+    written = []
+
+    def call(method, url, **kwargs):
+        r = client.request(method, url, **kwargs)
+        if r.status_code >= 400:
+            raise RuntimeError(f"{method} {url} → {r.status_code}: {r.text[:200]}")
+        return r
+
+    def expenses_page():
+        r = call("GET", "/api/expenses", params={"limit": 50})
+        cursor = r.headers.get("X-Next-Cursor")
+        if cursor:
+            call("GET", "/api/expenses", params={"limit": 50, "cursor": cursor})
+
+    def expenses_filter():
+        call("GET", "/api/expenses", params={
+            "limit": 50,
+            "category": rng.choice(CATEGORIES),
+            "date_from": (today - timedelta(days=rng.randrange(30, 365))).isoformat(),
+        })
+
+    def write():
+        r = call("POST", "/api/expenses", json={
+            "amount": rng.randint(20, 3000),
+            "category": rng.choice(CATEGORIES),
+            "date": (today - timedelta(days=rng.randrange(30))).isoformat(),
+            "note": "bench",
+            "mood": rng.choice([None, "calm", "happy", "stressed", "bored"]),
+            "payment_mode": rng.choice(["upi", "upi", "card"]),
+        })
+        written.append(r.json()["id"])
+
+    def delete():
+        if not written:
+            write()
+        call("DELETE", f"/api/expenses/{written.pop()}")
+
+    return {
+        "dashboard":       lambda: call("GET", "/api/dashboard"),
+        "analytics":       lambda: call("GET", "/api/analytics"),
+        "simulate":        lambda: call("POST", "/api/simulate", json={
+            "amount": rng.randint(100, 20000), "category": rng.choice(CATEGORIES),
+        }),
+        "expenses_page":   expenses_page,
+        "expenses_filter": expenses_filter,
+        "write":           write,
+        "delete":          delete,
+    }
+
+
+def _percentile(sorted_values: list, pct: float) -> float:
+    pos = (len(sorted_values) - 1) * pct / 100
+    lo = int(pos)
+    hi = min(lo + 1, len(sorted_values) - 1)
+    return sorted_values[lo] + (sorted_values[hi] - sorted_values[lo]) * (pos - lo)
+
+
+def measure(fn, iterations: int, warmup: int, mem_iterations: int) -> dict:
+    for _ in range(warmup):
+        fn()
+    latencies = []
+    for _ in range(iterations):
+        t = time.perf_counter()
+        fn()
+        latencies.append((time.perf_counter() - t) * 1000)
+    latencies.sort()
+
+    peak = 0
+    for _ in range(mem_iterations):
+        tracemalloc.start()
+        fn()
+        peak = max(peak, tracemalloc.get_traced_memory()[1])
+        tracemalloc.stop()
+
+    result = {f"p{p}_ms": round(_percentile(latencies, p), 3) for p in PERCENTILES}
+    result.update(
+        mean_ms=round(sum(latencies) / len(latencies), 3),
+        max_ms=round(latencies[-1], 3),
+        iterations=iterations,
+        peak_alloc_kb=round(peak / 1024, 1),
+    )
+    return result
+
+
+def _rss_kb() -> int:
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss // 1024 if sys.platform == "darwin" else rss   # bytes on macOS, KiB elsewhere
+
+
+# ─── One Scale (child process) ────────────────────────────────────────────────
+
+def run_scale(rows: int, args) -> dict:
+    path = os.environ["SPENDER_DATABASE_URL"][len("sqlite:///"):]
+    os.chdir(os.path.dirname(path))
+    sys.path.insert(0, args.backend)
+    sys.path.insert(0, HERE)
+    import datagen
+    from fastapi.testclient import TestClient
+    import main
+
+    seeded = datagen.generate(path, rows, args.seed)
+    rss_after_seed = _rss_kb()
+
+    rng = random.Random(args.seed)
+    results = {}
+    with TestClient(main.app) as client:
+        cases = scenarios(client, rng)
+        wanted = args.only.split(",") if args.only else list(cases)
+        for name in wanted:
+            results[name] = measure(cases[name], args.iterations, args.warmup, args.mem_iterations)
+
+    return {
+        "rows": rows,
+        "seed": seeded,
+        "rss_after_seed_kb": rss_after_seed,
+        "rss_peak_kb": _rss_kb(),
+        "db_size_kb": os.path.getsize(path) // 1024,
+        "endpoints": results,
+    }
+
+
+# ─── Driver ───────────────────────────────────────────────────────────────────
+
+def _git_commit(backend: str) -> str:
+    try:
+        out = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=backend,
+            capture_output=True, text=True, check=True,
+        )
+        dirty = subprocess.run(["git", "status", "--porcelain"], cwd=backend, capture_output=True, text=True)
+        return out.stdout.strip() + ("-dirty" if dirty.stdout.strip() else "")
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def compare(old_path: str, new_path: str, threshold: float) -> int:
+    """Print new/old ratios of p50 and p95; returns how many exceed threshold."""
+    with open(old_path) as f:
+        old = json.load(f)
+    with open(new_path) as f:
+        new = json.load(f)
+    print(f"{old['meta']['commit']} → {new['meta']['commit']}  (flagging ratios above {threshold})")
+    regressions = 0
+    for scale, run in new["scales"].items():
+        before = old["scales"].get(scale)
+        if not before:
+            continue
+        for name, r in run["endpoints"].items():
+            b = before["endpoints"].get(name)
+            if not b:
+                continue
+            cells = []
+            for key in ("p50_ms", "p95_ms", "peak_alloc_kb"):
+                ratio = r[key] / b[key] if b[key] else 1.0
+                # Allocation peaks move with caches and arena reuse; only flag big jumps.
+                flag = ratio > (threshold * 2 if key == "peak_alloc_kb" else threshold)
+                regressions += flag
+                cells.append(f"{key} {b[key]:>9} → {r[key]:>9} ({ratio:4.2f}x){' !' if flag else '  '}")
+            print(f"{scale:>5} {name:<16} " + "  ".join(cells))
+    return regressions
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--scales", default="1k,100k,1m", help="comma-separated: 1k, 100k, 1m or row counts")
+    parser.add_argument("--iterations", type=int, default=200)
+    parser.add_argument("--warmup", type=int, default=10)
+    parser.add_argument("--mem-iterations", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--only", help="comma-separated scenario names")
+    parser.add_argument("--cache", action="store_true", help="keep the response cache on")
+    parser.add_argument("--backend", default=BACKEND, help="backend/ directory to benchmark")
+    parser.add_argument("--out", help="JSON results file (default: bench-<commit>.json)")
+    parser.add_argument("--compare", nargs=2, metavar=("OLD", "NEW"), help="compare two results files")
+    parser.add_argument("--threshold", type=float, default=1.2)
+    parser.add_argument("--child", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+    args.backend = os.path.abspath(args.backend)
+
+    if args.compare:
+        return 1 if compare(*args.compare, args.threshold) else 0
+
+    if args.child is not None:
+        print(json.dumps(run_scale(args.child, args)))
+        return 0
+
+    sys.path.insert(0, HERE)
+    from datagen import SCALES
+
+    commit = _git_commit(args.backend)
+    report = {
+        "meta": {
+            "commit": commit,
+            "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "sqlite": sqlite3.sqlite_version,
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "seed": args.seed,
+            "iterations": args.iterations,
+            "response_cache": args.cache,
+        },
+        "scales": {},
+    }
+    for scale in args.scales.split(","):
+        rows = SCALES.get(scale.lower()) or int(scale)
+        with tempfile.TemporaryDirectory() as tmp:
+            env = dict(
+                os.environ,
+                SPENDER_DATABASE_URL=f"sqlite:///{tmp}/bench.db",
+                SPENDER_RESPONSE_CACHE="1" if args.cache else "0",
+            )
+            cmd = [
+                sys.executable, os.path.abspath(__file__), "--child", str(rows),
+                "--iterations", str(args.iterations), "--warmup", str(args.warmup),
+                "--mem-iterations", str(args.mem_iterations), "--seed", str(args.seed),
+                "--backend", args.backend,
+            ]
+            if args.only:
+                cmd += ["--only", args.only]
+            out = subprocess.run(cmd, env=env, capture_output=True, text=True)
+            if out.returncode:
+                sys.stderr.write(out.stderr)
+                return out.returncode
+            run = json.loads(out.stdout.strip().splitlines()[-1])
+        report["scales"][scale] = run
+        print(f"{scale:>5}  seeded in {run['seed']['fill_s'] + run['seed']['derive_s']:.1f}s, "
+              f"peak RSS {run['rss_peak_kb'] // 1024} MiB")
+        for name, r in run["endpoints"].items():
+            print(f"       {name:<16} p50 {r['p50_ms']:>8} ms   p95 {r['p95_ms']:>8} ms   "
+                  f"p99 {r['p99_ms']:>8} ms   alloc {r['peak_alloc_kb']:>8} KiB")
+
+    out_path = args.out or f"bench-{commit}.json"
+    with open(out_path, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"wrote {out_path}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
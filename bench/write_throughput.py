@@ -0,0 +1,74 @@
+"""
+Write-path throughput: POST /api/expenses against a fresh database, once per
+SQLite profile, each in its own process (the engine is configured at import).
+
+    python bench/write_throughput.py [--writes 500] [--profiles safe,performance]
+
+--backend points at another checkout's backend/ to compare commits, e.g.
+
+    git worktree add /tmp/spender-old <ref>
+    python bench/write_throughput.py --backend /tmp/spender-old/backend
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+BACKEND = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "backend")
+
+
+def run_one(writes: int, backend: str) -> dict:
+    os.chdir(os.path.dirname(os.environ["SPENDER_DATABASE_URL"][len("sqlite:///"):]))
+    sys.path.insert(0, backend)
+    from fastapi.testclient import TestClient
+    import main
+
+    with TestClient(main.app) as client:
+        client.post("/api/goal", json={
+            "target_amount": 500000, "deadline": "2030-01-01",
+            "monthly_income": 80000, "emi": 5000, "rent": 15000,
+        })
+        client.post("/api/balance/set", json={"amount": 100000})
+        start = time.perf_counter()
+        for i in range(writes):
+            client.post("/api/expenses", json={
+                "amount": 100 + i % 50, "category": "food",
+                "date": "2026-01-%02d" % (1 + i % 28), "payment_mode": "upi",
+            })
+        elapsed = time.perf_counter() - start
+    return {"writes": writes, "seconds": round(elapsed, 3), "writes_per_sec": round(writes / elapsed, 1)}
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--writes", type=int, default=500)
+    parser.add_argument("--profiles", default="safe,performance")
+    parser.add_argument("--backend", default=BACKEND, help="backend/ directory to benchmark")
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.child:
+        print(json.dumps(run_one(args.writes, args.backend)))
+        return 0
+
+    results = {}
+    for profile in args.profiles.split(","):
+        with tempfile.TemporaryDirectory() as tmp:
+            env = dict(os.environ, SPENDER_DB_PROFILE=profile,
+                       SPENDER_DATABASE_URL=f"sqlite:///{tmp}/bench.db")
+            out = subprocess.run(
+                [sys.executable, os.path.abspath(__file__), "--child",
+                 "--writes", str(args.writes), "--backend", os.path.abspath(args.backend)],
+                env=env, capture_output=True, text=True, check=True,
+            )
+            results[profile] = json.loads(out.stdout.strip().splitlines()[-1])
+            print(f"{profile:<12} {results[profile]['writes_per_sec']:>8} writes/s")
+    print(json.dumps(results, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -30,11 +30,12 @@ async function loadAnalytics() {
     main.innerHTML = `<div class="analytics-loading" id="loading-state"><div class="spinner"></div><span>Loading analytics…</span></div>`;
 
     try {
-        const [analytics, dashboard] = await Promise.all([
+        const [analytics, dashboard, forecast] = await Promise.all([
             apiFetch('/analytics'),
             apiFetch('/dashboard').catch(() => null),
+            apiFetch('/forecast').catch(() => null),
         ]);
-        renderAnalytics(analytics, dashboard);
+        renderAnalytics(analytics, dashboard, forecast);
     } catch (e) {
         main.innerHTML = `
             <div class="analytics-loading">
@@ -45,15 +46,33 @@ async function loadAnalytics() {
     }
 }
 
+// Same token handling as app.js: sent when stored, asked for on the first 401.
+const TOKEN_KEY = 'spender_token';
+
+function tokenHeaders() {
+    const token = localStorage.getItem(TOKEN_KEY);
+    const headers = { 'Content-Type': 'application/json' };
+    if (token) headers.Authorization = `Bearer ${token}`;
+    return headers;
+}
+
 async function apiFetch(path) {
-    const res = await fetch(API + path, { headers: { 'Content-Type': 'application/json' } });
+    const sent = localStorage.getItem(TOKEN_KEY);
+    let res = await fetch(API + path, { headers: tokenHeaders() });
+    if (res.status === 401) {
+        if (localStorage.getItem(TOKEN_KEY) === sent) {
+            const token = prompt('This Spender server needs your API token:');
+            if (token) localStorage.setItem(TOKEN_KEY, token.trim());
+        }
+        if (localStorage.getItem(TOKEN_KEY) !== sent) res = await fetch(API + path, { headers: tokenHeaders() });
+    }
     if (!res.ok) throw new Error('API error');
     return res.json();
 }
 
 // ─── Main Render ──────────────────────────────────────────────────────────
 
-function renderAnalytics(data, dashboard) {
+function renderAnalytics(data, dashboard, forecast) {
     const main = document.getElementById('analytics-main');
 
     const goal = dashboard?.goal;
@@ -63,7 +82,7 @@ function renderAnalytics(data, dashboard) {
     Object.values(charts).forEach(c => c.destroy());
     charts = {};
 
-    main.innerHTML = buildHTML(data, goal, projection);
+    main.innerHTML = buildHTML(data, goal, projection, forecast);
 
     // Render charts after DOM is ready
     requestAnimationFrame(() => {
@@ -73,12 +92,15 @@ function renderAnalytics(data, dashboard) {
         if (goal && projection) {
             renderGoalProgressChart(goal, projection);
         }
+        if (forecast) {
+            renderForecastChart(forecast);
+        }
     });
 }
 
 // ─── HTML Builder ─────────────────────────────────────────────────────────
 
-function buildHTML(data, goal, projection) {
+function buildHTML(data, goal, projection, forecast) {
     const pct = goal && projection
         ? Math.min(100, Math.round((projection.total_saved / goal.target_amount) * 100))
         : null;
@@ -242,6 +264,22 @@ function buildHTML(data, goal, projection) {
                 : `<div class="chart-wrap"><canvas id="chart-daily"></canvas></div>`}
         </div>
     </div>` : ''}
+
+    <!-- Charts Row 4 — Projected balance to the goal deadline -->
+    ${forecast ? `
+    <div class="chart-grid">
+        <div class="chart-card full-width">
+            <div class="chart-header">
+                <div class="chart-title"><span class="chart-title-icon">🔮</span> Projected Balance</div>
+                <span class="chart-badge">${forecast.first_negative_date
+                    ? `Below ₹0 on ${shortDate(forecast.first_negative_date)}`
+                    : `Low ₹${fmt(forecast.min_balance)} on ${shortDate(forecast.min_balance_date)}`}</span>
+            </div>
+            ${forecast.balance_known
+                ? `<div class="chart-wrap tall"><canvas id="chart-forecast"></canvas></div>`
+                : `<div class="chart-empty"><div class="chart-empty-icon">🔮</div><span>Set your balance to see a forecast</span></div>`}
+        </div>
+    </div>` : ''}
     `;
 }
 
@@ -558,8 +596,65 @@ function renderGoalProgressChart(goal, projection) {
     });
 }
 
+// ─── Chart: Projected Balance ─────────────────────────────────────────────
+
+function renderForecastChart(forecast) {
+    const canvas = document.getElementById('chart-forecast');
+    if (!canvas || forecast.points.length === 0) return;
+
+    const points = forecast.points;
+    const datasets = [{
+        label: 'Projected Balance',
+        data: points.map(p => p.balance),
+        borderColor: '#6c63ff',
+        backgroundColor: 'rgba(108,99,255,0.08)',
+        borderWidth: 2,
+        pointRadius: 0,
+        fill: true,
+        tension: 0.2,
+    }];
+
+    charts.forecast = new Chart(canvas, {
+        type: 'line',
+        data: { labels: points.map(p => shortDate(p.date)), datasets },
+        options: {
+            responsive: true,
+            maintainAspectRatio: false,
+            interaction: { mode: 'index', intersect: false },
+            plugins: {
+                legend: { display: false },
+                tooltip: {
+                    backgroundColor: '#1a1d28',
+                    borderColor: 'rgba(255,255,255,0.1)',
+                    borderWidth: 1,
+                    titleColor: '#e8eaf0',
+                    bodyColor: '#9ca3af',
+                    padding: 12,
+                    callbacks: {
+                        label: ctx => `${ctx.dataset.label}: ₹${fmt(ctx.raw)}`,
+                    },
+                },
+            },
+            scales: {
+                x: {
+                    grid: { color: 'rgba(255,255,255,0.04)' },
+                    ticks: { color: '#6b7280', font: { size: 10 }, maxTicksLimit: 12 },
+                },
+                y: {
+                    grid: { color: 'rgba(255,255,255,0.04)' },
+                    ticks: { color: '#6b7280', font: { size: 11 }, callback: v => '₹' + fmt(v) },
+                },
+            },
+        },
+    });
+}
+
 // ─── Formatter ────────────────────────────────────────────────────────────
 
+function shortDate(iso) {
+    return new Date(iso + 'T00:00:00').toLocaleDateString('en-IN', { day: 'numeric', month: 'short' });
+}
+
 function fmt(n) {
     if (n === null || n === undefined) return '—';
     return Math.round(n).toLocaleString('en-IN');
@@ -6,6 +6,8 @@ const API = 'http://localhost:8000/api';
 
 let allExpenses = [];
 let currentFilter = 'all';
+let expenseCursor = null;        // X-Next-Cursor of the last loaded page (null = no more pages)
+const EXPENSE_PAGE_SIZE = 50;
 let currentPaymentMode = 'upi';  // tracks selected payment mode in the expense modal
 
 // Category config
@@ -30,6 +32,7 @@ document.addEventListener('DOMContentLoaded', () => {
     loadExpenses();
     loadLedger();
     loadWeeklyUnderspend();
+    connectStream();
 });
 
 // reset payment mode each time the expense modal is opened
@@ -59,12 +62,115 @@ function todayStr() {
     return new Date().toISOString().split('T')[0];
 }
 
+// ─── Live Updates ─────────────────────────────────────────────────────────
+// While /api/stream is open every committed write — from this tab or any
+// other — arrives with the new dashboard state and the expense and ledger
+// entries it added, so actions skip their refetches.
+
+let streamOpen = false;
+let streamDropped = false;
+let dashboardState = null;     // last rendered dashboard, for events that carry only part of it
+const PARTIAL_FIELDS = ['balance_state', 'weekly'];
+
+function connectStream() {
+    if (!window.EventSource) return;
+    // EventSource can't send headers, so the token goes in the query string
+    const token = localStorage.getItem(TOKEN_KEY);
+    const source = new EventSource(API + '/stream' + (token ? `?token=${encodeURIComponent(token)}` : ''));
+    source.onopen = () => {
+        streamOpen = true;
+        // Writes may have happened while disconnected
+        if (streamDropped) resyncAll();
+    };
+    source.onerror = () => {
+        // EventSource reconnects on its own, except after an HTTP error (e.g. 401 before a token was entered)
+        streamOpen = false;
+        streamDropped = true;
+        if (source.readyState === EventSource.CLOSED) setTimeout(connectStream, 5000);
+    };
+    source.onmessage = msg => applyStreamEvent(JSON.parse(msg.data));
+}
+
+function refreshAfterWrite(...loaders) {
+    if (!streamOpen) loaders.forEach(load => load());
+}
+
+function resyncAll() {
+    loadDashboard();
+    loadExpenses();
+    loadLedger();
+    loadWeeklyUnderspend();
+}
+
+function applyStreamEvent(ev) {
+    if (ev.event === 'resync') { resyncAll(); return; }
+
+    let dashboard = ev.dashboard;
+    const changed = PARTIAL_FIELDS.filter(field => field in ev);
+    if (!dashboard && changed.length) {
+        // Balance and weekly writes send only the dashboard fields they change
+        if (dashboardState) {
+            dashboard = { ...dashboardState };
+            changed.forEach(field => { dashboard[field] = ev[field]; });
+        } else {
+            loadDashboard();
+        }
+    }
+    if (dashboard) {
+        dashboardState = dashboard;
+        renderDashboard(dashboard);
+        const weekly = dashboard.weekly;
+        if (weekly) renderUnderspendTile(weekly.weekly_cap - weekly.spent_this_week);
+    }
+
+    if (ev.event === 'expense_added' && ev.expense) {
+        if (!allExpenses.some(e => e.id === ev.expense.id)) allExpenses.unshift(ev.expense);
+        renderExpenses();
+    } else if (ev.event === 'expense_deleted') {
+        allExpenses = allExpenses.filter(e => e.id !== ev.expense_id);
+        renderExpenses();
+    } else if (ev.event === 'expenses_imported') {
+        loadExpenses();
+    }
+
+    if (ev.ledger_entries && ev.ledger_entries.length) {
+        // Sent oldest first; the list is newest first
+        const fresh = ev.ledger_entries.filter(e => !ledgerEntries.some(l => l.id === e.id)).reverse();
+        ledgerEntries = fresh.concat(ledgerEntries).slice(0, LEDGER_SIZE);
+        renderLedger(ledgerEntries);
+    }
+}
+
 // ─── API Helpers ──────────────────────────────────────────────────────────
 
+// Multi-user servers (SPENDER_MULTI_USER=1) want an API token on every request.
+// It's asked for on the first 401 and kept in localStorage.
+const TOKEN_KEY = 'spender_token';
+
+function withToken(options) {
+    const token = localStorage.getItem(TOKEN_KEY);
+    const headers = { ...options.headers };
+    if (token) headers.Authorization = `Bearer ${token}`;
+    return { ...options, headers };
+}
+
+async function authFetch(url, options = {}) {
+    const sent = localStorage.getItem(TOKEN_KEY);
+    const res = await fetch(url, withToken(options));
+    if (res.status !== 401) return res;
+    // Parallel requests all get a 401; only the first one asks.
+    if (localStorage.getItem(TOKEN_KEY) === sent) {
+        const token = prompt('This Spender server needs your API token:');
+        if (!token) return res;
+        localStorage.setItem(TOKEN_KEY, token.trim());
+    }
+    return fetch(url, withToken(options));
+}
+
 async function apiFetch(path, options = {}) {
-    const res = await fetch(API + path, {
-        headers: { 'Content-Type': 'application/json' },
+    const res = await authFetch(API + path, {
         ...options,
+        headers: { 'Content-Type': 'application/json', ...options.headers },
     });
     if (!res.ok) {
         const err = await res.json().catch(() => ({ detail: res.statusText }));
@@ -78,6 +184,7 @@ async function apiFetch(path, options = {}) {
 async function loadDashboard() {
     try {
         const data = await apiFetch('/dashboard');
+        dashboardState = data;
         renderDashboard(data);
     } catch (e) {
         renderBalanceCenter(null);
@@ -254,10 +361,13 @@ function renderBalanceCenter(bs) {
 
 // ─── Ledger History ───────────────────────────────────────────────────────
 
+let ledgerEntries = [];        // newest first, as /balance/ledger returns them
+const LEDGER_SIZE = 50;
+
 async function loadLedger() {
     try {
-        const ledger = await apiFetch('/balance/ledger');
-        renderLedger(ledger);
+        ledgerEntries = await apiFetch('/balance/ledger');
+        renderLedger(ledgerEntries);
     } catch (e) { /* no ledger yet */ }
 }
 
@@ -323,8 +433,7 @@ async function submitSetBalance() {
         document.getElementById('bal-amount').value = '';
         document.getElementById('bal-note').value = '';
         showToast('Balance set ✓', 'success');
-        loadDashboard();
-        loadLedger();
+        refreshAfterWrite(loadDashboard, loadLedger);
     } catch (e) {
         showToast('Error: ' + e.message, 'error');
     }
@@ -349,8 +458,7 @@ async function submitCredit() {
         document.getElementById('credit-amount').value = '';
         document.getElementById('credit-note').value = '';
         showToast(`+₹${fmt(amount)} credited ✓`, 'success');
-        loadDashboard();
-        loadLedger();
+        refreshAfterWrite(loadDashboard, loadLedger);
     } catch (e) {
         showToast('Error: ' + e.message, 'error');
     }
@@ -367,14 +475,30 @@ function setRing(id, pct) {
 
 // ─── Expenses ─────────────────────────────────────────────────────────────
 
-async function loadExpenses() {
+// Fetches one page for the active filter; append=true loads the next page.
+async function loadExpenses(append = false) {
+    const params = new URLSearchParams();
+    if (currentFilter === 'week') {
+        // A week always fits in one page, so the summary bar totals stay exact
+        params.set('limit', 500);
+        params.set('date_from', isoDate(getWeekStart()));
+    } else {
+        params.set('limit', EXPENSE_PAGE_SIZE);
+        if (currentFilter !== 'all') params.set('category', currentFilter);
+    }
+    if (append && expenseCursor) params.set('cursor', expenseCursor);
+
     try {
-        allExpenses = await apiFetch('/expenses');
-        renderExpenses();
+        const res = await authFetch(`${API}/expenses?${params}`);
+        if (!res.ok) throw new Error(res.statusText);
+        const page = await res.json();
+        expenseCursor = res.headers.get('X-Next-Cursor');
+        allExpenses = append ? allExpenses.concat(page) : page;
     } catch (e) {
-        allExpenses = [];
-        renderExpenses();
+        if (!append) allExpenses = [];
+        expenseCursor = null;
     }
+    renderExpenses();
 }
 
 function renderExpenses() {
@@ -438,14 +562,21 @@ function renderExpenses() {
         </button>
       </div>
     `;
-    }).join('');
+    }).join('') + (expenseCursor
+        ? `<button class="btn btn-ghost expense-more" onclick="loadExpenses(true)">Load more</button>`
+        : '');
 }
 
 function filterExpenses(filter, btn) {
     currentFilter = filter;
     document.querySelectorAll('.filter-btn').forEach(b => b.classList.remove('active'));
     btn.classList.add('active');
-    renderExpenses();
+    loadExpenses();
+}
+
+// Local-date YYYY-MM-DD (toISOString would shift to UTC)
+function isoDate(d) {
+    return `${d.getFullYear()}-${String(d.getMonth() + 1).padStart(2, '0')}-${String(d.getDate()).padStart(2, '0')}`;
 }
 
 // Get the Monday of the current week
@@ -465,9 +596,7 @@ async function deleteExpense(id) {
         await apiFetch(`/expenses/${id}`, { method: 'DELETE' });
         allExpenses = allExpenses.filter(e => e.id !== id);
         renderExpenses();
-        loadDashboard();
-        loadLedger();
-        loadWeeklyUnderspend();
+        refreshAfterWrite(loadDashboard, loadLedger, loadWeeklyUnderspend);
         showToast('Expense deleted', 'success');
     } catch (e) {
         showToast('Failed to delete: ' + e.message, 'error');
@@ -498,7 +627,7 @@ async function submitGoal(event) {
         await apiFetch('/goal', { method: 'POST', body: JSON.stringify(payload) });
         closeModal('modal-goal');
         showToast('Mission goal saved! 🚀', 'success');
-        loadDashboard();
+        refreshAfterWrite(loadDashboard);
     } catch (e) {
         showToast('Error: ' + e.message, 'error');
     }
@@ -519,7 +648,8 @@ async function submitExpense(event) {
     };
     try {
         const expense = await apiFetch('/expenses', { method: 'POST', body: JSON.stringify(payload) });
-        allExpenses.unshift(expense);
+        // The stream may have delivered it already
+        if (!allExpenses.some(e => e.id === expense.id)) allExpenses.unshift(expense);
         renderExpenses();
         closeModal('modal-expense');
         document.getElementById('form-expense').reset();
@@ -528,9 +658,7 @@ async function submitExpense(event) {
             ? 'Logged to CC — balance unchanged 💳'
             : 'Expense logged ✓';
         showToast(modeMsg, 'success');
-        loadDashboard();
-        loadLedger();
-        loadWeeklyUnderspend();
+        refreshAfterWrite(loadDashboard, loadLedger, loadWeeklyUnderspend);
     } catch (e) {
         showToast('Error: ' + e.message, 'error');
     }
@@ -545,7 +673,7 @@ async function updateWeeklyCap() {
         await apiFetch(`/weekly/cap?cap=${cap}`, { method: 'PATCH' });
         closeModal('modal-weekly-cap');
         showToast('Weekly cap updated ✓', 'success');
-        loadDashboard();
+        refreshAfterWrite(loadDashboard);
     } catch (e) {
         showToast('Error: ' + e.message, 'error');
     }
@@ -678,7 +806,7 @@ async function submitSaving() {
         document.getElementById('saving-amount').value = '';
         document.getElementById('saving-note').value = '';
         showToast(`🎉 Saved ₹${fmt(amount)}!`, 'success');
-        loadDashboard();
+        refreshAfterWrite(loadDashboard);
     } catch (e) {
         showToast('Error: ' + e.message, 'error');
     }
@@ -0,0 +1,17 @@
+"""
+The backend is a directory of flat modules run from backend/; tests import
+them the same way, against a throwaway database per test session.
+
+The backend reads its configuration once, at import, so the whole session
+runs in multi-user mode: token auth and per-user scoping are under test, and
+single-user mode is the same code with one implicit user. test_multi_user.py
+re-runs itself in a child process for shard mode.
+"""
+import os
+import sys
+import tempfile
+
+BACKEND = os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir, "backend"))
+sys.path.insert(0, BACKEND)
+os.environ["SPENDER_DATABASE_URL"] = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'spender.db')}"
+os.environ["SPENDER_MULTI_USER"] = "1"
@@ -0,0 +1,62 @@
+from datetime import date
+
+import pytest
+from sqlalchemy import event, text
+
+import database
+from auth import DEFAULT_USER_ID
+from engine import ComputationContext, record_expense, record_ledger_entry
+from models import Goal
+
+
+@pytest.fixture(scope="module", autouse=True)
+def seeded():
+    database.init_db()
+    db = database.user_session(DEFAULT_USER_ID)
+    try:
+        db.add(Goal(target_amount=200000, deadline=date(date.today().year + 1, 6, 1), monthly_income=60000))
+        record_ledger_entry(db, "set", 50000, note="Opening balance")
+        db.commit()
+        for amount, category, payment_mode in [(450, "food", "upi"), (2400, "clothes", "card"), (900, "travel", "upi")]:
+            record_expense(db, {"amount": amount, "category": category, "date": date.today(),
+                                "payment_mode": payment_mode})
+    finally:
+        db.close()
+
+
+def statements_run(fn):
+    """Every SQL statement sent to the database while fn() runs."""
+    statements = []
+
+    def before(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(database.engine, "before_cursor_execute", before)
+    try:
+        fn()
+    finally:
+        event.remove(database.engine, "before_cursor_execute", before)
+    return statements
+
+
+def test_dashboard_is_four_queries():
+    db = database.user_session(DEFAULT_USER_ID)
+    try:
+        statements = statements_run(lambda: ComputationContext(db).dashboard())
+    finally:
+        db.close()
+    # goal, weekly limit, expense totals, balance checkpoint
+    assert len(statements) == 4, "\n".join(statements)
+    assert all(s.lstrip().upper().startswith("SELECT") for s in statements)
+
+
+def test_dashboard_without_weekly_row_is_four_queries_and_writes_nothing():
+    db = database.user_session(DEFAULT_USER_ID)
+    try:
+        db.execute(text("DELETE FROM weekly_limits"))
+        db.commit()
+        statements = statements_run(lambda: ComputationContext(db).dashboard())
+    finally:
+        db.close()
+    assert len(statements) == 4, "\n".join(statements)
+    assert all(s.lstrip().upper().startswith("SELECT") for s in statements)
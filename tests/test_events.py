@@ -0,0 +1,74 @@
+import json
+from datetime import date, timedelta
+
+import pytest
+from fastapi.testclient import TestClient
+
+import auth
+import database
+import events
+import main
+
+
+@pytest.fixture(scope="module")
+def client():
+    with TestClient(main.app) as c:
+        yield c
+
+
+@pytest.fixture
+def user(client):
+    db = database.SessionLocal()
+    try:
+        user, token = auth.create_user(db, "events")
+        db.commit()
+    finally:
+        db.close()
+    return {"Authorization": f"Bearer {token}"}
+
+
+@pytest.fixture
+def sent(monkeypatch):
+    """The stream messages publish() fans out, as if a tab were listening."""
+    messages = []
+    monkeypatch.setattr(events, "has_subscribers", lambda user_id: True)
+    monkeypatch.setattr(events, "broadcast", lambda user_id, message: messages.append(json.loads(message)))
+    return messages
+
+
+def test_balance_writes_send_their_entry_and_balance_only(client, user, sent):
+    assert client.post("/api/balance/set", headers=user, json={"amount": 5000, "note": "bank"}).status_code == 200
+    assert client.post("/api/balance/credit", headers=user, json={"amount": 300}).status_code == 200
+
+    balance_set, credit = sent
+    assert "dashboard" not in balance_set and "weekly" not in balance_set
+    assert [(e["type"], e["amount"], e["note"]) for e in balance_set["ledger_entries"]] == [("set", 5000, "bank")]
+    assert balance_set["balance_state"]["current_balance"] == 5000
+    assert [(e["type"], e["amount"]) for e in credit["ledger_entries"]] == [("credit", 300)]
+    assert credit["balance_state"]["current_balance"] == 5300
+
+
+def test_expense_writes_send_the_upi_debit_and_its_reversal(client, user, sent):
+    assert client.post("/api/balance/set", headers=user, json={"amount": 5000}).status_code == 200
+    expense = client.post("/api/expenses", headers=user, json={
+        "amount": 450, "category": "food", "date": date.today().isoformat(), "payment_mode": "upi",
+    }).json()
+    assert client.delete(f"/api/expenses/{expense['id']}", headers=user).status_code == 200
+
+    _, added, deleted = sent
+    assert added["expense"]["id"] == expense["id"]
+    assert [(e["type"], e["amount"]) for e in added["ledger_entries"]] == [("debit", 450)]
+    assert added["dashboard"]["balance_state"]["current_balance"] == 4550
+    assert [(e["type"], e["amount"]) for e in deleted["ledger_entries"]] == [("credit", 450)]
+
+
+def test_goal_and_weekly_writes_send_no_ledger_entries(client, user, sent):
+    assert client.post("/api/goal", headers=user, json={
+        "target_amount": 100000, "deadline": (date.today() + timedelta(days=200)).isoformat(), "monthly_income": 50000,
+    }).status_code == 200
+    assert client.patch("/api/weekly/cap?cap=777", headers=user).status_code == 200
+
+    goal_set, weekly = sent
+    assert "dashboard" in goal_set and "ledger_entries" not in goal_set
+    assert weekly["weekly"]["weekly_cap"] == 777
+    assert "dashboard" not in weekly and "ledger_entries" not in weekly
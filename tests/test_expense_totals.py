@@ -0,0 +1,69 @@
+from datetime import date, timedelta
+
+import pytest
+from sqlalchemy import func
+
+import database
+import importer
+from engine import _stored_totals, record_expense, remove_expense, verify_expense_totals
+from models import Expense
+
+USER_ID = 7002   # its own user, so the other tests' expenses don't show up here
+TODAY = date.today()
+
+
+@pytest.fixture(scope="module")
+def db():
+    database.init_db()
+    session = database.user_session(USER_ID)
+    try:
+        yield session
+    finally:
+        session.close()
+
+
+def raw_total(db, *criteria) -> int:
+    return db.query(func.coalesce(func.sum(Expense.amount), 0)).filter(*criteria).scalar()
+
+
+def assert_totals_match_raw(db):
+    assert verify_expense_totals(db) == []
+    totals = _stored_totals(
+        db, ("all", ""), ("category", "food"), ("category", "travel"), ("payment_mode", "card"),
+        ("day", TODAY.isoformat()), ("category", "never-used"),
+    )
+    assert totals == {
+        ("all", ""):                 raw_total(db),
+        ("category", "food"):        raw_total(db, Expense.category == "food"),
+        ("category", "travel"):      raw_total(db, Expense.category == "travel"),
+        ("payment_mode", "card"):    raw_total(db, Expense.payment_mode == "card"),
+        ("day", TODAY.isoformat()):  raw_total(db, Expense.date == TODAY),
+        ("category", "never-used"):  0,
+    }
+
+
+def test_totals_follow_adds_imports_and_deletes(db):
+    for amount, category, days_ago, mode in [
+        (450, "food", 0, "upi"), (2400, "clothes", 1, "card"), (90, "food", 0, "card"), (700, "travel", 9, "upi"),
+    ]:
+        record_expense(db, {"amount": amount, "category": category, "date": TODAY - timedelta(days=days_ago),
+                            "payment_mode": mode})
+    assert_totals_match_raw(db)
+
+    rows = importer.LineParser("ndjson").feed(b"".join(
+        b'{"amount": %d, "category": "%s", "date": "%s", "payment_mode": "%s"}\n'
+        % (amount, category.encode(), (TODAY - timedelta(days=days_ago)).isoformat().encode(), mode.encode())
+        for amount, category, days_ago, mode in [(30, "food", 0, "upi"), (120, "travel", 40, "card")]
+    ))
+    signatures: set = set()
+    importer.import_batch(db, rows, signatures)
+    importer.finish(db, signatures)
+    assert_totals_match_raw(db)
+
+    for expense in db.query(Expense).filter(Expense.category.in_(["food", "clothes"])).all()[:3]:
+        remove_expense(db, expense)
+    assert_totals_match_raw(db)
+
+    for expense in db.query(Expense).all():
+        remove_expense(db, expense)
+    assert_totals_match_raw(db)
@@ -0,0 +1,28 @@
+from datetime import date, datetime
+
+import exporter
+
+
+def columnar_round_trip(columns, rows):
+    return list(exporter.read_columnar(b"".join(exporter.encode_columnar(columns, iter([rows])))))
+
+
+def test_ledger_round_trip_keeps_null_timestamps_null():
+    rows = [
+        (1, "set",    50000, "Opening balance", datetime(2026, 10, 1, 9, 30, 15, 123456)),
+        (2, "debit",  450,   None,              None),
+        (3, "credit", 1000,  "Salary",          datetime(1969, 12, 31, 23, 59, 59)),
+    ]
+    assert columnar_round_trip(exporter.LEDGER_COLUMNS, rows) == [
+        dict(zip(["id", "type", "amount", "note", "recorded_at"], row)) for row in rows
+    ]
+
+
+def test_expense_round_trip_with_null_mood_and_note():
+    rows = [
+        (1, date(2026, 10, 1), 450,  "food",    "upi",  "happy", "lunch"),
+        (2, date(2026, 10, 2), 2400, "clothes", "card", None,    None),
+        (3, date(2026, 10, 2), 90,   "food",    "upi",  None,    "chai ☕"),
+    ]
+    names = [name for name, _, _ in exporter.EXPENSE_COLUMNS]
+    assert columnar_round_trip(exporter.EXPENSE_COLUMNS, rows) == [dict(zip(names, row)) for row in rows]
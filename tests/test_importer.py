@@ -0,0 +1,84 @@
+import pytest
+
+import database
+import importer
+from models import Expense
+
+USER_ID = 7001   # its own user, so these rows stay out of the other tests' totals
+
+
+def parse(fmt: str, *chunks: bytes):
+    parser = importer.LineParser(fmt)
+    rows = []
+    for chunk in chunks:
+        rows += parser.feed(chunk)
+    return rows + parser.close()
+
+
+def test_csv_quoted_field_spans_lines_and_chunks():
+    rows = parse(
+        "csv",
+        b'date,amount,category,note\n2026-10-01,100,food,"two\n',
+        b'lines, one ""quote"""\n2026-10-02,5,travel,plain\n',
+    )
+    assert rows == [
+        (1, {"date": "2026-10-01", "amount": "100", "category": "food", "note": 'two\nlines, one "quote"'}, None),
+        (2, {"date": "2026-10-02", "amount": "5", "category": "travel", "note": "plain"}, None),
+    ]
+
+
+def test_csv_unclosed_quote_runs_to_end_of_input():
+    rows = parse("csv", b'date,amount,category,note\n2026-10-01,100,food,"never\nclosed\n')
+    assert len(rows) == 1
+    assert rows[0][1]["note"] == "never\nclosed\n"
+
+
+def test_bad_utf8_fails_only_its_own_row():
+    csv_rows = parse("csv", b"date,amount,category,note\n2026-10-01,1,food,caf\xe9\n2026-10-02,2,food,ok\n")
+    assert csv_rows[0][0] == 1 and csv_rows[0][1] is None
+    assert csv_rows[0][2].startswith("not valid UTF-8")
+    assert csv_rows[1] == (2, {"date": "2026-10-02", "amount": "2", "category": "food", "note": "ok"}, None)
+
+    ndjson_rows = parse("ndjson", b'{"amount": 1}\n{"note": "caf\xe9"}\n[1]\n{oops\n')
+    assert [(n, e is None) for n, _, e in ndjson_rows] == [(1, True), (2, False), (3, False), (4, False)]
+    assert ndjson_rows[1][2].startswith("not valid UTF-8")
+    assert ndjson_rows[2][2] == "expected a JSON object"
+    assert ndjson_rows[3][2].startswith("invalid JSON")
+
+
+def test_utf8_bom_is_stripped_from_the_header():
+    rows = parse("csv", b"\xef\xbb\xbfdate,amount,category\n2026-10-01,3,food\n")
+    assert rows[0][1] == {"date": "2026-10-01", "amount": "3", "category": "food"}
+
+
+@pytest.fixture
+def db():
+    database.init_db()
+    session = database.user_session(USER_ID)
+    try:
+        yield session
+    finally:
+        session.close()
+
+
+def test_import_batch_reports_errors_per_row_and_keeps_the_rest(db):
+    rows = parse(
+        "csv",
+        b"date,amount,category,note\n"
+        b"2026-10-01,100,food,lunch\n"
+        b"2026-10-02,abc,food,bad amount\n"
+        b"2026-10-03,50,spaceships,bad category\n"
+        b"2026-10-04,7,travel,caf\xe9\n"
+        b"2026-10-05,20,travel,bus\n",
+    )
+    signatures: set = set()
+    inserted, errors = importer.import_batch(db, rows, signatures)
+    importer.finish(db, signatures)
+
+    assert inserted == 2
+    assert [e["row"] for e in errors] == [2, 3, 4]
+    assert errors[0]["error"].startswith("amount:")
+    assert errors[1]["error"].startswith("category:")
+    assert errors[2]["error"].startswith("not valid UTF-8")
+    assert sorted(n for (n,) in db.query(Expense.note)) == ["bus", "lunch"]
+    assert len(signatures) == 2
@@ -0,0 +1,125 @@
+import os
+import sqlite3
+import subprocess
+import sys
+from datetime import date, timedelta
+
+import pytest
+from sqlalchemy import create_engine, func
+from sqlalchemy.orm import Session
+
+import database
+import migrations
+from auth import DEFAULT_USER_ID
+from engine import verify_expense_totals
+from models import (
+    BalanceCheckpoint, Expense, ExpenseRollup, ExpenseRollupMonth, ExpenseTotal, RecurringSeries,
+)
+
+# The schema as the first release created it: no user_id, no schema_version,
+# no derived tables.
+BASELINE_SCHEMA = """
+CREATE TABLE goals (
+    id INTEGER NOT NULL PRIMARY KEY, target_amount INTEGER NOT NULL, deadline DATE NOT NULL,
+    monthly_income INTEGER NOT NULL, emi INTEGER NOT NULL, rent INTEGER NOT NULL,
+    clothing_cap INTEGER NOT NULL, initial_savings INTEGER NOT NULL, created_at DATETIME
+);
+CREATE TABLE expenses (
+    id INTEGER NOT NULL PRIMARY KEY, amount INTEGER NOT NULL, category VARCHAR NOT NULL,
+    date DATE NOT NULL, note TEXT, mood VARCHAR, payment_mode VARCHAR NOT NULL
+);
+CREATE TABLE weekly_limits (
+    id INTEGER NOT NULL PRIMARY KEY, week_start_date DATE NOT NULL UNIQUE,
+    weekly_cap INTEGER NOT NULL, spent_this_week INTEGER NOT NULL
+);
+CREATE TABLE weekly_history (
+    id INTEGER NOT NULL PRIMARY KEY, week_start_date DATE NOT NULL UNIQUE,
+    weekly_cap INTEGER NOT NULL, spent INTEGER NOT NULL, saved INTEGER NOT NULL
+);
+CREATE TABLE balance_ledger (
+    id INTEGER NOT NULL PRIMARY KEY, type VARCHAR NOT NULL, amount INTEGER NOT NULL,
+    note TEXT, recorded_at DATETIME
+);
+CREATE INDEX ix_expenses_id ON expenses (id);
+"""
+
+START = date(2026, 1, 5)
+
+
+def baseline_expenses():
+    rows = [(649, "subscriptions", START + timedelta(days=30 * i), f"Netflix {i}", None, "card") for i in range(6)]
+    rows += [(100 + 7 * i, "food", START + timedelta(days=i), None, "happy" if i % 3 else None, "upi")
+             for i in range(60)]
+    rows += [(1500, "travel", START + timedelta(days=10), "train home", "calm", "upi")]
+    return rows
+
+
+@pytest.fixture(scope="module")
+def migrated(tmp_path_factory):
+    path = str(tmp_path_factory.mktemp("legacy") / "spender.db")
+    con = sqlite3.connect(path)
+    con.executescript(BASELINE_SCHEMA)
+    con.execute(
+        "INSERT INTO goals (target_amount, deadline, monthly_income, emi, rent, clothing_cap, initial_savings) "
+        "VALUES (200000, '2027-06-01', 60000, 5000, 10000, 10000, 0)"
+    )
+    con.executemany(
+        "INSERT INTO expenses (amount, category, date, note, mood, payment_mode) VALUES (?,?,?,?,?,?)",
+        [(a, c, d.isoformat(), n, m, p) for a, c, d, n, m, p in baseline_expenses()],
+    )
+    con.executemany(
+        "INSERT INTO balance_ledger (type, amount, note, recorded_at) VALUES (?,?,?,?)",
+        [("set", 50000, "Opening balance", "2026-01-05 09:00:00"),
+         ("debit", 1500, "[UPI] train home", "2026-01-15 09:00:00"),
+         ("credit", 60000, "Salary", "2026-02-01 09:00:00")],
+    )
+    con.commit()
+    con.close()
+
+    # init_db() as a fresh process started against the old file would run it
+    subprocess.run(
+        [sys.executable, "-c", "import database; database.init_db()"],
+        cwd=os.path.dirname(database.__file__),
+        env=dict(os.environ, SPENDER_DATABASE_URL=f"sqlite:///{path}"),
+        check=True,
+    )
+    engine = create_engine(f"sqlite:///{path}")
+    db = Session(bind=engine, info={"user_id": DEFAULT_USER_ID})
+    try:
+        yield db
+    finally:
+        db.close()
+        engine.dispose()
+
+
+def test_schema_is_at_latest(migrated):
+    with migrated.get_bind().connect() as conn:
+        assert migrations.current_version(conn) == migrations.LATEST
+
+
+def test_existing_rows_belong_to_the_default_user(migrated):
+    assert migrated.query(Expense).count() == len(baseline_expenses())
+    owners = migrated.execute(Expense.__table__.select().with_only_columns(Expense.user_id).distinct()).scalars()
+    assert list(owners) == [DEFAULT_USER_ID]
+
+
+def test_derived_tables_are_backfilled_without_drift(migrated):
+    raw_total = sum(row[0] for row in baseline_expenses())
+    grand = migrated.query(ExpenseTotal).filter(ExpenseTotal.dimension == "all").one()
+    assert (grand.total, grand.count) == (raw_total, len(baseline_expenses()))
+    assert migrated.query(func.sum(ExpenseRollup.total)).scalar() == raw_total
+    assert migrated.query(func.sum(ExpenseRollupMonth.total)).scalar() == raw_total
+    assert verify_expense_totals(migrated) == []
+
+
+def test_balance_and_recurring_state_are_rebuilt(migrated):
+    assert migrated.get(BalanceCheckpoint, DEFAULT_USER_ID).current_balance == 50000 - 1500 + 60000
+    series = migrated.query(RecurringSeries).filter(RecurringSeries.period.isnot(None)).all()
+    assert [(s.category, s.period, s.occurrences) for s in series] == [("subscriptions", "monthly", 6)]
+    assert migrated.query(Expense).filter(Expense.note.is_(None), Expense.signature.isnot(None)).count() == 0
+    assert migrated.query(Expense).filter(Expense.note.isnot(None), Expense.signature.is_(None)).count() == 0
+
+
+def test_migrating_again_is_a_no_op(migrated):
+    with migrated.get_bind().connect() as conn:
+        assert migrations.migrate(conn) == 0
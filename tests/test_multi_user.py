@@ -0,0 +1,175 @@
+import os
+import subprocess
+import sys
+import tempfile
+from datetime import date, timedelta
+
+import pytest
+from fastapi import Depends, FastAPI
+from fastapi.testclient import TestClient
+
+import auth
+import database
+import main
+
+PROTECTED = [
+    "/api/expenses", "/api/dashboard", "/api/balance/ledger", "/api/analytics", "/api/analytics/cube",
+    "/api/forecast", "/api/export/expenses", "/api/export/ledger", "/api/recurring", "/api/_metrics",
+]
+
+
+@pytest.fixture(scope="module")
+def client():
+    with TestClient(main.app) as c:
+        yield c
+
+
+def new_user(name: str) -> dict:
+    db = database.SessionLocal()
+    try:
+        user, token = auth.create_user(db, name)
+        db.commit()
+        return {"id": user.id, "headers": {"Authorization": f"Bearer {token}"}, "token": token}
+    finally:
+        db.close()
+
+
+def seed(client, user: dict, balance: int, amounts) -> list:
+    h = user["headers"]
+    deadline = (date.today() + timedelta(days=200)).isoformat()
+    assert client.post("/api/goal", headers=h, json={
+        "target_amount": 100000, "deadline": deadline, "monthly_income": 50000,
+    }).status_code == 200
+    assert client.post("/api/balance/set", headers=h, json={"amount": balance}).status_code == 200
+    ids = []
+    for i, amount in enumerate(amounts):
+        r = client.post("/api/expenses", headers=h, json={
+            "amount": amount, "category": "food", "date": (date.today() - timedelta(days=i)).isoformat(),
+            "note": f"{user['id']} lunch",
+        })
+        assert r.status_code == 200, r.text
+        ids.append(r.json()["id"])
+    return ids
+
+
+@pytest.fixture(scope="module")
+def users(client):
+    a, b = new_user("a"), new_user("b")
+    a["expenses"] = seed(client, a, 50000, [100, 200])
+    b["expenses"] = seed(client, b, 90000, [7000, 8000, 9000])
+    return a, b
+
+
+# ─── Tokens ───────────────────────────────────────────────────────────────────
+
+@pytest.mark.parametrize("path", PROTECTED)
+def test_missing_or_invalid_token_is_401(client, users, path):
+    for headers in ({}, {"Authorization": "Bearer not-a-token"}, {"Authorization": f"Basic {users[0]['token']}"}):
+        r = client.get(path, headers=headers)
+        assert r.status_code == 401, (path, headers)
+        assert r.headers["www-authenticate"] == "Bearer"
+
+
+def test_writes_without_a_token_are_401(client, users):
+    expense = {"amount": 1, "category": "food", "date": date.today().isoformat()}
+    assert client.post("/api/expenses", json=expense).status_code == 401
+    assert client.delete(f"/api/expenses/{users[0]['expenses'][0]}").status_code == 401
+    assert client.post("/api/balance/credit", json={"amount": 1}).status_code == 401
+
+
+@pytest.mark.parametrize("path", PROTECTED)
+def test_query_token_is_refused_off_the_stream(client, users, path):
+    assert client.get(f"{path}?token={users[0]['token']}").status_code == 401
+
+
+def test_query_token_is_accepted_on_the_stream(users):
+    # The SSE body never ends, so check the stream's dependency on its own.
+    route = next(r for r in main.app.routes if getattr(r, "path", None) == "/api/stream")
+    assert [d.call for d in route.dependant.dependencies] == [auth.stream_user]
+
+    probe = FastAPI()
+
+    @probe.get("/api/stream")
+    def stream(user_id: int = Depends(auth.stream_user)):
+        return user_id
+
+    with TestClient(probe) as p:
+        assert p.get(f"/api/stream?token={users[0]['token']}").json() == users[0]["id"]
+        assert p.get("/api/stream", headers=users[1]["headers"]).json() == users[1]["id"]
+        assert p.get("/api/stream?token=not-a-token").status_code == 401
+        assert p.get("/api/stream").status_code == 401
+
+
+# ─── Isolation ────────────────────────────────────────────────────────────────
+
+def test_users_read_only_their_own_expenses(client, users):
+    a, b = users
+    listed = client.get("/api/expenses", headers=a["headers"]).json()
+    assert sorted(e["id"] for e in listed) == sorted(a["expenses"])
+    exported = client.get("/api/export/expenses?format=ndjson", headers=a["headers"]).text
+    assert f"{b['id']} lunch" not in exported and f"{a['id']} lunch" in exported
+
+
+def test_users_cannot_delete_each_others_expenses(client, users):
+    a, b = users
+    # Shards number their rows independently, so pick an id A doesn't also have.
+    theirs = max(b["expenses"])
+    assert theirs not in a["expenses"]
+    assert client.delete(f"/api/expenses/{theirs}", headers=a["headers"]).status_code == 404
+    assert theirs in [e["id"] for e in client.get("/api/expenses", headers=b["headers"]).json()]
+
+
+def test_ledgers_and_balances_are_separate(client, users):
+    a, b = users
+    assert client.post("/api/balance/credit", headers=a["headers"], json={"amount": 1000}).status_code == 200
+    a_ledger = client.get("/api/balance/ledger", headers=a["headers"]).json()
+    b_ledger = client.get("/api/balance/ledger", headers=b["headers"]).json()
+    assert sorted((e["type"], e["amount"]) for e in a_ledger) == [
+        ("credit", 1000), ("debit", 100), ("debit", 200), ("set", 50000),
+    ]
+    assert sorted((e["type"], e["amount"]) for e in b_ledger) == [
+        ("debit", 7000), ("debit", 8000), ("debit", 9000), ("set", 90000),
+    ]
+    b_dashboard = client.get("/api/dashboard", headers=b["headers"]).json()
+    assert b_dashboard["balance_state"]["current_balance"] == 90000 - 24000
+
+
+def test_writes_change_only_the_writers_data(client, users):
+    a, b = users
+    b_before = client.get("/api/dashboard", headers=b["headers"]).json()
+    assert client.patch("/api/weekly/cap?cap=1234", headers=a["headers"]).status_code == 200
+    assert client.post("/api/goal", headers=a["headers"], json={
+        "target_amount": 5, "deadline": (date.today() + timedelta(days=30)).isoformat(), "monthly_income": 10,
+    }).status_code == 200
+    b_after = client.get("/api/dashboard", headers=b["headers"]).json()
+    assert b_after["weekly"] == b_before["weekly"]
+    assert b_after["goal"] == b_before["goal"]
+
+
+def test_cube_and_forecast_are_per_user(client, users):
+    a, b = users
+    assert client.get("/api/analytics/cube", headers=b["headers"]).json()["total"] == 24000
+    a_total = client.get("/api/analytics/cube", headers=a["headers"]).json()["total"]
+    assert a_total == sum(e["amount"] for e in client.get("/api/expenses", headers=a["headers"]).json())
+
+    a_forecast = client.get("/api/forecast", headers=a["headers"])
+    b_forecast = client.get("/api/forecast", headers=b["headers"])
+    assert b_forecast.json()["start_balance"] == 90000 - 24000
+    assert a_forecast.json()["start_balance"] != b_forecast.json()["start_balance"]
+    # An ETag from one user never revalidates another user's body.
+    revalidate = {**a["headers"], "If-None-Match": b_forecast.headers["etag"]}
+    assert client.get("/api/forecast", headers=revalidate).status_code == 200
+
+
+# ─── Shard mode ───────────────────────────────────────────────────────────────
+
+@pytest.mark.skipif(database.SHARD_DIR is not None, reason="already running in shard mode")
+def test_everything_above_in_shard_mode():
+    """The module again, in a fresh process with SPENDER_SHARD_DIR set."""
+    env = dict(os.environ, SPENDER_SHARD_DIR=tempfile.mkdtemp())
+    result = subprocess.run(
+        [sys.executable, "-m", "pytest", "-q", "-p", "no:cacheprovider", __file__],
+        cwd=os.path.dirname(os.path.dirname(__file__)), env=env, capture_output=True, text=True,
+    )
+    assert result.returncode == 0, result.stdout + result.stderr
+    assert os.listdir(env["SPENDER_SHARD_DIR"])